@@ -0,0 +1,153 @@
+"""
+字幕合併 (segmenter) 效能與品質比較
+
+以 repo 內的 ocr_output.txt / cleaned_ocr_output.txt 為輸入，比較：
+  - legacy_adjacent: 舊版 frame_to_timestamp / video_sub_extractor 的 SequenceMatcher 逐筆比較
+  - legacy_timecode: 舊版 timecode.py 與段落內所有文字比較的 any(is_similar(...))
+  - segmenter:       segmenter.segment (Levenshtein / 最長共同子序列比例 + 代表文字 / 有限視窗)
+品質以 apple.srt 的字幕起點為參考，計算段落起點的 boundary F1 (容許誤差 0.3 秒)；
+每個門檻都列出與同門檻 legacy_adjacent 的 F1 差 (vs legacy)；預設門檻涵蓋 CLI 的預設值與 sweep 的格點
+(merge / frame_to_timestamp 0.4、timecode 分組 0.25 與合併 0.7)，timecode 的兩種模式使用 --window 5
+
+用法：python benchmarks/bench_segmenter.py [--fps 29.97] [--repeat 3] [--thresholds 0.4 0.5] [--window 3]
+"""
+import os
+import re
+import sys
+import time
+import bisect
+import argparse
+from collections import Counter
+from difflib import SequenceMatcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from subtitle_extractor.segmenter import segment, normalize_text, char_counts, _distances  # noqa: E402
+
+
+def read_frame_texts(path):
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split('\t')
+            if len(parts) != 2:
+                continue
+            frame = int(parts[0])
+            items.append((frame, frame, parts[1]))
+    return items
+
+
+def read_reference_starts(path):
+    pattern = re.compile(r'(\d+):(\d+):(\d+),(\d+) -->')
+    starts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = pattern.match(line)
+            if match:
+                h, m, s, ms = map(int, match.groups())
+                starts.append(h * 3600 + m * 60 + s + ms / 1000)
+    return starts
+
+
+def legacy_adjacent(items, threshold):
+    # 舊版 frame_to_timestamp.merge_subtitles：與目前分組的第一筆比較
+    groups = []
+    current = None
+    for start, end, text in items:
+        if current is not None and SequenceMatcher(None, current[2], text).ratio() >= threshold:
+            current[1] = end
+            continue
+        if current is not None:
+            groups.append(tuple(current))
+        current = [start, end, text]
+    if current is not None:
+        groups.append(tuple(current))
+    return groups
+
+
+def legacy_timecode(items, threshold):
+    # 舊版 timecode.py：與段落內所有文字比較，段落越長越慢
+    segments = []
+    current_texts = [items[0][2]]
+    current_start = items[0][0]
+    for i in range(1, len(items)):
+        frame, _, text = items[i]
+        if any(SequenceMatcher(None, text, prev).ratio() >= threshold for prev in current_texts):
+            current_texts.append(text)
+        else:
+            segments.append((current_start, items[i - 1][0], Counter(current_texts).most_common(1)[0][0]))
+            current_start = frame
+            current_texts = [text]
+    segments.append((current_start, items[-1][0], Counter(current_texts).most_common(1)[0][0]))
+    return segments
+
+
+def cold_segment(items, threshold, window):
+    # 正規化、字元計數與距離都有 lru_cache，每次先清掉才是冷啟動的時間
+    normalize_text.cache_clear()
+    char_counts.cache_clear()
+    _distances.cache_clear()
+    return segment(items, threshold=threshold, window=window)
+
+
+def boundary_f1(segments, reference_starts, fps, tolerance=0.3):
+    starts = [start / fps for start, _, _ in segments]
+
+    def matched(values, targets):
+        targets = sorted(targets)
+        count = 0
+        for value in values:
+            i = bisect.bisect_left(targets, value - tolerance)
+            if i < len(targets) and targets[i] <= value + tolerance:
+                count += 1
+        return count
+
+    precision = matched(starts, reference_starts) / len(starts) if starts else 0.0
+    recall = matched(reference_starts, starts) / len(reference_starts) if reference_starts else 0.0
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+
+def timed(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - begin)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fps', type=float, default=29.97, help='frame 編號換算秒數用的幀率')
+    parser.add_argument('--repeat', type=int, default=3, help='每種方法重複次數 (取最快)')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=(0.1, 0.25, 0.4, 0.5, 0.6, 0.7, 0.8),
+                        help='比較的相似度門檻')
+    parser.add_argument('--window', type=int, default=3, help='segmenter 的近期文字視窗 (timecode 使用 5)')
+    args = parser.parse_args()
+
+    reference = read_reference_starts(os.path.join(ROOT, 'apple.srt'))
+    print(f"{'input':<24}{'method':<18}{'thr':>5}{'segments':>10}{'seconds':>10}{'speedup':>9}{'F1':>8}"
+          f"{'vs legacy':>11}")
+    for name in ('ocr_output.txt', 'cleaned_ocr_output.txt'):
+        items = read_frame_texts(os.path.join(ROOT, name))
+        for threshold in args.thresholds:
+            cases = [
+                ('legacy_adjacent', lambda: legacy_adjacent(items, threshold)),
+                ('legacy_timecode', lambda: legacy_timecode(items, threshold)),
+                ('segmenter', lambda: cold_segment(items, threshold, args.window)),
+            ]
+            baseline = None
+            legacy_f1 = None
+            for method, func in cases:
+                seconds, segments = timed(func, args.repeat)
+                baseline = baseline or seconds
+                f1 = boundary_f1(segments, reference, args.fps)
+                legacy_f1 = f1 if legacy_f1 is None else legacy_f1
+                print(f"{name:<24}{method:<18}{threshold:>5}{len(segments):>10}{seconds:>10.3f}"
+                      f"{baseline / seconds:>8.1f}x{f1:>8.3f}{f1 - legacy_f1:>+11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""
+離線效能基準測試 (不需網路與 GPU)
+
+各階段分開量測每秒處理量與記憶體：
+  - decode:     iter_frames 以 FFmpeg rawvideo 管線解碼合成影片
+  - decode_filtered: 同上，但裁切 / 灰階 / 二值化在 FFmpeg 濾鏡圖中完成 (FramePreprocess)，管線只傳送字幕區塊
+  - preprocess: 裁切字幕區域、灰階、二值化 (不含解碼時間)
+  - ipc_pickle: 以 spawn 行程池把解碼後的影格送給 worker (只算簡單的 checksum)，陣列以 pickle 經由 pipe 傳送
+  - ipc_shm:    同上，但影格寫入 FrameRing (shared memory) 的 slot，只傳送 slot 描述；
+                兩者皆記錄經 pipe 傳送的 bytes (bytes_piped) 與寫入 shared memory 的 bytes (bytes_shm)
+  - ocr:        ocr_batch，預設使用 stub 後端，可用 --ocr paddle / onnx / tesseract 改測真實模型
+  - merge:      segmenter 合併 repo 內的 ocr_output.txt / cleaned_ocr_output.txt
+  - merge_store: 同上，但讀取轉換後的 frame store (mmap) 並以連續相同字幕的 run 合併
+  - write:      以 apple.srt 的字幕輸出 SRT 與 VTT
+記憶體為 tracemalloc 的 Python 配置峰值 (另跑一次，不影響計時) 與行程最大 RSS，
+結果存成 JSON，可用 --compare 與先前的結果比較
+
+用法：python benchmarks/run_benchmarks.py [--duration 20] [--ocr stub|paddle|onnx|tesseract] [--compare old.json]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import platform
+import argparse
+import tempfile
+import pickle
+import tracemalloc
+import subprocess
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2  # noqa: E402
+
+from benchmarks.synthetic import generate_video, load_cues  # noqa: E402
+from subtitle_extractor.extractor import crop_frame, iter_frames  # noqa: E402
+from subtitle_extractor.preprocess import FramePreprocess  # noqa: E402
+from subtitle_extractor.ocr_engine import backend_config, configure_ocr, get_ocr, ocr_batch  # noqa: E402
+from subtitle_extractor.segmenter import normalize_text, char_counts  # noqa: E402
+from subtitle_extractor.subtitles import format_time, generate_vtt  # noqa: E402
+from subtitle_extractor import frame_to_timestamp  # noqa: E402
+from subtitle_extractor.frame_store import FrameStore, tsv_to_store  # noqa: E402
+from subtitle_extractor.frame_ring import FrameRing, read_slots  # noqa: E402
+
+CROP_AREA = (884, 1002, 204, 1727)
+IPC_WORKERS = 2
+IPC_CHUNK = 4
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func, repeat=1, memory=True):
+    """
+    func() 回傳處理的項目數；計時取 repeat 次中最快的一次，記憶體另跑一次 tracemalloc
+    """
+    best = float('inf')
+    items = 0
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        items = func()
+        best = min(best, time.perf_counter() - begin)
+    result = {'items': items, 'seconds': round(best, 6),
+              'items_per_sec': round(items / best, 2) if best > 0 else None}
+    if memory:
+        tracemalloc.start()
+        func()
+        result['peak_alloc_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 3)
+        tracemalloc.stop()
+    result['max_rss_mb'] = max_rss_mb()
+    return result
+
+
+def checksum(arrays):
+    return sum(int(array[::16, ::16].sum()) for array in arrays)
+
+
+def checksum_slots(name, slot_bytes, descriptors):
+    return checksum(read_slots(name, slot_bytes, descriptors))
+
+
+def preprocess(frame):
+    crop = crop_frame(frame, CROP_AREA)
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+    return crop, thresh
+
+
+def run_stages(video, args):
+    def frames():
+        return iter_frames(video['path'], args.sample_fps, 0, 0, video['duration'], video['width'], video['height'])
+
+    def decode():
+        return sum(1 for _ in frames())
+
+    filtered = FramePreprocess(CROP_AREA, threshold=150)
+
+    def decode_filtered():
+        return sum(1 for _ in iter_frames(video['path'], args.sample_fps, 0, 0, video['duration'], video['width'],
+                                          video['height'], preprocess=filtered))
+
+    # 解碼一次後保留影格，讓前處理與 OCR 不含解碼時間
+    decoded = [frame for _, _, frame in frames()]
+    crops = []
+
+    def crop_and_threshold():
+        crops.clear()
+        for frame in decoded:
+            crops.append(preprocess(frame)[0])
+        return len(decoded)
+
+    def ocr():
+        for i in range(0, len(crops), args.batch_size):
+            ocr_batch(crops[i:i + args.batch_size], args.batch_size)
+        return len(crops)
+
+    chunks = [decoded[i:i + IPC_CHUNK] for i in range(0, len(decoded), IPC_CHUNK)]
+    ipc_bytes = {}
+
+    def ipc_pickle(pool):
+        def run():
+            # 與行程池送出工作時相同的序列化 (pickle 後經 pipe 傳送，worker 端再還原)
+            ipc_bytes['pickle'] = sum(len(pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL)) for chunk in chunks), 0
+            futures = [pool.submit(checksum, chunk) for chunk in chunks]
+            for future in futures:
+                future.result()
+            return len(decoded)
+        return run
+
+    def ipc_shm(pool):
+        def run():
+            # slot 數與 process_frames 相同：每個 worker 一個執行中、一個排隊中的 chunk
+            with FrameRing((IPC_WORKERS + 1) * IPC_CHUNK, decoded[0].shape) as ring:
+                futures = []
+                piped = 0
+                for chunk in chunks:
+                    descriptors = [ring.put(frame) for frame in chunk]
+                    slots = [slot for slot, _ in descriptors]
+                    piped += len(pickle.dumps((ring.name, ring.slot_bytes, descriptors), protocol=pickle.HIGHEST_PROTOCOL))
+                    future = pool.submit(checksum_slots, ring.name, ring.slot_bytes, descriptors)
+                    future.add_done_callback(lambda _, slots=slots: ring.release(slots))
+                    futures.append(future)
+                for future in futures:
+                    future.result()
+                ipc_bytes['shm'] = piped, ring.written_bytes
+            return len(decoded)
+        return run
+
+    fixtures = [os.path.join(ROOT, name) for name in ('ocr_output.txt', 'cleaned_ocr_output.txt')]
+
+    def merge():
+        # 清掉 lru_cache，量到的是冷啟動的合併時間
+        normalize_text.cache_clear()
+        char_counts.cache_clear()
+        count = 0
+        for path in fixtures:
+            frame_ids, subtitles = frame_to_timestamp.read_ocr_output(path)
+            frame_to_timestamp.merge_subtitles(frame_ids, subtitles, similarity_threshold=0.5)
+            count += len(frame_ids)
+        return count
+
+    stores = []
+
+    def merge_store():
+        normalize_text.cache_clear()
+        char_counts.cache_clear()
+        count = 0
+        for path in stores:
+            store = FrameStore(path)
+            frame_to_timestamp.merge_store_subtitles(store, similarity_threshold=0.5)
+            count += len(store)
+        return count
+
+    cues = load_cues()
+    groups = [{'start_frame': round(start * 29), 'end_frame': round(end * 29), 'subtitle': text}
+              for start, end, text in cues]
+    vtt_items = [(format_time(start), format_time(end), text) for start, end, text in cues]
+
+    def write():
+        with tempfile.TemporaryDirectory() as tmp:
+            timestamped = frame_to_timestamp.generate_timestamped_subtitles(groups, 29)
+            frame_to_timestamp.export_to_srt(timestamped, os.path.join(tmp, 'out.srt'))
+            generate_vtt(vtt_items, os.path.join(tmp, 'out.vtt'))
+        return len(groups) * 2
+
+    stages = {}
+    memory = not args.no_memory
+    stages['decode'] = measure(decode, memory=memory)
+    stages['decode']['bytes_per_frame'] = video['width'] * video['height'] * 3
+    stages['decode_filtered'] = measure(decode_filtered, memory=memory)
+    stages['decode_filtered']['bytes_per_frame'] = filtered.frame_bytes(video['width'], video['height'])
+    stages['preprocess'] = measure(crop_and_threshold, args.repeat, memory)
+    if decoded:
+        with ProcessPoolExecutor(IPC_WORKERS, mp_context=multiprocessing.get_context('spawn')) as pool:
+            # 先啟動 worker，計時不含 spawn 與 import
+            list(pool.map(checksum, [[decoded[0]]] * IPC_WORKERS))
+            # 資料在子行程中處理，tracemalloc 量不到，不另跑記憶體
+            for transport, stage in (('pickle', ipc_pickle), ('shm', ipc_shm)):
+                name = f'ipc_{transport}'
+                stages[name] = measure(stage(pool), args.repeat, memory=False)
+                stages[name]['bytes_piped'], stages[name]['bytes_shm'] = ipc_bytes[transport]
+    stages['ocr'] = measure(ocr, memory=memory)
+    stages['merge'] = measure(merge, args.repeat, memory)
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in fixtures:
+            stores.append(os.path.join(tmp, os.path.basename(path) + '.frames'))
+            tsv_to_store(path, stores[-1])
+        stages['merge_store'] = measure(merge_store, args.repeat, memory)
+    stages['write'] = measure(write, args.repeat, memory)
+    return stages
+
+
+def print_stages(stages, previous=None):
+    print(f"{'stage':<16}{'items':>8}{'seconds':>10}{'items/s':>12}{'peak MB':>10}{'RSS MB':>10}{'vs prev':>10}")
+    for name, stage in stages.items():
+        change = ''
+        old = (previous or {}).get(name)
+        if old and old.get('items_per_sec') and stage.get('items_per_sec'):
+            change = f"{(stage['items_per_sec'] / old['items_per_sec'] - 1) * 100:+.1f}%"
+        peak = stage.get('peak_alloc_mb')
+        rss = stage.get('max_rss_mb')
+        print(f"{name:<16}{stage['items']:>8}{stage['seconds']:>10.3f}{stage['items_per_sec'] or 0:>12.1f}"
+              f"{peak if peak is not None else '-':>10}{round(rss, 1) if rss is not None else '-':>10}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=20.0, help='合成影片長度 (秒)')
+    parser.add_argument('--video-fps', type=int, default=30, help='合成影片幀率')
+    parser.add_argument('--sample-fps', type=int, default=5, help='decode 階段每秒擷取影格數')
+    parser.add_argument('--font', help='中文字型路徑 (預設自動尋找)')
+    parser.add_argument('--ocr', choices=('stub', 'paddle', 'onnx', 'tesseract'), default='stub', help='OCR 後端')
+    parser.add_argument('--stub-delay', type=float, default=0.0, help='stub 後端每次呼叫的模擬延遲 (秒)')
+    parser.add_argument('--onnx-model-dir', help='onnx 後端的模型資料夾')
+    parser.add_argument('--batch-size', type=int, default=1, help='每次 OCR 呼叫合併的字幕區塊數')
+    parser.add_argument('--repeat', type=int, default=3, help='較快階段的重複次數 (取最快)')
+    parser.add_argument('--no-memory', action='store_true', help='不量測 tracemalloc 記憶體峰值')
+    parser.add_argument('--output', help='結果 JSON 路徑 (預設 benchmarks/results/<時間>.json)')
+    parser.add_argument('--compare', help='與先前的結果 JSON 比較')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='[%(asctime)s] %(levelname)s:%(name)s: %(message)s')
+
+    if args.ocr == 'stub':
+        configure_ocr(backend_config('stub', delay=args.stub_delay))
+    elif args.ocr == 'onnx':
+        configure_ocr(backend_config('onnx', model_dir=args.onnx_model_dir))
+    else:
+        configure_ocr(backend_config(args.ocr))
+    get_ocr()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = generate_video(os.path.join(tmp, 'synthetic.mp4'), duration=args.duration, fps=args.video_fps,
+                               crop_area=CROP_AREA, font_path=args.font)
+        stages = run_stages(video, args)
+
+    created = datetime.now()
+    result = {
+        'created': created.isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'video': {key: value for key, value in video.items() if key != 'path'},
+        'stages': stages,
+    }
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"{created:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f).get('stages')
+    print_stages(stages, previous)
+    print(f"結果已寫入 {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+產生帶有已知時間字幕的合成測試影片 (離線、不需 GPU)
+
+字幕文字與時間取自 repo 內的 apple.srt，以 PIL 畫在 extractor 預設的字幕區域，
+背景為緩慢捲動的漸層，影格經 FFmpeg 管線編碼為 H.264，並在旁邊輸出同內容的 .srt 作為標準答案
+"""
+import os
+import re
+import logging
+
+import ffmpeg
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 常見的中文字型位置，找不到時改畫拉丁字母替代文字 (對 stub OCR 的效能量測沒有影響)
+CJK_FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "C:\\Windows\\Fonts\\msjh.ttc",
+)
+
+
+def find_cjk_font(font_path: str = None):
+    for candidate in ((font_path,) if font_path else CJK_FONT_CANDIDATES):
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def load_cues(srt_path: str = os.path.join(ROOT, "apple.srt"), max_duration: float = None) -> list:
+    """
+    讀取 SRT，回傳 [(開始秒數, 結束秒數, 文字), ...]，可只取前 max_duration 秒
+    """
+    pattern = re.compile(r"(\d+):(\d+):(\d+)[,.](\d+) --> (\d+):(\d+):(\d+)[,.](\d+)")
+    cues = []
+    with open(srt_path, "r", encoding="utf-8") as f:
+        blocks = f.read().strip().split("\n\n")
+    for block in blocks:
+        lines = block.strip().split("\n")
+        for i, line in enumerate(lines):
+            match = pattern.match(line.strip())
+            if match:
+                values = list(map(int, match.groups()))
+                start = values[0] * 3600 + values[1] * 60 + values[2] + values[3] / 1000
+                end = values[4] * 3600 + values[5] * 60 + values[6] + values[7] / 1000
+                text = " ".join(lines[i + 1:]).strip()
+                if max_duration is None or start < max_duration:
+                    cues.append((start, min(end, max_duration) if max_duration else end, text))
+                break
+    return cues
+
+
+def render_text(text: str, size: tuple, font_path: str = None, font_size: int = 64):
+    """
+    將文字畫成與字幕區域同尺寸的 BGR 圖層與遮罩 (白字黑邊)
+    """
+    width, height = size
+    layer = Image.new("L", (width, height), 0)
+    outline = Image.new("L", (width, height), 0)
+    if font_path:
+        font = ImageFont.truetype(font_path, font_size)
+    else:
+        font = ImageFont.load_default()
+        text = text.encode("unicode_escape").decode("ascii")[:60]
+    draw = ImageDraw.Draw(layer)
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    x = (width - (right - left)) // 2 - left
+    y = (height - (bottom - top)) // 2 - top
+    draw.text((x, y), text, fill=255, font=font)
+    ImageDraw.Draw(outline).text((x, y), text, fill=255, font=font, stroke_width=3)
+    return np.asarray(layer), np.asarray(outline)
+
+
+def generate_video(path: str, duration: float = 20.0, width: int = 1920, height: int = 1080, fps: int = 30,
+                   crop_area: tuple = (884, 1002, 204, 1727), font_path: str = None,
+                   srt_path: str = os.path.join(ROOT, "apple.srt")) -> dict:
+    """
+    產生合成影片與標準答案 SRT (path + ".srt")，回傳影片資訊
+    """
+    font_path = find_cjk_font(font_path)
+    if font_path is None:
+        logger.warning("找不到中文字型，字幕改以替代文字繪製")
+    cues = load_cues(srt_path, max_duration=duration)
+    y1, y2, x1, x2 = crop_area
+    layers = [render_text(text, (x2 - x1, y2 - y1), font_path) for _, _, text in cues]
+
+    # 背景：水平漸層，每格捲動 4 px，讓字幕區域以外的畫面持續變化
+    gradient = np.tile(np.linspace(30, 200, width * 2, dtype=np.uint8), (height, 1))
+    process = (
+        ffmpeg
+        .input("pipe:", format="rawvideo", pix_fmt="bgr24", s=f"{width}x{height}", r=fps)
+        .output(path, vcodec="libx264", preset="ultrafast", pix_fmt="yuv420p", g=fps * 2)
+        .overwrite_output()
+        .global_args("-nostdin", "-loglevel", "error")
+        .run_async(pipe_stdin=True)
+    )
+    total_frames = int(round(duration * fps))
+    cue_idx = 0
+    frame = np.empty((height, width, 3), np.uint8)
+    for idx in range(total_frames):
+        t = idx / fps
+        offset = (idx * 4) % width
+        frame[:, :, 0] = gradient[:, offset:offset + width]
+        frame[:, :, 1] = 255 - frame[:, :, 0]
+        frame[:, :, 2] = 90
+        while cue_idx < len(cues) and cues[cue_idx][1] <= t:
+            cue_idx += 1
+        if cue_idx < len(cues) and cues[cue_idx][0] <= t:
+            text_layer, outline_layer = layers[cue_idx]
+            region = frame[y1:y2, x1:x2]
+            region[outline_layer > 0] = 0
+            region[text_layer > 0] = 255
+        process.stdin.write(frame.tobytes())
+    process.stdin.close()
+    process.wait()
+
+    with open(path + ".srt", "w", encoding="utf-8") as f:
+        for i, (start, end, text) in enumerate(cues, 1):
+            f.write(f"{i}\n{_srt_time(start)} --> {_srt_time(end)}\n{text}\n\n")
+    return {"path": path, "width": width, "height": height, "fps": fps, "duration": duration,
+            "frames": total_frames, "cues": len(cues), "cjk_font": font_path}
+
+
+def _srt_time(seconds: float) -> str:
+    millis = int(round(seconds * 1000))
+    return f"{millis // 3600000:02}:{millis // 60000 % 60:02}:{millis // 1000 % 60:02},{millis % 1000:03}"
@@ -0,0 +1,20 @@
+"""
+影片內嵌字幕擷取工具
+
+匯入本套件不會載入 paddleocr、cv2、skimage 或 ffmpeg；
+需要這些套件的功能 (extractor、change_detection、frame_ocr 等) 請直接匯入對應模組
+"""
+from .segmenter import Segmenter, segment, similarity, normalize_text
+from .subtitles import format_time, merge_subtitles, generate_vtt
+
+__version__ = "0.1.0"
+
+__all__ = [
+    "Segmenter",
+    "segment",
+    "similarity",
+    "normalize_text",
+    "format_time",
+    "merge_subtitles",
+    "generate_vtt",
+]
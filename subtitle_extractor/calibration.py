@@ -0,0 +1,178 @@
+"""
+字幕區域自動校正
+
+從影片平均取樣數十張影格，找出字幕文字出現的水平帶狀區域，回傳緊貼文字的 (y1, y2, x1, x2)；
+結果依影片 (絕對路徑、檔案大小、修改時間) 快取在 JSON 檔，同一支影片不需重複校正
+"""
+import os
+import json
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def sample_frames(video_path: str, samples: int = 36, skip_start: float = 0, skip_end: float = 0):
+    """
+    在 [skip_start, 長度 - skip_end] 之間平均取 samples 張影格 (BGR)，每張都直接 seek 過去，不需逐格解碼
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"無法開啟影片: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    duration = total_frames / fps if fps > 0 else 0
+    start = min(skip_start, duration)
+    span = max(0.0, duration - skip_end - start)
+
+    frames = []
+    for i in range(samples):
+        cap.set(cv2.CAP_PROP_POS_MSEC, (start + span * (i + 0.5) / samples) * 1000)
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    logger.debug(f"校正取樣 {len(frames)} 張影格 (影片長度 {duration:.1f} 秒)")
+    return frames
+
+
+def text_activity(frames, edge_delta: int = 60, static_ratio: float = 0.8):
+    """
+    每個像素在取樣影格中出現文字筆畫邊緣的比例 (0~1)
+    筆畫邊緣以 3x3 形態梯度判斷；在大多數影格都出現邊緣的像素 (台標、浮水印、固定外框) 視為靜態並排除
+    """
+    kernel = np.ones((3, 3), np.uint8)
+    counts = None
+    for frame in frames:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        edges = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, kernel) > edge_delta
+        if counts is None:
+            counts = np.zeros(edges.shape, np.uint16)
+        counts += edges
+    activity = counts.astype(np.float32) / len(frames)
+    activity[activity >= static_ratio] = 0
+    return activity
+
+
+def find_bands(row_score, min_height: int, max_gap: int, level: float = 0.2):
+    """
+    在每列分數中找出高於門檻的連續列，間隔不超過 max_gap 的合併，過矮的捨棄，回傳 [(y1, y2), ...]
+    門檻為中位數 + level * (最大值 - 中位數)，背景本身紋理多時門檻也會跟著提高
+    """
+    baseline = float(np.median(row_score))
+    peak = float(row_score.max())
+    if peak <= baseline:
+        return []
+    active = row_score > baseline + level * (peak - baseline)
+
+    bands = []
+    start = None
+    for y, flag in enumerate(active):
+        if flag and start is None:
+            start = y
+        elif not flag and start is not None:
+            bands.append([start, y])
+            start = None
+    if start is not None:
+        bands.append([start, len(active)])
+
+    merged = []
+    for band in bands:
+        if merged and band[0] - merged[-1][1] <= max_gap:
+            merged[-1][1] = band[1]
+        else:
+            merged.append(band)
+    return [(y1, y2) for y1, y2 in merged if y2 - y1 >= min_height]
+
+
+def column_extent(activity_band, background: float = 0.0, coverage: float = 0.998):
+    """
+    字幕帶內累積涵蓋 coverage 比例文字邊緣的最窄欄位範圍 (x1, x2)
+    background 為畫面一般位置的平均邊緣比例，先扣掉才不會把字幕兩側的背景紋理算進去
+    """
+    column_score = np.clip(activity_band.mean(axis=0) - background, 0, None)
+    total = column_score.sum()
+    if total <= 0:
+        return 0, activity_band.shape[1]
+    cumulative = np.cumsum(column_score) / total
+    tail = (1 - coverage) / 2
+    x1 = int(np.searchsorted(cumulative, tail))
+    x2 = int(np.searchsorted(cumulative, 1 - tail)) + 1
+    return x1, x2
+
+
+def detect_regions(frames, max_regions: int = 2) -> list:
+    """
+    由取樣影格找出字幕區域，依文字量由多到少排序，回傳 [(y1, y2, x1, x2), ...]
+    """
+    if not frames:
+        return []
+    activity = text_activity(frames)
+    height, width = activity.shape
+    row_score = cv2.blur(activity.mean(axis=1, keepdims=True), (1, 5)).ravel()
+    bands = find_bands(row_score, min_height=max(8, height // 60), max_gap=max(2, height // 100))
+    background = float(np.median(row_score))
+
+    regions = []
+    for y1, y2 in bands:
+        # 上下各留 1/3 字高的邊界，避免切到上標點與下緣筆畫
+        pad_y = max(4, (y2 - y1) // 3)
+        y1, y2 = max(0, y1 - pad_y), min(height, y2 + pad_y)
+        x1, x2 = column_extent(activity[y1:y2], background)
+        pad_x = max(8, (y2 - y1) // 2)
+        x1, x2 = max(0, x1 - pad_x), min(width, x2 + pad_x)
+        regions.append(((y1, y2, x1, x2), float(activity[y1:y2, x1:x2].sum())))
+    regions.sort(key=lambda item: item[1], reverse=True)
+    return [region for region, _ in regions[:max_regions]]
+
+
+def video_key(video_path: str, samples: int) -> str:
+    stat = os.stat(video_path)
+    return f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}|samples={samples}"
+
+
+def load_region_cache(cache_path: str) -> dict:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"無法讀取字幕區域快取 {cache_path}，將重新校正: {e}")
+        return {}
+
+
+def calibrate_regions(video_path: str, samples: int = 36, skip_start: float = 0, skip_end: float = 0,
+                      cache_path: str = None, max_regions: int = 2) -> list:
+    """
+    取得影片的字幕區域 [(y1, y2, x1, x2), ...]，第一個為文字最多的區域
+    cache_path 有此影片的結果時直接回傳，否則取樣偵測後寫回快取；找不到任何字幕帶時回傳空列表
+    """
+    key = video_key(video_path, samples)
+    cache = load_region_cache(cache_path) if cache_path else {}
+    if key in cache:
+        regions = [tuple(region) for region in cache[key]["regions"]]
+        logger.info(f"使用快取的字幕區域: {regions}")
+        return regions
+
+    frames = sample_frames(video_path, samples, skip_start, skip_end)
+    regions = detect_regions(frames, max_regions=max_regions)
+    if frames:
+        height, width = frames[0].shape[:2]
+        for y1, y2, x1, x2 in regions:
+            ratio = (y2 - y1) * (x2 - x1) / (height * width)
+            logger.info(f"偵測到字幕區域 (y1, y2, x1, x2)=({y1}, {y2}, {x1}, {x2})，佔畫面 {ratio:.1%}")
+    if not regions:
+        logger.warning(f"校正時找不到字幕區域: {video_path}")
+        return regions
+
+    if cache_path:
+        cache[key] = {"regions": [list(region) for region in regions],
+                      "frame_size": [int(frames[0].shape[1]), int(frames[0].shape[0])]}
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_path)
+    return regions
@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+from skimage.metrics import structural_similarity as ssim
+
+
+class ChangeDetector:
+    """
+    字幕區域變化偵測：先以縮小後的灰階像素差快速判斷，差異落在模糊區間時再以 SSIM 確認
+    比對對象為上一次判定為「有變化」的區域 (也就是最後一次送去 OCR 的畫面)，避免緩慢漸變時不斷累積誤差
+    """
+
+    def __init__(self, scale: int = 4, pixel_delta: int = 25, unchanged_ratio: float = 0.001,
+                 changed_ratio: float = 0.02, ssim_threshold: float = 0.8):
+        self.scale = scale                      # 像素差比對前的縮小倍率
+        self.pixel_delta = pixel_delta          # 灰階差超過此值才視為變動像素
+        self.unchanged_ratio = unchanged_ratio  # 變動像素比例低於此值直接視為未變化
+        self.changed_ratio = changed_ratio      # 變動像素比例高於此值直接視為有變化
+        self.ssim_threshold = ssim_threshold    # 介於兩者之間時，變動區塊 SSIM 低於此值視為有變化
+        self.reference_gray = None
+        self.reference_small = None
+        self.frames = 0
+        self.skipped = 0
+        self.ssim_checks = 0
+
+    def params(self) -> dict:
+        """寫入日誌參數用，門檻不同時沿用的影格不同，不會沿用舊的日誌"""
+        return {"scale": self.scale, "pixel_delta": self.pixel_delta, "unchanged_ratio": self.unchanged_ratio,
+                "changed_ratio": self.changed_ratio, "ssim_threshold": self.ssim_threshold}
+
+    def _prepare(self, region):
+        gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+        height, width = gray.shape
+        small = cv2.resize(gray, (max(1, width // self.scale), max(1, height // self.scale)),
+                           interpolation=cv2.INTER_AREA)
+        return gray, small
+
+    def _ssim_changed(self, gray, mask) -> bool:
+        # 只在變動像素的外框範圍計算 SSIM，單一字的變化也不會被整條字幕的平均值稀釋
+        ys, xs = np.nonzero(mask)
+        pad = 2
+        y1 = max(0, (ys.min() - pad) * self.scale)
+        y2 = min(gray.shape[0], (ys.max() + 1 + pad) * self.scale)
+        x1 = max(0, (xs.min() - pad) * self.scale)
+        x2 = min(gray.shape[1], (xs.max() + 1 + pad) * self.scale)
+        if min(y2 - y1, x2 - x1) < 7:
+            return True
+        self.ssim_checks += 1
+        score = ssim(self.reference_gray[y1:y2, x1:x2], gray[y1:y2, x1:x2])
+        return bool(score < self.ssim_threshold)
+
+    def is_changed(self, region) -> bool:
+        """
+        判斷字幕區域與上一次送 OCR 的畫面相比是否有變化，有變化時更新比對基準
+        """
+        self.frames += 1
+        gray, small = self._prepare(region)
+        if self.reference_small is None or self.reference_small.shape != small.shape:
+            changed = True
+        else:
+            mask = cv2.absdiff(small, self.reference_small) > self.pixel_delta
+            ratio = float(mask.mean())
+            if ratio <= self.unchanged_ratio:
+                changed = False
+            elif ratio >= self.changed_ratio:
+                changed = True
+            else:
+                changed = self._ssim_changed(gray, mask)
+
+        if changed:
+            self.reference_gray = gray
+            self.reference_small = small
+        else:
+            self.skipped += 1
+        return changed
+
+
+def write_frame_time(idx_list,file_name):
+    with open(file_name ,'w') as f:
+        for i in range(0,len(idx_list)):
+            f.write(str(idx_list[i]) + "\n")
+
+
+def detect_changes(video_path, file_name="apple_idx.txt", region=None):
+    """
+    逐格讀取影片，記錄字幕區域發生變化的影格編號
+    region 為 (y1, y2, x1, x2)，未指定時使用畫面下方 80%~95% 高、5%~75% 寬的範圍
+    """
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = int(cap.get(cv2.CAP_PROP_FPS))  # 每秒幀數 (選用)
+    print(f"影片總幀數: {total_frames}")
+    print(f"影片 FPS: {fps}")
+
+    detector = ChangeDetector()
+    idx_list = []
+    idx = 0
+    while True:
+        # 依序讀取即可，不需要每格都 seek
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        if region is None:
+            # 获取视频帧的高度和宽度
+            height, width, _ = frame.shape
+            region = (int(height * 0.8), int(height * 0.95), int(width * 0.05), int(width * 0.75))
+
+        # 裁剪下方文字区域
+        y1, y2, x1, x2 = region
+        cropped = frame[y1:y2, x1:x2]
+
+        if detector.is_changed(cropped) and idx > 0:
+            print(f"Frame {idx}: Significant change detected")
+            idx_list.append(idx)
+        idx += 1
+
+    cap.release()
+    print(f"共 {detector.frames} 格，其中 {detector.skipped} 格與前一次相同")
+    write_frame_time(idx_list, file_name)
+
@@ -25,9 +25,7 @@ def clean_ocr_text(file_path, output_path):
         file.writelines(cleaned_data)
 
 # 主程序
-input_file = "ocr_output.txt"  # 替換為您的原始檔案路徑
-output_file = "cleaned_ocr_output.txt"  # 清洗後的檔案路徑
+def main(input_file="ocr_output.txt", output_file="cleaned_ocr_output.txt"):
+    clean_ocr_text(input_file, output_file)
 
-clean_ocr_text(input_file, output_file)
-
-print("文字清洗完成，結果已保存至 cleaned_ocr_output.txt")
+    print(f"文字清洗完成，結果已保存至 {output_file}")
@@ -0,0 +1,656 @@
+"""
+subtitle-extractor 命令列入口
+
+每個子命令只在執行時才匯入需要的模組，paddleocr / cv2 / skimage / ffmpeg 等重型套件
+不會因為 --help 或只做合併、清洗的子命令而被載入
+"""
+import os
+import json
+import sys
+import time
+import logging
+import argparse
+
+logger = logging.getLogger("subtitle_extractor")
+
+DEFAULT_CROP_AREA = (884, 1002, 204, 1727)
+DEFAULT_REGION_CACHE = "region_cache.json"
+DEFAULT_JOB_DB = "jobs.sqlite"
+
+
+def auto_region(args, default):
+    """
+    --auto-region 時回傳校正後文字最多的字幕區域，否則 (或校正失敗時) 回傳 default
+    """
+    default = tuple(default) if default else None
+    if not args.auto_region:
+        return default
+    from .calibration import calibrate_regions
+
+    regions = calibrate_regions(args.video, samples=args.calibration_samples,
+                                cache_path=None if args.no_region_cache else args.region_cache)
+    return regions[0] if regions else default
+
+
+def add_calibration_arguments(p, flag="--auto-region"):
+    p.add_argument(flag, dest="auto_region", action="store_true", help="取樣影格自動找出字幕區域 (取代手動指定的區域)")
+    p.add_argument("--calibration-samples", type=int, default=36, help="自動校正取樣的影格數")
+    p.add_argument("--region-cache", default=DEFAULT_REGION_CACHE, help="字幕區域校正結果快取檔")
+    p.add_argument("--no-region-cache", action="store_true", help="不讀寫字幕區域快取")
+
+
+def setup_logging(verbose: bool = False, metrics: bool = False):
+    """
+    全套件共用的 logging 設定 (原本分散在各腳本中)
+    metrics 為 True 時，套件的 log 也會依等級累計到執行期指標 (log_messages_total)
+    """
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        format="[%(asctime)s] %(levelname)s:%(name)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    if metrics:
+        from .metrics import MetricsLogHandler
+        logger.addHandler(MetricsLogHandler())
+
+
+def cmd_extract(args):
+    from .extractor import process_video
+
+    start_time = time.time()  # 記錄開始時間
+    output = args.output or f"{args.video.rsplit('.', 1)[0]}.vtt"
+    journal_path = None if args.no_journal else (args.journal or f"{output}.journal")
+    if not check_region_options(args):
+        return 2
+    options = extract_options(args)
+    options["crop_area"] = tuple(options["crop_area"])
+    process_video(args.video, output, frames_folder=args.frames_folder, journal_path=journal_path,
+                  resume=args.resume, **options)
+    end_time = time.time()    # 記錄結束時間
+    logger.info(f"整支程式執行總時間: {end_time - start_time:.2f} 秒")
+
+
+def check_region_options(args) -> bool:
+    """
+    --auto-crop 只校正單一字幕區域，不能與 --track 同時使用；
+    分段工作的合併只讀取單一輸出檔，--track (每條字幕軌各自輸出) 也不能與 --shard-seconds 同時使用
+    """
+    if args.auto_region and args.tracks:
+        logger.error("--auto-crop 不能與 --track 同時使用")
+        return False
+    if args.tracks and getattr(args, "shard_seconds", None):
+        logger.error("--track 不能與 --shard-seconds 同時使用")
+        return False
+    return True
+
+
+def extract_options(args) -> dict:
+    """
+    extract 與 queue add 共用的 process_video 參數 (可序列化為 JSON 存入工作佇列)
+    """
+    return dict(
+        fps=args.fps, skip_start=args.skip_start, skip_end=args.skip_end, crop_area=list(args.crop),
+        time_adjustment=args.time_adjustment, max_workers=args.workers,
+        detect_changes=not args.no_detect_changes, executor_type=args.executor,
+        batch_size=args.batch_size, batch_wait=args.batch_wait,
+        cache_path=None if args.no_cache else os.path.abspath(args.cache),
+        auto_crop=args.auto_region,
+        region_cache_path=None if args.no_region_cache else os.path.abspath(args.region_cache),
+        calibration_samples=args.calibration_samples, refine=args.refine,
+        refine_threshold=args.refine_threshold,
+        # 0 (全部核心) 存成 None，由實際執行的主機 (queue worker) 依自己的核心數決定
+        decode_workers=args.decode_workers or None,
+        filter_graph=args.ffmpeg_preprocess, gray=args.gray, binarize_threshold=args.threshold,
+        scale=args.scale, skip_empty=args.skip_empty, text_threshold=args.text_threshold,
+        index_cache=not args.no_index_cache, ocr_backend=args.ocr_backend, ocr_options=ocr_options(args),
+        ocr_daemon=None if args.no_ocr_daemon else ocr_socket(args),
+        prefetch=args.prefetch, max_pending=args.max_pending, regions=args.tracks,
+        merge_options=dict(similarity_threshold=args.merge_threshold, window=args.merge_window,
+                           min_length=args.min_length),
+        shared_memory=not args.no_shared_memory,
+    )
+
+
+def parse_track(value: str) -> dict:
+    """
+    --track 的格式: 名稱:Y1,Y2,X1,X2[:語言[:OCR 後端]]，例如 top:40,140,0,1920:en
+    """
+    parts = value.split(":")
+    try:
+        crop_area = [int(v) for v in parts[1].split(",")]
+    except (IndexError, ValueError):
+        crop_area = None
+    if len(parts) > 4 or not parts[0] or crop_area is None or len(crop_area) != 4:
+        raise argparse.ArgumentTypeError(f"字幕區域格式應為 名稱:Y1,Y2,X1,X2[:語言[:後端]]: {value}")
+    region = {"name": parts[0], "crop_area": crop_area}
+    if len(parts) > 2 and parts[2]:
+        region["lang"] = parts[2]
+    if len(parts) > 3 and parts[3]:
+        region["ocr_backend"] = parts[3]
+    return region
+
+
+def ocr_socket(args) -> str:
+    from .ocr_daemon import default_socket_path
+
+    return os.path.abspath(args.ocr_socket) if args.ocr_socket else default_socket_path()
+
+
+def ocr_options(args) -> dict:
+    """
+    各 OCR 後端的建構參數 {後端: 參數}，只列出有指定的項目
+    """
+    options = {}
+    if args.onnx_model_dir or args.onnx_int8:
+        options["onnx"] = dict(model_dir=args.onnx_model_dir and os.path.abspath(args.onnx_model_dir),
+                               int8=args.onnx_int8)
+    if args.tesseract_cmd:
+        options["tesseract"] = dict(tesseract_cmd=args.tesseract_cmd)
+    if args.no_layout_cache or args.layout_confidence is not None:
+        for name in ("paddle", "tesseract", "onnx", "stub"):
+            layout = options.setdefault(name, {})
+            if args.no_layout_cache:
+                layout["layout_cache"] = False
+            if args.layout_confidence is not None:
+                layout["layout_confidence"] = args.layout_confidence
+    return options
+
+
+def cmd_queue_add(args):
+    from .jobs import JobQueue
+
+    if not check_region_options(args):
+        return 2
+    options = extract_options(args)
+    duration = None
+    if args.shard_seconds:
+        from .frame_index import load_frame_index
+    with JobQueue(args.db) as queue:
+        for video in args.videos:
+            if args.shard_seconds:
+                # 建立的影格索引同時留給 worker 使用，不必各自再 ffprobe
+                duration = float(load_frame_index(video).duration)
+            output = os.path.join(args.output_dir, os.path.basename(video).rsplit(".", 1)[0] + ".vtt") \
+                if args.output_dir else None
+            job_ids = queue.enqueue_video(video, output, options, max_attempts=args.max_attempts,
+                                          shard_seconds=args.shard_seconds, duration=duration)
+            logger.info(f"已加入 {video}: 工作 {', '.join(map(str, job_ids))}")
+
+
+def cmd_queue_worker(args):
+    from .jobs import run_worker, run_local_workers
+
+    worker_options = dict(lease_seconds=args.lease, poll_interval=args.poll,
+                          exit_when_empty=not args.keep_running, backoff=args.backoff)
+    if args.workers > 1:
+        completed = run_local_workers(args.db, args.workers, **worker_options)
+    else:
+        completed = run_worker(args.db, **worker_options)
+    logger.info(f"共完成 {completed} 筆工作")
+
+
+def cmd_queue_status(args):
+    from .jobs import JobQueue
+
+    with JobQueue(args.db) as queue:
+        for job in queue.jobs(args.status):
+            shard = f" [{job['shard_start']:.0f}-{job['shard_end']:.0f}s]" if job["shard_start"] is not None else ""
+            error = f"  {job['error']}" if job["error"] else ""
+            # 多個字幕區域的工作以結果中實際寫出的字幕檔為準
+            outputs = json.loads(job["result"]).get("outputs") if job["result"] else None
+            output = ", ".join(outputs) if outputs else job["output"]
+            print(f"{job['id']:>5}  {job['status']:<8} {job['attempts']}/{job['max_attempts']}  "
+                  f"{job['worker'] or '-':<24} {job['video']}{shard} -> {output}{error}")
+        print(", ".join(f"{status}={count}" for status, count in sorted(queue.counts().items())))
+
+
+def cmd_queue_retry(args):
+    from .jobs import JobQueue
+
+    with JobQueue(args.db) as queue:
+        logger.info(f"重新排入 {queue.retry(args.ids)} 筆失敗的工作")
+
+
+def add_ocr_backend_arguments(p, flag="--ocr-backend", help="OCR 後端 (auto 表示量測後選用最快者)"):
+    """
+    extract、frame-ocr 與 ocr-bench 共用的 OCR 後端參數
+    """
+    if flag:
+        p.add_argument(flag, dest="ocr_backend", choices=("paddle", "tesseract", "onnx", "stub", "auto"),
+                       default="paddle", help=help)
+    p.add_argument("--onnx-model-dir", help="ONNX 模型資料夾 (det.onnx、rec.onnx、dict.txt)")
+    p.add_argument("--onnx-int8", action="store_true", help="ONNX 後端改用 int8 動態量化模型")
+    p.add_argument("--tesseract-cmd", help="Tesseract 執行檔路徑")
+    p.add_argument("--no-layout-cache", action="store_true",
+                   help="每張字幕區塊都重新偵測文字框 (預設沿用前一次的文字框，位置不變時只做辨識，"
+                        "PaddleOCR 也不做角度分類)")
+    p.add_argument("--layout-confidence", type=float,
+                   help="沿用文字框時，任一行置信度低於此值就重新偵測 (預設 0.8)")
+
+
+def add_text_presence_arguments(p):
+    """
+    extract 與 frame-ocr 共用的文字偵測參數
+    """
+    p.add_argument("--skip-empty", action="store_true",
+                   help="先以筆畫邊緣密度判斷字幕區域有無文字，沒有文字就不做 OCR")
+    p.add_argument("--text-threshold", type=float,
+                   help="判定有文字的邊緣像素比例 (預設由影片取樣自動校正)")
+
+
+def add_extract_options(p):
+    """
+    extract 與 queue add 共用的擷取參數
+    """
+    p.add_argument("--fps", type=int, default=2, help="每秒擷取影格數")
+    p.add_argument("--skip-start", type=int, default=0, help="略過開頭秒數")
+    p.add_argument("--skip-end", type=int, default=0, help="略過結尾秒數")
+    p.add_argument("--crop", type=int, nargs=4, metavar=("Y1", "Y2", "X1", "X2"), default=DEFAULT_CROP_AREA,
+                   help="字幕區域")
+    p.add_argument("--track", dest="tracks", type=parse_track, action="append",
+                   metavar="NAME:Y1,Y2,X1,X2[:LANG[:BACKEND]]",
+                   help="多個字幕區域 (可重複指定)：影片只解碼一次，每個區域各自辨識並輸出 <輸出檔>.<名稱>.vtt，"
+                        "取代 --crop")
+    p.add_argument("--time-adjustment", type=float, default=0.0, help="所有時間戳的位移秒數")
+    p.add_argument("--workers", type=int, default=4, help="平行 OCR 數量")
+    p.add_argument("--executor", choices=("thread", "process"), default="thread", help="OCR 平行方式")
+    p.add_argument("--no-shared-memory", action="store_true",
+                   help="--executor process 時改以 pickle 傳送字幕區塊 (預設經由 shared memory 環狀緩衝區)")
+    p.add_argument("--decode-workers", type=int, default=1,
+                   help="依關鍵影格切段後平行解碼 + OCR 的行程數 (0 表示使用全部核心，1 表示不切段)")
+    p.add_argument("--batch-size", type=int, default=1, help="每次 OCR 呼叫合併的字幕區塊數")
+    p.add_argument("--batch-wait", type=float, default=0.5, help="湊批最長等待秒數")
+    p.add_argument("--prefetch", type=int, default=32, help="背景解碼預先讀取的影格數 (0 表示不預讀)")
+    p.add_argument("--max-pending", type=int,
+                   help="已送出 OCR 但尚未取回結果的影格上限 (預設依 --workers 與批次大小決定)")
+    p.add_argument("--no-detect-changes", action="store_true", help="停用字幕區域變化偵測")
+    p.add_argument("--merge-threshold", type=float, default=0.5, help="合併字幕的相似度閾值 (可用 sweep 調校)")
+    p.add_argument("--merge-window", type=int, default=3, help="合併時比對的最近不同文字數")
+    p.add_argument("--min-length", type=int, default=4, help="少於此字數的辨識結果不列入字幕")
+    add_text_presence_arguments(p)
+    add_ocr_backend_arguments(p)
+    p.add_argument("--ocr-socket", help="OCR daemon 的 socket 路徑 (預設與 ocr-daemon 相同)")
+    p.add_argument("--no-ocr-daemon", action="store_true", help="不使用常駐的 OCR daemon，一律在本行程載入模型")
+    p.add_argument("--ffmpeg-preprocess", action="store_true",
+                   help="在 FFmpeg 濾鏡圖中完成裁切 (與 --gray/--threshold/--scale)，管線只傳送字幕區塊")
+    p.add_argument("--gray", action="store_true", help="字幕區塊轉為灰階後再偵測變化與辨識")
+    p.add_argument("--threshold", type=int, help="二值化門檻 (0~255)，灰階值大於門檻設為白色 (隱含 --gray)")
+    p.add_argument("--scale", type=float, default=1.0, help="字幕區塊縮放倍率")
+    p.add_argument("--refine", action="store_true",
+                   help="以 --fps 稀疏取樣，再對文字改變處以原始幀率二分搜尋，字幕時間精確到單一影格")
+    p.add_argument("--refine-threshold", type=float, default=0.5, help="精修時判定兩段文字相同的相似度閾值")
+    p.add_argument("--cache", default="ocr_cache.sqlite", help="OCR 結果快取檔")
+    p.add_argument("--no-cache", action="store_true", help="停用 OCR 結果快取")
+    p.add_argument("--no-index-cache", action="store_true",
+                   help="不讀寫影片旁的影格索引快取 (<影片>.frameindex.npz)，每次重新 ffprobe")
+    add_calibration_arguments(p, "--auto-crop")
+
+
+def cmd_frame_ocr(args):
+    from .frame_ocr import extract_frame_texts
+
+    extract_frame_texts(args.video, args.output, region=auto_region(args, args.region), engine=args.ocr_backend,
+                        confidence_threshold=args.confidence, tesseract_cmd=args.tesseract_cmd,
+                        output_folder=args.save_dir, save_every=args.save_every, skip_empty=args.skip_empty,
+                        text_threshold=args.text_threshold, ocr_options=ocr_options(args))
+
+
+def cmd_ocr_daemon(args):
+    from .ocr_daemon import OCRClient, serve
+
+    socket_path = ocr_socket(args)
+    if args.action == "start":
+        from .ocr_engine import current_config, use_backend
+
+        samples = None
+        if args.ocr_backend == "auto":
+            from .ocr_backends import synthetic_strips
+
+            samples = synthetic_strips(8)
+        use_backend(args.ocr_backend, ocr_options(args), samples)
+        serve(socket_path, current_config(), instances=args.instances, num_threads=args.threads)
+        return 0
+    try:
+        client = OCRClient(socket_path)
+    except OSError:
+        print(f"沒有 OCR daemon 在 {socket_path} 執行")
+        return 1
+    try:
+        if args.action == "stop":
+            client.shutdown()
+            print(f"已要求 OCR daemon (pid {client.pid}) 停止")
+        else:
+            stats = client.stats()
+            print(f"pid {client.pid}  後端 {client.config.get('backend')}  實例 {stats['instances']} "
+                  f"(閒置 {stats['idle_instances']})  已執行 {stats['uptime']:.0f} 秒")
+            print(f"連線 {stats['connections']}  請求 {stats['requests']}  字幕區塊 {stats['crops']}  "
+                  f"辨識 {stats['busy_seconds']:.1f} 秒  等待 {stats['wait_seconds']:.1f} 秒")
+    finally:
+        client.close()
+    return 0
+
+
+def cmd_ocr_bench(args):
+    from .ocr_backends import BACKENDS, benchmark_backends
+    from .ocr_engine import backend_config
+
+    if args.video:
+        from .calibration import sample_frames
+        from .preprocess import FramePreprocess
+
+        preprocess = FramePreprocess(tuple(auto_region(args, args.crop)), gray=args.gray)
+        images = [preprocess.apply(frame) for frame in sample_frames(args.video, args.samples)]
+    else:
+        from .ocr_backends import synthetic_strips
+
+        images = synthetic_strips(args.samples)
+    names = args.backends or [name for name in BACKENDS if name != "stub"]
+    options = ocr_options(args)
+    configs = {}
+    for name in names:
+        configs[name] = backend_config(name, **options.get(name, {}))
+        configs[name].pop("backend")
+    results = benchmark_backends(images, names, configs, repeat=args.repeat, batch_size=args.batch_size)
+    for name in names:
+        if name in results:
+            seconds = results[name][1]
+            print(f"{name:<10}{seconds * 1000:>10.2f} ms/張{1 / seconds if seconds else 0:>10.1f} 張/秒")
+        else:
+            print(f"{name:<10}{'無法使用':>10}")
+    if not results:
+        return 1
+    print(f"最快: {min(results, key=lambda name: results[name][1])}")
+
+
+def cmd_clean(args):
+    from .clean_txt import main
+
+    main(args.input, args.output)
+
+
+def cmd_merge(args):
+    from .frame_to_timestamp import main
+
+    main(args.input, args.output, fps=args.fps, similarity_threshold=args.threshold, video_path=args.video)
+
+
+def cmd_frames_import(args):
+    from .frame_store import tsv_to_store
+
+    tsv_to_store(args.input, args.output or f"{args.input.rsplit('.', 1)[0]}.frames")
+
+
+def cmd_frames_export(args):
+    from .frame_store import store_to_tsv
+
+    store_to_tsv(args.input, args.output or f"{args.input.rstrip('/').rsplit('.', 1)[0]}.txt")
+
+
+def video_fps(args, default: float) -> float:
+    """
+    --fps 優先；否則以 --video 影格索引的幀率為準，兩者都沒有時沿用 default 並提示
+    """
+    if args.fps:
+        return args.fps
+    if args.video:
+        from .frame_index import load_frame_index
+
+        return load_frame_index(args.video).fps
+    logger.warning(f"未指定 --fps 或 --video，以 {default} fps 計算時間碼")
+    return default
+
+
+def cmd_sweep(args):
+    from .sweep import clip_reference, format_report, load_frame_results, read_cues, sweep
+
+    index = None
+    if args.video:
+        from .frame_index import load_frame_index
+
+        index = load_frame_index(args.video)
+    runs = load_frame_results(args.input, fps=args.fps, index=index)
+    if args.time_adjustment:
+        runs = [(start + args.time_adjustment, end + args.time_adjustment, text, count)
+                for start, end, text, count in runs]
+    reference = clip_reference(read_cues(args.reference), runs)
+    if not reference:
+        logger.error(f"參考字幕 {args.reference} 與逐格結果的時間範圍沒有重疊")
+        return 1
+    grid = {name: values for name, values in (("similarity_threshold", args.thresholds),
+                                              ("window", args.windows), ("min_length", args.min_lengths))
+            if values}
+    results = sweep(runs, reference, grid, workers=args.workers)
+    print(format_report(results, args.top))
+    best = results[0]["params"]
+    print(f"最佳參數: --merge-threshold {best['similarity_threshold']} --merge-window {best['window']} "
+          f"--min-length {best['min_length']}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.output:
+        from .subtitles import SubtitleWriter, format_time
+
+        with SubtitleWriter(args.output, **best) as writer:
+            for start, end, text, count in runs:
+                writer.feed(format_time(start), format_time(end), text, count)
+        logger.info(f"最佳參數的字幕已儲存至 {args.output}")
+
+
+def cmd_timecode(args):
+    from . import timecode
+
+    if args.method != "group":
+        args.fps = video_fps(args, 30)
+    if args.method == "group":
+        timecode.group_similar_frames(args.input, args.output, similarity_threshold=args.threshold)
+    elif args.method == "exact":
+        timecode.process_ocr_to_subtitle(args.input, args.output, fps=args.fps)
+    else:
+        timecode.merge_similar_file(args.input, args.output, similarity_threshold=args.threshold, fps=args.fps)
+
+
+def cmd_changes(args):
+    from .change_detection import detect_changes
+
+    detect_changes(args.video, args.output, region=auto_region(args, args.region))
+
+
+def cmd_calibrate(args):
+    from .calibration import calibrate_regions
+
+    regions = calibrate_regions(args.video, samples=args.calibration_samples, skip_start=args.skip_start,
+                                skip_end=args.skip_end, cache_path=None if args.no_region_cache else args.region_cache,
+                                max_regions=args.max_regions)
+    for y1, y2, x1, x2 in regions:
+        print(f"{y1} {y2} {x1} {x2}")
+    return 0 if regions else 1
+
+
+def cmd_grab_frame(args):
+    from .frame_grabber import save_frame
+
+    save_frame(args.video, args.index, args.output)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="subtitle-extractor", description="擷取影片內嵌字幕的工具集")
+    parser.add_argument("-v", "--verbose", action="store_true", help="輸出 DEBUG 等級的紀錄")
+    parser.add_argument("--metrics-json", help="執行結束時將各階段指標輸出為 JSON 摘要")
+    parser.add_argument("--metrics-prom", help="執行結束時將指標輸出為 Prometheus textfile")
+    parser.add_argument("--metrics-interval", type=float, default=0,
+                        help="執行期間每隔幾秒更新一次指標檔 (0 表示只在結束時輸出)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("extract", help="以 FFmpeg + PaddleOCR 擷取字幕並輸出 VTT")
+    p.add_argument("video", help="影片路徑")
+    p.add_argument("-o", "--output", help="輸出 VTT 路徑 (預設與影片同名)")
+    add_extract_options(p)
+    p.add_argument("--journal", help="影格結果日誌路徑 (預設為輸出檔名加 .journal)")
+    p.add_argument("--no-journal", action="store_true", help="不寫入影格結果日誌")
+    p.add_argument("--resume", action="store_true", help="從上次中斷時的日誌繼續處理")
+    p.add_argument("--frames-folder", help="除錯用：將影格輸出為 PNG 至此資料夾後再辨識")
+    p.set_defaults(func=cmd_extract)
+
+    p = subparsers.add_parser("queue", help="以 SQLite 工作佇列批次處理多支影片 (可多個 worker / 多台主機)")
+    queue_parsers = p.add_subparsers(dest="queue_command", required=True)
+    q = queue_parsers.add_parser("add", help="將影片加入佇列")
+    q.add_argument("videos", nargs="+", help="影片路徑")
+    q.add_argument("--db", default=DEFAULT_JOB_DB, help="工作佇列資料庫")
+    q.add_argument("--output-dir", help="輸出 VTT 的資料夾 (預設與影片相同位置)")
+    q.add_argument("--shard-seconds", type=float, help="每段工作的影片秒數 (未指定時整支影片為一筆工作)")
+    q.add_argument("--max-attempts", type=int, default=3, help="每筆工作最多嘗試次數")
+    add_extract_options(q)
+    q.set_defaults(func=cmd_queue_add)
+    q = queue_parsers.add_parser("worker", help="領取並執行佇列中的工作")
+    q.add_argument("--db", default=DEFAULT_JOB_DB, help="工作佇列資料庫")
+    q.add_argument("--workers", type=int, default=1, help="在本機啟動的 worker 行程數")
+    q.add_argument("--lease", type=float, default=60.0, help="工作租約秒數 (每 1/3 租約心跳一次)")
+    q.add_argument("--poll", type=float, default=5.0, help="沒有可執行工作時的輪詢間隔秒數")
+    q.add_argument("--backoff", type=float, default=30.0, help="失敗重試的基本退避秒數 (每次加倍)")
+    q.add_argument("--keep-running", action="store_true", help="佇列清空後繼續等待新工作")
+    q.set_defaults(func=cmd_queue_worker)
+    q = queue_parsers.add_parser("status", help="列出工作狀態")
+    q.add_argument("--db", default=DEFAULT_JOB_DB, help="工作佇列資料庫")
+    q.add_argument("--status", choices=("queued", "running", "done", "failed"), help="只列出此狀態的工作")
+    q.set_defaults(func=cmd_queue_status)
+    q = queue_parsers.add_parser("retry", help="將失敗的工作重新排入佇列")
+    q.add_argument("ids", nargs="*", type=int, help="工作編號 (預設為全部失敗的工作)")
+    q.add_argument("--db", default=DEFAULT_JOB_DB, help="工作佇列資料庫")
+    q.set_defaults(func=cmd_queue_retry)
+
+    p = subparsers.add_parser("frame-ocr", help="逐格辨識字幕區域，輸出 frame<TAB>字幕")
+    p.add_argument("video", help="影片路徑")
+    p.add_argument("-o", "--output", default="ocr_output.txt",
+                   help="輸出文字檔 (以 .frames 結尾時寫入欄式 frame store)")
+    p.add_argument("--region", type=int, nargs=4, metavar=("Y1", "Y2", "X1", "X2"), default=(890, 990, 0, 1920),
+                   help="字幕區域")
+    add_ocr_backend_arguments(p, "--engine", "OCR 引擎 (auto 表示量測後選用最快者)")
+    p.add_argument("--confidence", type=float, default=0.7, help="信心分數閾值 (0~1)，低於此值的文字行不納入")
+    p.add_argument("--save-dir", default="output_frames", help="處理後圖像的輸出資料夾")
+    p.add_argument("--save-every", type=int, default=50, help="每幾幀保存一次處理後圖像 (0 表示不保存)")
+    add_text_presence_arguments(p)
+    add_calibration_arguments(p)
+    p.set_defaults(func=cmd_frame_ocr)
+
+    p = subparsers.add_parser("ocr-daemon", help="常駐的 OCR daemon：模型只載入一次，供多個擷取工作共用")
+    p.add_argument("action", nargs="?", choices=("start", "stop", "status"), default="start",
+                   help="start: 在前景啟動；stop: 停止執行中的 daemon；status: 顯示使用狀況")
+    p.add_argument("--ocr-socket", help="socket 路徑 (預設在 $XDG_RUNTIME_DIR 或暫存資料夾)")
+    p.add_argument("--instances", type=int, default=1, help="載入的 OCR 後端實例數 (可同時辨識的請求數)")
+    p.add_argument("--threads", type=int, help="每個實例使用的 CPU 執行緒數")
+    add_ocr_backend_arguments(p)
+    p.set_defaults(func=cmd_ocr_daemon)
+
+    p = subparsers.add_parser("ocr-bench", help="量測各 OCR 後端在這台機器上的辨識速度")
+    p.add_argument("video", nargs="?", help="取樣字幕區塊的影片 (未指定時使用合成的字幕區塊)")
+    p.add_argument("--backends", nargs="+", choices=("paddle", "tesseract", "onnx", "stub"),
+                   help="要量測的後端 (預設為 stub 以外的全部)")
+    p.add_argument("--crop", type=int, nargs=4, metavar=("Y1", "Y2", "X1", "X2"), default=DEFAULT_CROP_AREA,
+                   help="字幕區域")
+    p.add_argument("--gray", action="store_true", help="字幕區塊轉為灰階")
+    p.add_argument("--samples", type=int, default=16, help="字幕區塊數")
+    p.add_argument("--batch-size", type=int, default=1, help="每次 OCR 呼叫合併的字幕區塊數")
+    p.add_argument("--repeat", type=int, default=3, help="重複次數 (取最快)")
+    add_ocr_backend_arguments(p, flag=None)
+    add_calibration_arguments(p)
+    p.set_defaults(func=cmd_ocr_bench)
+
+    p = subparsers.add_parser("clean", help="清洗 OCR 文字，只保留中文字")
+    p.add_argument("input", nargs="?", default="ocr_output.txt", help="原始 OCR 文字檔")
+    p.add_argument("-o", "--output", default="cleaned_ocr_output.txt", help="清洗後的文字檔")
+    p.set_defaults(func=cmd_clean)
+
+    p = subparsers.add_parser("sweep", help="以已儲存的逐格 OCR 結果重跑字幕合併，掃描參數並以參考字幕評分排名")
+    p.add_argument("input", help="extract 的日誌 (.journal)、frame store 資料夾或 frame<TAB>字幕 文字檔")
+    p.add_argument("--reference", default="apple.srt", help="參考字幕 (SRT / VTT)")
+    p.add_argument("--fps", type=float, help="frame store / 文字檔的影片幀率 (日誌不需要；預設取自 --video)")
+    p.add_argument("--video", help="原始影片，以其影格索引的精確 PTS 計算 frame store / 文字檔的時間")
+    p.add_argument("--time-adjustment", type=float, default=0.0, help="逐格結果時間的位移秒數")
+    p.add_argument("--thresholds", type=float, nargs="+", help="相似度閾值候選值 (預設 0.1 ~ 0.8)")
+    p.add_argument("--windows", type=int, nargs="+", help="比對窗口候選值 (預設 1 3 5)")
+    p.add_argument("--min-lengths", type=int, nargs="+", help="最短字數候選值 (預設 0 2 4)")
+    p.add_argument("--workers", type=int, help="平行計算的行程數 (預設為 CPU 核心數)")
+    p.add_argument("--top", type=int, default=20, help="報告列出的名次數 (0 表示全部)")
+    p.add_argument("--report", help="將完整結果寫成 JSON")
+    p.add_argument("-o", "--output", help="以最佳參數輸出字幕檔 (.srt 或 .vtt)")
+    p.set_defaults(func=cmd_sweep)
+
+    p = subparsers.add_parser("merge", help="將 frame<TAB>字幕 合併為 SRT")
+    p.add_argument("input", nargs="?", default="cleaned_ocr_output.txt",
+                   help="frame<TAB>字幕 文字檔或 frame store 資料夾")
+    p.add_argument("-o", "--output", default="output_subtitles.srt", help="輸出 SRT 路徑")
+    p.add_argument("--fps", type=float, help="影片幀率 (預設取自 --video 的影格索引，都沒有時為 29)")
+    p.add_argument("--video", help="原始影片，以其影格索引的精確 PTS 計算時間")
+    p.add_argument("--threshold", type=float, default=0.4, help="相似度閾值")
+    p.set_defaults(func=cmd_merge)
+
+    p = subparsers.add_parser("frames", help="frame<TAB>字幕 文字檔與欄式 frame store (.frames) 互相轉換")
+    frames_parsers = p.add_subparsers(dest="frames_command", required=True)
+    q = frames_parsers.add_parser("import", help="文字檔轉為 frame store")
+    q.add_argument("input", help="frame<TAB>字幕 文字檔")
+    q.add_argument("-o", "--output", help="frame store 資料夾 (預設為同名的 .frames)")
+    q.set_defaults(func=cmd_frames_import)
+    q = frames_parsers.add_parser("export", help="frame store 轉為文字檔")
+    q.add_argument("input", help="frame store 資料夾")
+    q.add_argument("-o", "--output", help="輸出文字檔 (預設為同名的 .txt)")
+    q.set_defaults(func=cmd_frames_export)
+
+    p = subparsers.add_parser("timecode", help="將 \"frame 文字\" 合併為時間碼段落")
+    p.add_argument("input", help="\"frame 文字\" 文字檔")
+    p.add_argument("-o", "--output", default="timecode.txt", help="輸出路徑")
+    p.add_argument("--method", choices=("group", "exact", "similar"), default="similar",
+                   help="group: 輸出 frame 區間；exact: 文字完全相同才合併；similar: 相似文字合併為時間碼")
+    p.add_argument("--fps", type=float, help="影片幀率 (預設取自 --video 的影格索引，都沒有時為 30)")
+    p.add_argument("--video", help="原始影片，以其影格索引取得幀率")
+    p.add_argument("--threshold", type=float, default=None, help="相似度閾值 (group 預設 0.25，similar 預設 0.7)")
+    p.set_defaults(func=cmd_timecode)
+
+    p = subparsers.add_parser("changes", help="記錄字幕區域發生變化的影格編號")
+    p.add_argument("video", help="影片路徑")
+    p.add_argument("-o", "--output", default="apple_idx.txt", help="輸出文字檔")
+    p.add_argument("--region", type=int, nargs=4, metavar=("Y1", "Y2", "X1", "X2"),
+                   help="字幕區域 (預設為畫面下方的固定比例範圍)")
+    add_calibration_arguments(p)
+    p.set_defaults(func=cmd_changes)
+
+    p = subparsers.add_parser("calibrate", help="取樣影格找出字幕區域，輸出 Y1 Y2 X1 X2")
+    p.add_argument("video", help="影片路徑")
+    p.add_argument("--skip-start", type=float, default=0, help="略過開頭秒數")
+    p.add_argument("--skip-end", type=float, default=0, help="略過結尾秒數")
+    p.add_argument("--max-regions", type=int, default=2, help="最多輸出幾個字幕區域")
+    p.add_argument("--calibration-samples", type=int, default=36, help="取樣的影格數")
+    p.add_argument("--region-cache", default=DEFAULT_REGION_CACHE, help="字幕區域校正結果快取檔")
+    p.add_argument("--no-region-cache", action="store_true", help="不讀寫字幕區域快取")
+    p.set_defaults(func=cmd_calibrate)
+
+    p = subparsers.add_parser("grab-frame", help="將指定影格存成圖片")
+    p.add_argument("video", help="影片路徑")
+    p.add_argument("index", type=int, help="影格編號")
+    p.add_argument("-o", "--output", help="輸出圖片路徑 (預設 frame_<index>.jpg)")
+    p.set_defaults(func=cmd_grab_frame)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "timecode" and args.threshold is None:
+        args.threshold = 0.25 if args.method == "group" else 0.7
+    metrics_enabled = bool(args.metrics_json or args.metrics_prom)
+    setup_logging(args.verbose, metrics=metrics_enabled)
+    if not metrics_enabled:
+        return args.func(args) or 0
+
+    from .metrics import MetricsReporter, enable_metrics
+
+    enable_metrics()
+    reporter = MetricsReporter(args.metrics_json, args.metrics_prom, args.metrics_interval).start()
+    try:
+        return args.func(args) or 0
+    finally:
+        reporter.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1019 @@
+import os
+import re
+import math
+import cv2
+import ffmpeg
+import logging
+import time
+import queue
+import threading
+import numpy as np
+from collections import deque
+from contextlib import ExitStack, nullcontext
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from .ocr_engine import (ocr_batch, timed_ocr_batch, lines_to_text, create_process_pool, use_backend,
+                         backend_config, connect_daemon, current_config, config_fingerprint)
+from .ocr_cache import OCRCache
+from .journal import FrameJournal
+from .subtitles import format_time, generate_vtt, SubtitleWriter
+from .change_detection import ChangeDetector
+from .calibration import calibrate_regions, sample_frames
+from .refine import BoundaryRefiner, refine_subtitles
+from .preprocess import FramePreprocess
+from .text_presence import TextPresenceDetector
+from .frame_index import FrameIndex, load_frame_index
+from .frame_ring import FrameRing, ocr_slots
+from .metrics import METRICS, enable_metrics
+
+logger = logging.getLogger(__name__)
+
+def crop_frame(img, crop_area: tuple):
+    """
+    依裁切區域 (y1, y2, x1, x2) 取出字幕區塊，crop_area 為 None 時回傳整張影格
+    """
+    if crop_area is None:
+        return img
+    y1, y2, x1, x2 = crop_area
+    return img[y1:y2, x1:x2]
+
+def ocr_image(image, crop_area: tuple) -> str:
+    """
+    使用 PaddleOCR 辨識字幕，image 可為圖片路徑或已解碼的 NumPy 影格，
+    支援傳入裁切區域 (格式： (y1, y2, x1, x2))
+    """
+    if isinstance(image, str):
+        image_path = image
+        try:
+            img = cv2.imread(image_path)
+            if img is None:
+                logger.warning(f"無法讀取圖片或圖片不存在: {image_path}")
+                return ""
+        except Exception as e:
+            logger.error(f"讀取圖片時發生錯誤 {image_path}: {e}")
+            return ""
+    else:
+        image_path = "<memory>"
+        img = image
+
+    try:
+        cropped_img = crop_frame(img, crop_area)
+        # OCR 後端在第一次呼叫時才載入 (見 ocr_engine.get_ocr)，有連線 OCR daemon 時交給 daemon
+        text = lines_to_text(ocr_batch([cropped_img])[0])
+        if text:
+            logger.debug(f"OCR 結果: {text}")
+        return text if text else ""
+    except Exception as e:
+        logger.error(f"OCR 辨識失敗 {image_path}: {e}")
+        return ""
+
+def frame_subtitle(idx: int, pts: float, text: str, fps: float, time_adjustment: float):
+    """
+    將單一影格的 OCR 結果轉為 (idx, start_time_str, end_time_str, text)
+    pts 為該影格的實際顯示時間 (秒)，結束時間以擷取間隔推算
+    """
+    frame_interval = 1 / fps
+    start_sec = pts + time_adjustment
+    end_sec = start_sec + frame_interval
+    return (idx, format_time(start_sec), format_time(end_sec), text)
+
+def prefetch_frames(frames, size: int = 32):
+    """
+    在背景執行緒迭代 frames (解碼與前處理)，經由容量 size 的佇列交給呼叫端，
+    解碼與 OCR 的送出 / 取回重疊進行；佇列滿了解碼就暫停 (背壓)，最多只暫存 size 張影格
+    呼叫端提前結束時通知背景執行緒停止，並由該執行緒關閉 frames (例如結束 FFmpeg 行程)
+    """
+    buffer = queue.Queue(maxsize=max(1, size))
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for frame in frames:
+                if not put(frame):
+                    break
+        except BaseException as e:
+            put((done, e))
+            return
+        finally:
+            close = getattr(frames, "close", None)
+            if close is not None:
+                close()
+        put((done, None))
+
+    thread = threading.Thread(target=produce, name="frame-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item[0] is done:
+                if item[1] is not None:
+                    raise item[1]
+                return
+            METRICS.set("queue_depth", buffer.qsize(), queue="decode")
+            yield item
+    finally:
+        stop.set()
+        thread.join(timeout=10)
+
+class FrameStream:
+    """
+    tee_frames 分給單一消費者的影格迭代器；close() 表示不再讀取，之後的影格不再放入這個佇列
+    """
+
+    def __init__(self, buffer: queue.Queue, closed: threading.Event, done):
+        self.buffer = buffer
+        self.closed = closed
+        self.done = done
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self.buffer.get()
+                if item[0] is self.done:
+                    if item[1] is not None:
+                        raise item[1]
+                    return
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        self.closed.set()
+
+def tee_frames(frames, count: int, size: int = 8) -> list:
+    """
+    將同一個影格來源分給 count 個消費者 (各自在不同執行緒中迭代)，回傳 count 個 FrameStream
+    背景執行緒讀取 frames，每張影格 (同一個陣列，不複製) 放入每個消費者容量 size 的佇列；
+    任一佇列滿了就暫停讀取，解碼速度由最慢的消費者決定，暫存的影格最多 count * size 張
+    """
+    buffers = [queue.Queue(maxsize=max(1, size)) for _ in range(count)]
+    closed = [threading.Event() for _ in range(count)]
+    done = object()
+
+    def put(position, item):
+        while not closed[position].is_set():
+            try:
+                buffers[position].put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce():
+        error = None
+        try:
+            for frame in frames:
+                if all(event.is_set() for event in closed):
+                    break
+                for position in range(count):
+                    put(position, frame)
+        except Exception as e:
+            error = e
+        finally:
+            close = getattr(frames, "close", None)
+            if close is not None:
+                close()
+        for position in range(count):
+            put(position, (done, error))
+
+    threading.Thread(target=produce, name="frame-tee", daemon=True).start()
+    return [FrameStream(buffer, event, done) for buffer, event in zip(buffers, closed)]
+
+def process_frames(frames, fps: float, time_adjustment: float, crop_area: tuple, max_workers: int,
+                   detect_changes: bool = True, executor_type: str = "thread", chunk_size: int = 16,
+                   batch_size: int = 1, batch_wait: float = 0.5, cache: OCRCache = None,
+                   journal: FrameJournal = None, frame_results: list = None,
+                   text_detector: TextPresenceDetector = None, max_pending: int = None, sink=None,
+                   executor=None, ocr_config: dict = None, shared_memory: bool = True, ocr_stream: str = None):
+    """
+    OCR 辨識影格並整理字幕資訊，平行處理以提升效能
+    frames 為 (idx, pts, frame) 的迭代器，可來自 iter_frames 或 iter_frames_from_folder
+    detect_changes 開啟時，字幕區域與上一次 OCR 的畫面相同就直接沿用上一次的結果
+    executor_type:
+      - "thread": 多執行緒共用同一個 PaddleOCR 實例 (適合 GPU)
+      - "process": 多行程，每個 worker 各自載入模型並固定執行緒數，
+                   字幕區塊每 chunk_size 張打包送出，結果依原順序取回 (適合純 CPU 主機)
+    batch_size > 1 時每 batch_size 張字幕區塊合併為一次偵測 + 辨識呼叫 (見 ocr_engine.recognize_batch)，
+    湊批最多等待 batch_wait 秒，超過就直接送出以限制延遲
+    cache 為 OCRCache 時，內容相同的字幕區塊直接取用快取結果，新的辨識結果也會寫回快取
+    結果依影格順序一完成就取出，若有 journal 會同時寫入日誌，中斷後可從日誌續跑
+    尚未取回結果的影格超過 max_pending 張 (預設為 max(64, 4 * max_workers * chunk_size)) 時，
+    先等最早的結果完成才讀取下一張影格，送出但未完成的字幕區塊有上限，記憶體用量不隨影片長度增加
+    sink 為 callable 時，每張有文字影格的 (start_time, end_time, text) 依序交給 sink (例如 SubtitleWriter.feed)，
+    不累積在回傳的 list 中 (此時回傳空 list)
+    executor 為共用的執行器時 (例如多個字幕區域共用一個行程池) 直接使用且不關閉，executor_type 不使用；
+    ocr_config 為這些字幕區塊使用的 OCR 後端設定 (見 ocr_engine.ocr_batch)，None 表示目前行程的設定
+    ocr_stream 為這些字幕區塊所屬的字幕串流名稱 (多個字幕區域時為區域名稱)，版面快取依此分開記錄文字框
+    使用行程池且 shared_memory=True 時，字幕區塊寫入 FrameRing 的 slot 交給 worker 原地讀取，不經 pickle 傳送；
+    slot 數為 (max_workers + 1) * chunk_size (不超過 max_pending)，用完時等 worker 釋放
+    frame_results 為 list 時，每張影格 (含沒有文字的) 的 (idx, pts, lines) 也會依序加入其中
+    text_detector 為 TextPresenceDetector 時，判定沒有文字的字幕區塊直接視為空白，不查快取也不送 OCR
+    啟用 metrics 時記錄前處理 / OCR 延遲、快取命中、略過影格、佇列深度與 worker 使用率
+    """
+    if executor is not None:
+        owned_executor = nullcontext(executor)
+        if not isinstance(executor, ProcessPoolExecutor):
+            chunk_size = batch_size
+    elif executor_type == "process":
+        executor = owned_executor = create_process_pool(max_workers)
+    elif executor_type == "thread":
+        executor = owned_executor = ThreadPoolExecutor(max_workers=max_workers)
+        chunk_size = batch_size
+    else:
+        raise ValueError(f"未知的 executor_type: {executor_type}")
+    if max_pending is None:
+        max_pending = max(64, 4 * max_workers * chunk_size)
+    use_ring = shared_memory and isinstance(executor, ProcessPoolExecutor)
+    ring = None
+    chunk_ring = []
+    # 還在讀取 FrameRing slot 的批次；結束 (含例外) 時先取消並等它們完成，才關閉並釋放 shared memory
+    ring_futures = set()
+
+    detector = ChangeDetector() if detect_changes else None
+    pending = deque()
+    subtitles = []
+    chunk = []
+    chunk_slots = []
+    last_slot = None
+    chunk_started = 0.0
+    ocr_calls = 0
+    frame_count = 0
+    subtitle_count = 0
+    started = time.monotonic()
+
+    def record_batch(future):
+        # 在完成 OCR 的執行緒上呼叫，只記錄 worker 內實際辨識的時間 (不含排隊)
+        if future.cancelled() or future.exception() is not None:
+            return
+        seconds = future.result()[1]
+        METRICS.observe("stage_seconds", seconds, stage="ocr")
+        METRICS.inc("worker_busy_seconds_total", seconds)
+        elapsed = time.monotonic() - started
+        if elapsed > 0:
+            METRICS.set("worker_utilization", METRICS.value("worker_busy_seconds_total") / (elapsed * max_workers))
+
+    def drain(wait: bool, limit: int = 0):
+        # 依影格順序取出已完成的結果；尚在湊批或辨識中的影格會擋住後面的影格
+        # wait=True 時等到未取回的影格不超過 limit 張
+        nonlocal subtitle_count
+        while len(pending) > (limit if wait else 0):
+            idx, pts, slot = pending[0]
+            future, position, cache_key = slot
+            if future is None or (not wait and not future.done()):
+                return
+            pending.popleft()
+            try:
+                lines = future.result()[0][position]
+            except Exception as e:
+                logger.error(f"處理影格 {idx} 時發生錯誤: {e}")
+                continue
+            if cache_key is not None:
+                cache.put(cache_key, lines)
+                slot[2] = None
+            if journal is not None:
+                journal.append(idx, pts, lines)
+            if frame_results is not None:
+                frame_results.append((idx, pts, lines))
+            text = lines_to_text(lines)
+            if text:
+                subtitle = frame_subtitle(idx, pts, text, fps, time_adjustment)
+                subtitle_count += 1
+                if sink is not None:
+                    sink(*subtitle[1:])
+                else:
+                    subtitles.append(subtitle)
+
+    def finish_ring_chunks():
+        futures = list(ring_futures)
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        # 尚未送出的批次佔用的 slot 沒有 worker 會讀取
+        ring.release(chunk_ring)
+        chunk_ring.clear()
+
+    with owned_executor, ExitStack() as cleanup:
+        def submit_chunk():
+            in_ring = bool(chunk_ring)
+            if in_ring:
+                # chunk 中是 FrameRing 的 (slot, 形狀)，worker 辨識完成後回收 slot
+                future = executor.submit(ocr_slots, ring.name, ring.slot_bytes, list(chunk), batch_size, ocr_config,
+                                         ocr_stream)
+                future.add_done_callback(lambda _future, slots=list(chunk_ring): ring.release(slots))
+                ring_futures.add(future)
+                future.add_done_callback(ring_futures.discard)
+                chunk_ring.clear()
+            else:
+                future = executor.submit(timed_ocr_batch, list(chunk), batch_size, ocr_config, ocr_stream)
+            if METRICS.enabled:
+                METRICS.inc("ocr_calls_total")
+                METRICS.inc("ocr_crops_total", len(chunk))
+                if isinstance(executor, ProcessPoolExecutor):
+                    # 送給 worker 的字幕區塊位元組數 (shm: 寫入 slot，pickle: 序列化後經 pipe 傳送)
+                    METRICS.inc("ocr_ipc_bytes_total",
+                                sum(int(np.prod(item[1])) if in_ring else item.nbytes for item in chunk),
+                                transport="shm" if in_ring else "pickle")
+                future.add_done_callback(record_batch)
+            for slot in chunk_slots:
+                slot[0] = future
+            chunk.clear()
+            chunk_slots.clear()
+
+        for idx, pts, frame in frames:
+            frame_count += 1
+            preprocess_started = time.perf_counter()
+            # 只保留字幕區塊的複本，讓整張影格可以盡早釋放
+            cropped_img = np.ascontiguousarray(crop_frame(frame, crop_area))
+            if last_slot is None or detector is None or detector.is_changed(cropped_img):
+                # slot = [該區塊所屬批次的 future, 在批次中的位置, 待寫入的快取鍵]
+                no_text = text_detector is not None and not text_detector.has_text(cropped_img)
+                cache_key = cache.key(cropped_img) if cache is not None and not no_text else None
+                cached_lines = cache.get(cache_key) if cache_key is not None else None
+                if no_text:
+                    empty = Future()
+                    empty.set_result(([[]], 0.0))
+                    last_slot = [empty, 0, None]
+                    METRICS.inc("frames_no_text_total")
+                elif cached_lines is not None:
+                    cached = Future()
+                    cached.set_result(([cached_lines], 0.0))
+                    last_slot = [cached, 0, None]
+                    METRICS.inc("cache_requests_total", result="hit")
+                else:
+                    if cache_key is not None:
+                        METRICS.inc("cache_requests_total", result="miss")
+                    if use_ring and ring is None:
+                        ring = cleanup.enter_context(
+                            FrameRing(min(max_pending, (max_workers + 1) * chunk_size), cropped_img.shape))
+                        # ExitStack 後進先出：在 ring 關閉前執行 (executor 要到 with 結束才關閉)
+                        cleanup.callback(finish_ring_chunks)
+                    in_ring = use_ring and ring.fits(cropped_img)
+                    if chunk and in_ring != bool(chunk_ring):
+                        # 同一批中不混用 shared memory 與 pickle
+                        submit_chunk()
+                    ring_slot = ring.acquire(block=False) if in_ring else None
+                    if in_ring and ring_slot is None:
+                        # slot 用完：先送出湊到一半的批次，再等 worker 釋放
+                        if chunk:
+                            submit_chunk()
+                        ring_slot = ring.acquire()
+                    if not chunk:
+                        chunk_started = time.monotonic()
+                    last_slot = [None, len(chunk), cache_key]
+                    if in_ring:
+                        chunk.append(ring.write(ring_slot, cropped_img))
+                        chunk_ring.append(ring_slot)
+                    else:
+                        chunk.append(cropped_img)
+                    chunk_slots.append(last_slot)
+                    ocr_calls += 1
+            else:
+                METRICS.inc("frames_skipped_total")
+            METRICS.observe("stage_seconds", time.perf_counter() - preprocess_started, stage="preprocess")
+            if chunk and (len(chunk) >= chunk_size or time.monotonic() - chunk_started >= batch_wait):
+                submit_chunk()
+            pending.append((idx, pts, last_slot))
+            if len(pending) > max_pending:
+                # 背壓：送出湊到一半的批次，等最早的結果完成後才繼續讀取影格
+                if chunk:
+                    submit_chunk()
+                drain(wait=True, limit=max_pending)
+            else:
+                drain(wait=False)
+            METRICS.set("queue_depth", len(pending), queue="pending")
+        if chunk:
+            submit_chunk()
+        drain(wait=True)
+
+    # 移除排序用的 index，只保留 (start_time, end_time, text)
+    final_subtitles = [(sub[1], sub[2], sub[3]) for sub in subtitles]
+    if detector is not None:
+        logger.info(f"變化偵測：略過 {detector.skipped} 次 OCR")
+    if text_detector is not None:
+        logger.info(f"文字偵測：{text_detector.empty} 張字幕區塊判定為沒有文字，略過 OCR")
+    logger.info(f"實際執行 OCR {ocr_calls} 次")
+    METRICS.inc("media_seconds_total", frame_count / fps)
+    logger.info(f"完成處理 {frame_count} 張影格，產生 {subtitle_count} 筆字幕")
+    return final_subtitles
+
+def iter_frames(video_path: str, fps: int, skip_start: float, skip_end: int, duration: float,
+                width: int, height: int, start_time: float = 0.0, first_idx: int = 0,
+                preprocess: FramePreprocess = None, index: FrameIndex = None):
+    """
+    以 FFmpeg rawvideo 管線逐格讀取影格，不經過磁碟
+    產生 (idx, pts, frame)：pts 取自 showinfo 濾鏡回報的實際顯示時間並加上 start_time，
+    指定 index (FrameIndex) 時再對齊到該格以 time_base 計算的精確時間，
+    frame 為 (height, width, 3) 的 BGR NumPy 陣列，idx 由 first_idx 起算
+    指定 preprocess 時裁切 / 灰階 / 縮放 / 二值化在 FFmpeg 濾鏡圖中完成，
+    frame 改為處理後的字幕區塊 (灰階時為 2 維陣列)，管線只傳送這一小塊
+    """
+    logger.info(f"開始以記憶體模式解碼影片: {video_path}")
+    logger.info(f"FPS={fps}, skip_start={skip_start}, skip_end={skip_end}, 解析度={width}x{height}")
+    end_time = max(0, duration - skip_end)
+    stream = (
+        ffmpeg
+        .input(video_path, ss=skip_start, to=end_time)
+        # 每個 1/fps 時間格取第一張影格；fps 濾鏡會取每格的最後一張並改寫成格點時間，
+        # 回報的時間最多比畫面早半個擷取間隔，select 則保留原始 PTS
+        .filter("select", f"isnan(prev_selected_t)+gt(floor((t+0.0005)*{fps}),floor((prev_selected_t+0.0005)*{fps}))")
+    )
+    if preprocess is not None:
+        # 只對選中的影格做前處理
+        stream = preprocess.apply_filters(stream, width, height)
+        out_width, out_height = preprocess.output_size(width, height)
+        shape = (out_height, out_width) if preprocess.channels == 1 else (out_height, out_width, 3)
+        pix_fmt = preprocess.pix_fmt
+        logger.info(f"FFmpeg 前處理: {preprocess}，每格 {preprocess.frame_bytes(width, height)} bytes "
+                    f"(原始 {width * height * 3} bytes)")
+    else:
+        shape = (height, width, 3)
+        pix_fmt = "bgr24"
+    process = (
+        stream
+        .filter("showinfo")
+        .output("pipe:", format="rawvideo", pix_fmt=pix_fmt, vsync="vfr")
+        .global_args("-nostdin", "-nostats")
+        .run_async(pipe_stdout=True, pipe_stderr=True)
+    )
+
+    # showinfo 的輸出寫在 stderr，另開執行緒讀取以免管線阻塞
+    pts_queue = queue.Queue()
+    stderr_lines = deque(maxlen=20)
+
+    def read_stderr():
+        pts_pattern = re.compile(r"pts_time:\s*(-?[\d.]+)")
+        for raw_line in iter(process.stderr.readline, b""):
+            line = raw_line.decode("utf-8", errors="replace")
+            match = pts_pattern.search(line) if "showinfo" in line else None
+            if match:
+                pts_queue.put(float(match.group(1)))
+            else:
+                stderr_lines.append(line)
+        pts_queue.put(None)
+
+    stderr_thread = threading.Thread(target=read_stderr, daemon=True)
+    stderr_thread.start()
+
+    frame_size = int(np.prod(shape))
+    count = 0
+    try:
+        while True:
+            read_started = time.perf_counter()
+            buffer = process.stdout.read(frame_size)
+            if len(buffer) < frame_size:
+                break
+            METRICS.observe("stage_seconds", time.perf_counter() - read_started, stage="decode")
+            METRICS.inc("frames_decoded_total")
+            METRICS.inc("decoded_bytes_total", frame_size)
+            try:
+                pts = pts_queue.get(timeout=5)
+            except queue.Empty:
+                pts = None
+            if pts is None:
+                logger.warning(f"無法取得第 {first_idx + count} 格的 PTS，改以擷取間隔推算")
+                pts = count / fps
+            pts = start_time + pts
+            if index is not None:
+                pts = index.snap(pts)
+            frame = np.frombuffer(buffer, np.uint8).reshape(shape)
+            yield first_idx + count, pts, frame
+            count += 1
+    finally:
+        process.stdout.close()
+        return_code = process.wait()
+        stderr_thread.join(timeout=5)
+        if return_code != 0:
+            logger.error(f"FFmpeg 解碼時發生錯誤: {''.join(stderr_lines)}")
+        logger.info(f"完成解碼，共 {count} 張影格")
+
+def iter_frames_from_folder(frames_folder: str, fps: float, start_time: float = 0.0, times: list = None):
+    """
+    讀取磁碟上的影格圖片 (除錯模式)，產生 (idx, pts, frame)
+    times 為每張圖片的顯示時間 (由 FrameIndex.sample 取得)；未指定或超出時 pts 以擷取間隔推算
+    """
+    logger.info(f"開始處理影格資料夾: {frames_folder}")
+    if not os.path.isdir(frames_folder):
+        logger.error(f"指定的影格資料夾不存在: {frames_folder}")
+        return
+
+    frame_files = sorted(f for f in os.listdir(frames_folder) if f.startswith("frame_"))
+    for idx, frame_file in enumerate(frame_files):
+        frame_path = os.path.join(frames_folder, frame_file)
+        img = cv2.imread(frame_path)
+        if img is None:
+            logger.warning(f"無法讀取圖片或圖片不存在: {frame_path}")
+            continue
+        yield idx, times[idx] if times is not None and idx < len(times) else start_time + idx / fps, img
+
+def prepare_frames(frames, crop_area: tuple, preprocess: FramePreprocess = None, filtered: bool = False):
+    """
+    回傳 (frames, 傳給 process_frames 的 crop_area)
+    filtered 表示影格已在 FFmpeg 濾鏡中前處理；否則 preprocess 需要灰階 / 縮放 / 二值化時在 Python 端處理
+    """
+    if filtered:
+        return frames, None
+    if preprocess is None or preprocess.identity:
+        return frames, crop_area
+    return ((idx, pts, preprocess.apply(frame)) for idx, pts, frame in frames), None
+
+def extract_frames(video_path: str, output_folder: str, fps: int, skip_start: int, skip_end: int,
+                   index: FrameIndex = None):
+    """
+    使用 FFmpeg 抽取影格至磁碟 (除錯用)，根據 skip_start 與 skip_end 調整擷取區間
+    取樣方式與 iter_frames 相同 (每個 1/fps 時間格的第一張)，抽出的圖片依序對應 index.sample 的格號
+    """
+    logger.info(f"開始從影片擷取影格: {video_path}")
+    logger.info(f"FPS={fps}, skip_start={skip_start}, skip_end={skip_end}")
+    os.makedirs(output_folder, exist_ok=True)
+    # 清除上次執行留下的影格，避免與本次結果混在一起
+    for stale_file in os.listdir(output_folder):
+        if stale_file.startswith("frame_") and stale_file.endswith(".png"):
+            os.remove(os.path.join(output_folder, stale_file))
+    
+    try:
+        index = index or load_frame_index(video_path)
+        duration = float(index.duration)
+        start_time = skip_start
+        end_time = max(0, duration - skip_end)
+        output_pattern = os.path.join(output_folder, "frame_%05d.png")
+        logger.debug(f"抽影格時間區間: {start_time} 秒 ~ {end_time} 秒, 輸出路徑模式: {output_pattern}")
+
+        (
+            ffmpeg
+            .input(video_path, ss=start_time, to=end_time)
+            .filter("select", f"isnan(prev_selected_t)+gt(floor((t+0.0005)*{fps}),floor((prev_selected_t+0.0005)*{fps}))")
+            .output(output_pattern, vsync="vfr", **{'qscale:v': 2})
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+        logger.info("完成抽取影格")
+    except ffmpeg.Error as e:
+        logger.error(f"FFmpeg 抽取影格時發生錯誤: {e.stderr.decode() if e.stderr else e}")
+        raise
+    except Exception as e:
+        logger.error(f"抽取影格過程中發生未知錯誤: {e}")
+        raise
+
+def keyframe_times(video_path: str, index: FrameIndex = None) -> list:
+    """
+    回傳關鍵影格的顯示時間 (秒)，取自影格索引 (未指定 index 時讀取或建立 sidecar 快取)；失敗時回傳空列表
+    """
+    try:
+        return (index or load_frame_index(video_path)).keyframe_times()
+    except Exception as e:
+        logger.warning(f"無法取得關鍵影格位置，改以等長切分: {e}")
+        return []
+
+def plan_chunks(start: float, end: float, fps: float, num_chunks: int, keyframes: list = None) -> list:
+    """
+    將 [start, end) 切成約 num_chunks 段，回傳 [(chunk_start, chunk_end), ...]
+    切點取在等分點之後的第一個關鍵影格，再對齊到擷取間隔的格點：
+    每段從關鍵影格附近開始解碼，且各段取樣的格點與不切段時相同
+    """
+    boundaries = [start]
+    for i in range(1, num_chunks):
+        target = start + (end - start) * i / num_chunks
+        if keyframes:
+            target = next((k for k in keyframes if k >= target), end)
+        point = start + math.ceil((target - start) * fps - 1e-6) / fps
+        if boundaries[-1] < point < end:
+            boundaries.append(point)
+    boundaries.append(end)
+    return list(zip(boundaries, boundaries[1:]))
+
+def process_chunk(video_path: str, chunk_start: float, chunk_end: float, duration: float, width: int,
+                  height: int, fps: float, start_time: float, first_idx: int, crop_area: tuple,
+                  detect_changes: bool = True, batch_size: int = 1, cache_path: str = None,
+                  preprocess: FramePreprocess = None, filter_graph: bool = False,
+                  text_detector: TextPresenceDetector = None, index: FrameIndex = None,
+                  metrics: bool = False) -> tuple:
+    """
+    在 worker 行程中解碼並辨識 [chunk_start, chunk_end) 這一段，回傳 ([(idx, pts, lines), ...], 指標)
+    超出本段最後一個擷取格點的影格屬於下一段，直接捨棄
+    metrics=True 時在本行程重新開始記錄指標，回傳這一段的 METRICS.snapshot() (否則為 None)，由主行程併入
+    """
+    if metrics:
+        enable_metrics()
+    slots = int(round((chunk_end - chunk_start) * fps))
+    frames = iter_frames(video_path, fps=fps, skip_start=chunk_start, skip_end=duration - chunk_end,
+                         duration=duration, width=width, height=height, start_time=start_time,
+                         first_idx=first_idx, preprocess=preprocess if filter_graph else None, index=index)
+    frames = (frame for frame in frames if math.floor((frame[1] - start_time + 0.0005) * fps) < slots)
+    frames, crop_area = prepare_frames(frames, crop_area, preprocess, filtered=filter_graph)
+    results = []
+    cache = OCRCache(cache_path) if cache_path else None
+    try:
+        process_frames(frames, fps, time_adjustment=0.0, crop_area=crop_area, max_workers=1,
+                       detect_changes=detect_changes, batch_size=batch_size, cache=cache,
+                       frame_results=results, text_detector=text_detector)
+    finally:
+        if cache is not None:
+            cache.close()
+    return results, METRICS.snapshot() if metrics else None
+
+def process_chunks(video_path: str, start: float, end: float, duration: float, width: int, height: int,
+                   fps: float, start_time: float, first_idx: int, crop_area: tuple, decode_workers: int,
+                   detect_changes: bool = True, batch_size: int = 1, cache_path: str = None,
+                   journal: FrameJournal = None, chunks_per_worker: int = 4, min_chunk_seconds: float = 30.0,
+                   preprocess: FramePreprocess = None, filter_graph: bool = False,
+                   text_detector: TextPresenceDetector = None, index: FrameIndex = None) -> list:
+    """
+    將 [start, end) 依關鍵影格切段，由 decode_workers 個行程各自解碼 + OCR，
+    結果依段落順序接回 (同時依序寫入 journal)，回傳 [(idx, pts, lines), ...]
+    段落比 worker 多，較早完成的 worker 會接著處理下一段；變化偵測在每段開頭重新開始，
+    跨段的字幕在合併時 (generate_vtt) 與不切段時一樣會接成同一句
+    """
+    num_chunks = max(1, min(decode_workers * chunks_per_worker, int((end - start) // min_chunk_seconds)))
+    chunks = plan_chunks(start, end, fps, num_chunks, keyframe_times(video_path, index) if num_chunks > 1 else None)
+    logger.info(f"切成 {len(chunks)} 段，以 {decode_workers} 個行程平行解碼與辨識")
+
+    results = []
+    with create_process_pool(decode_workers) as pool:
+        futures = []
+        for chunk_start, chunk_end in chunks:
+            offset = int(round((chunk_start - start) * fps))
+            futures.append(pool.submit(process_chunk, video_path, chunk_start, chunk_end, duration, width,
+                                       height, fps, start_time + (chunk_start - start), first_idx + offset,
+                                       crop_area, detect_changes, batch_size, cache_path, preprocess,
+                                       filter_graph, text_detector, index, METRICS.enabled))
+        for (chunk_start, chunk_end), future in zip(chunks, futures):
+            chunk_results, chunk_metrics = future.result()
+            if chunk_metrics is not None:
+                # worker 的 OCR / 快取 / 略過影格等指標 (含處理的影片秒數) 併入本行程
+                METRICS.merge(chunk_metrics)
+            METRICS.inc("chunks_total")
+            logger.info(f"完成 {chunk_start:.2f}~{chunk_end:.2f} 秒，共 {len(chunk_results)} 張影格")
+            if journal is not None:
+                for idx, pts, lines in chunk_results:
+                    journal.append(idx, pts, lines)
+            results.extend(chunk_results)
+    return results
+
+def region_output(output_path: str, name: str) -> str:
+    """
+    字幕區域 name 的輸出檔：<輸出檔主檔名>.<name>.<副檔名> (副檔名決定 VTT / SRT，預設 .vtt)
+    """
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.{name}{ext or '.vtt'}"
+
+def plan_tracks(regions: list, output_path: str, ocr_options: dict = None, gray: bool = False,
+                binarize_threshold: int = None, scale: float = 1.0) -> list:
+    """
+    將字幕區域設定轉為 process_tracks 使用的 track；每個區域為 dict：
+      - name: 區域名稱 (用於輸出檔名，不可重複)
+      - crop_area: (y1, y2, x1, x2)
+      - ocr_backend / ocr_options / lang (選用): 此區域的 OCR 後端、該後端的參數與語言，
+        未指定時使用目前行程的設定 (可共用 OCR daemon)
+      - output (選用): 輸出檔路徑，預設見 region_output
+    前處理 (灰階 / 二值化 / 縮放) 各區域相同
+    """
+    names = [region.get("name") for region in regions]
+    if not all(names) or len(set(names)) != len(names):
+        raise ValueError(f"字幕區域需要不重複的名稱: {names}")
+    tracks = []
+    for region in regions:
+        config = current_config()
+        if region.get("ocr_backend") or region.get("ocr_options") or region.get("lang"):
+            name = region.get("ocr_backend") or config.get("backend", "paddle")
+            if name == "auto":
+                raise ValueError(f"字幕區域 {region['name']} 不支援自動選擇 OCR 後端")
+            options = dict((ocr_options or {}).get(name, {}), **region.get("ocr_options", {}))
+            if region.get("lang"):
+                options["lang"] = region["lang"]
+            config = backend_config(name, **options)
+        crop_area = tuple(region["crop_area"])
+        tracks.append({
+            "name": region["name"],
+            "crop_area": crop_area,
+            "config": config,
+            "output": region.get("output") or region_output(output_path, region["name"]),
+            "preprocess": FramePreprocess(crop_area, gray=gray, threshold=binarize_threshold, scale=scale),
+            "text_detector": None,
+        })
+    return tracks
+
+def process_tracks(frames, tracks: list, fps: float, time_adjustment: float, max_workers: int,
+                   detect_changes: bool = True, executor_type: str = "thread", batch_size: int = 1,
+                   batch_wait: float = 0.5, cache_path: str = None, max_pending: int = None,
+                   queue_size: int = 8, merge_options: dict = None, shared_memory: bool = True) -> list:
+    """
+    同一次解碼的影格 (完整畫面) 分給多個字幕區域 (tracks，見 plan_tracks)，
+    每個區域在自己的執行緒中裁切、辨識、合併並寫出字幕檔 (process_frames + SubtitleWriter)；
+    所有區域共用同一個 OCR 執行器，各區域以自己的 OCR 設定辨識、以自己的設定作為快取鍵
+    影片只解碼一次，不必每個字幕區域各跑一次 process_video；回傳各區域的輸出檔路徑
+    merge_options 為字幕合併參數 (見 subtitles.merge_subtitles)，shared_memory 見 process_frames
+    """
+    if executor_type == "process":
+        executor = create_process_pool(max_workers)
+    elif executor_type == "thread":
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        raise ValueError(f"未知的 executor_type: {executor_type}")
+    streams = tee_frames(frames, len(tracks), queue_size)
+
+    def run(track, stream):
+        cache = None
+        try:
+            region_frames, crop_area = prepare_frames(iter(stream), track["crop_area"], track["preprocess"])
+            cache = OCRCache(cache_path, config=track["config"]) if cache_path else None
+            with SubtitleWriter(track["output"], **(merge_options or {})) as writer:
+                process_frames(region_frames, fps, time_adjustment=time_adjustment, crop_area=crop_area,
+                               max_workers=max_workers, detect_changes=detect_changes, batch_size=batch_size,
+                               batch_wait=batch_wait, cache=cache, text_detector=track["text_detector"],
+                               max_pending=max_pending, sink=writer.feed, executor=executor,
+                               ocr_config=track["config"], shared_memory=shared_memory, ocr_stream=track["name"])
+        finally:
+            stream.close()
+            if cache is not None:
+                cache.close()
+
+    logger.info(f"以一次解碼處理 {len(tracks)} 個字幕區域: {', '.join(track['name'] for track in tracks)}")
+    with executor, ThreadPoolExecutor(max_workers=len(tracks), thread_name_prefix="track") as runner:
+        futures = [runner.submit(run, track, stream) for track, stream in zip(tracks, streams)]
+        for track, future in zip(tracks, futures):
+            future.result()
+            logger.info(f"字幕區域 {track['name']} 已儲存至 {track['output']}")
+    return [track["output"] for track in tracks]
+
+def record_run_metrics(run_started: float):
+    if METRICS.enabled:
+        elapsed = time.monotonic() - run_started
+        METRICS.set("run_seconds", elapsed)
+        METRICS.set("realtime_factor", METRICS.value("media_seconds_total") / elapsed if elapsed > 0 else 0.0)
+
+def process_video(video_path: str, output_vtt: str, fps: int, skip_start: int, skip_end: int,
+                  crop_area: tuple, time_adjustment: float, max_workers: int, frames_folder: str = None,
+                  detect_changes: bool = True, executor_type: str = "thread",
+                  batch_size: int = 1, batch_wait: float = 0.5, cache_path: str = None,
+                  journal_path: str = None, resume: bool = False, auto_crop: bool = False,
+                  region_cache_path: str = None, calibration_samples: int = 36, refine: bool = False,
+                  refine_threshold: float = 0.5, decode_workers: int = 1, filter_graph: bool = False,
+                  gray: bool = False, binarize_threshold: int = None, scale: float = 1.0,
+                  skip_empty: bool = False, text_threshold: float = None, index_cache: bool = True,
+                  ocr_backend: str = None, ocr_options: dict = None, ocr_daemon: str = None,
+                  prefetch: int = 32, max_pending: int = None, regions: list = None,
+                  merge_options: dict = None, shared_memory: bool = True):
+    """
+    主流程：
+      1. 從影格索引 (frame_index.FrameIndex) 取得原始起始時間、幀率、解析度與每格的精確 PTS
+         (index_cache=True 時存成影片旁的 sidecar 檔，同一支影片之後不必再 ffprobe)。
+      2. 使用 FFmpeg 根據指定參數解碼影格；預設直接經由管線讀入記憶體，
+         指定 frames_folder 時改為先輸出 PNG 至該資料夾 (除錯用)。
+      3. 使用 PaddleOCR 辨識影格文字；字幕區域未變化的影格沿用前一次結果 (detect_changes)，
+         executor_type="process" 時以多行程執行 OCR，batch_size > 1 時多張字幕區塊合併辨識；
+         指定 cache_path 時以 OCRCache 保存辨識結果，重跑同一支影片時可跳過 OCR。
+      4. 產生 VTT 字幕檔。
+    指定 journal_path 時，每張影格的結果會寫入 FrameJournal；resume=True 且日誌參數相同時，
+    從最後一筆已寫入的影格之後繼續 (FFmpeg 先跳到前一個關鍵影格再精準解碼到該時間點)，
+    最後以日誌中的結果加上新結果產生字幕，與不中斷執行的結果相同。
+    refine=True 時以 fps 稀疏取樣後，對文字不同 (相似度低於 refine_threshold) 的相鄰取樣
+    以原始幀率二分搜尋文字改變的影格 (見 refine.BoundaryRefiner)，字幕時間精確到單一影格。
+    decode_workers > 1 時 (記憶體模式) 將影片依關鍵影格切段，由多個行程各自解碼與 OCR 後依序接回
+    (見 process_chunks)，一支長影片也能用滿所有核心；此時 max_workers / executor_type 不使用。
+    decode_workers=None 時使用本機的全部核心。
+    executor_type="process" 時字幕區塊預設經由 shared memory 環狀緩衝區交給 worker (見 frame_ring.FrameRing)，
+    shared_memory=False 時改以 pickle 傳送。
+    gray / binarize_threshold / scale 指定字幕區塊的灰階、二值化與縮放 (見 preprocess.FramePreprocess)；
+    filter_graph=True 時 (記憶體模式) 裁切與這些前處理改在 FFmpeg 濾鏡圖中完成，
+    管線只傳出字幕區塊，每格的位元組數與 Python 端的配置都少一個數量級以上。
+    skip_empty=True 時先以 TextPresenceDetector 判斷字幕區塊有無文字，沒有文字就不做 OCR；
+    門檻為 text_threshold (邊緣密度)，未指定時由 calibration_samples 張取樣影格校正。
+    ocr_backend 指定 OCR 後端 (paddle / tesseract / onnx / stub，見 ocr_backends)，ocr_options 為 {後端: 參數}；
+    "auto" 時以取樣的字幕區塊量測各後端速度，選用這台機器上最快的後端。未指定時使用目前行程的設定 (預設 PaddleOCR)。
+    ocr_daemon 為常駐 OCR daemon 的 socket 路徑 (見 ocr_daemon)：daemon 在執行且後端設定相同時
+    (ocr_backend 未指定或為 "auto" 時接受 daemon 的設定)，辨識都交給 daemon，本行程不必載入模型；
+    否則照常在本行程辨識。
+    解碼 (含 Python 端前處理) 在背景執行緒進行，最多預先讀取 prefetch 張影格 (0 表示不預讀)；
+    OCR 送出後未取回的影格最多 max_pending 張 (見 process_frames)，取回的結果依影格順序立即合併，
+    不需精修時字幕段落一結束就寫入輸出檔 (SubtitleWriter)，解碼、OCR 與合併同時進行，記憶體用量與影片長度無關。
+    regions 為多個字幕區域 (例如上下兩條字幕帶、雙語字幕，格式見 plan_tracks) 時，影片只解碼一次，
+    各區域以自己的 OCR 設定辨識並各自輸出字幕檔 (見 process_tracks)，crop_area 不使用；
+    此時不使用日誌、邊界精修、切段與影格資料夾模式。
+    merge_options 為逐格結果合併成字幕的參數 {similarity_threshold, window, min_length} (見 subtitles.merge_subtitles)，
+    可先以 sweep 模組用參考字幕掃描出最佳值。
+    auto_crop=True 時先以 calibration.calibrate_regions 取樣找出緊貼字幕的區域取代 crop_area
+    (結果快取於 region_cache_path)，區域越小偵測與辨識越快；找不到字幕帶時沿用 crop_area。
+    auto_crop 只輸出單一字幕檔，不能與 regions 同時指定 (ValueError)。
+    啟用 metrics 時另記錄整體執行秒數與即時倍率 (realtime_factor = 處理的影片秒數 / 實際耗時)。
+    回傳寫出的字幕檔路徑 (list)：單一字幕區域時為 [output_vtt]，regions 時為每個區域的輸出檔。
+    """
+    run_started = time.monotonic()
+    if decode_workers is None:
+        decode_workers = os.cpu_count() or 1
+    logger.info(f"準備處理影片: {video_path}")
+    logger.info(f"輸出字幕: {output_vtt}, 擷取 FPS={fps}")
+    
+    # 抽取影格前取得影片資訊
+    index = None
+    video_duration = None
+    width = height = None
+    original_fps = 0
+    video_start_time = 0
+    try:
+        index = load_frame_index(video_path, cache=index_cache)
+        video_duration = float(index.duration)
+        width, height = index.width, index.height
+        video_start_time = index.start_time
+        original_fps = index.fps
+        logger.info(f"原影片起始時間: {video_start_time} 秒, 原影片幀率: {index.frame_rate} ({original_fps:.3f}), "
+                    f"解析度: {width}x{height}, 共 {len(index)} 格")
+    except Exception as e:
+        logger.error(f"取得影片資訊失敗: {e}")
+
+    if auto_crop and regions:
+        raise ValueError("auto_crop 只校正單一字幕區域，不能與多個字幕區域 (regions) 同時使用")
+    if auto_crop:
+        calibrated = calibrate_regions(video_path, samples=calibration_samples, skip_start=skip_start,
+                                       skip_end=skip_end, cache_path=region_cache_path)
+        if calibrated:
+            crop_area = calibrated[0]
+            logger.info(f"使用自動校正的字幕區域: {crop_area}")
+        else:
+            logger.warning(f"自動校正失敗，沿用指定的字幕區域: {crop_area}")
+
+    preprocess = FramePreprocess(crop_area, gray=gray, threshold=binarize_threshold, scale=scale)
+    filter_graph = filter_graph and not frames_folder
+    sample_regions = None
+
+    def samples():
+        nonlocal sample_regions
+        if sample_regions is None:
+            sample_regions = [preprocess.apply(frame)
+                              for frame in sample_frames(video_path, calibration_samples, skip_start, skip_end)]
+        return sample_regions
+
+    text_detector = None
+    if skip_empty and not regions:
+        text_detector = TextPresenceDetector()
+        if text_threshold is not None:
+            text_detector.threshold = text_threshold
+        else:
+            text_detector.calibrate(samples())
+    required_config = None
+    if ocr_backend and ocr_backend != "auto":
+        required_config = backend_config(ocr_backend, **(ocr_options or {}).get(ocr_backend, {}))
+    if ocr_daemon and connect_daemon(ocr_daemon, required_config):
+        ocr_backend = current_config().get("backend")
+    elif ocr_backend:
+        ocr_backend = use_backend(ocr_backend, ocr_options, samples()[:8] if ocr_backend == "auto" else None)
+        logger.info(f"OCR 後端: {ocr_backend}")
+
+    if regions:
+        if video_duration is None or width is None:
+            raise RuntimeError(f"無法取得影片長度或解析度，無法以記憶體模式解碼: {video_path}")
+        if journal_path or refine or frames_folder or decode_workers > 1:
+            logger.info("多個字幕區域時不使用日誌、邊界精修、切段與影格資料夾模式")
+        tracks = plan_tracks(regions, output_vtt, ocr_options, gray=gray, binarize_threshold=binarize_threshold,
+                             scale=scale)
+        if skip_empty:
+            full_samples = None if text_threshold is not None else \
+                sample_frames(video_path, calibration_samples, skip_start, skip_end)
+            for track in tracks:
+                track["text_detector"] = TextPresenceDetector()
+                if full_samples is None:
+                    track["text_detector"].threshold = text_threshold
+                else:
+                    track["text_detector"].calibrate([track["preprocess"].apply(frame) for frame in full_samples])
+        frames = iter_frames(video_path, fps=fps, skip_start=skip_start, skip_end=skip_end,
+                             duration=video_duration, width=width, height=height,
+                             start_time=video_start_time + skip_start, index=index)
+        outputs = process_tracks(frames, tracks, fps, time_adjustment, max_workers, detect_changes=detect_changes,
+                                 executor_type=executor_type, batch_size=batch_size, batch_wait=batch_wait,
+                                 cache_path=cache_path, max_pending=max_pending,
+                                 queue_size=max(1, min(prefetch, 8)), merge_options=merge_options,
+                                 shared_memory=shared_memory)
+        record_run_metrics(run_started)
+        return outputs
+
+    journal = None
+    first_idx = 0
+    if journal_path:
+        journal_params = {"video_path": os.path.abspath(video_path), "fps": fps, "skip_start": skip_start,
+                          "skip_end": skip_end, "crop_area": list(crop_area) if crop_area else None}
+        if not preprocess.identity:
+            journal_params["preprocess"] = preprocess.params()
+        # 影響逐格結果的設定：OCR 後端與其設定、沿用未變化影格的門檻、拼接辨識的批次大小、空白判斷門檻
+        journal_params["ocr_backend"] = ocr_backend or current_config().get("backend", "paddle")
+        journal_params["ocr_config"] = config_fingerprint()
+        journal_params["detect_changes"] = ChangeDetector().params() if detect_changes else None
+        journal_params["batch_size"] = batch_size
+        if text_detector is not None:
+            journal_params["text_threshold"] = text_detector.threshold
+        journal = FrameJournal(journal_path, journal_params, resume=resume)
+        first_idx = journal.last_idx + 1
+        if first_idx:
+            logger.info(f"從第 {first_idx} 張影格繼續處理")
+
+    # 以影片起始時間（加上 skip_start）作為 OCR 計算的基準時間
+    extraction_start_time = video_start_time + skip_start
+    chunked = decode_workers > 1 and not frames_folder
+    if frames_folder:
+        # 抽取影格 (擷取區間會自動以 skip_start 與 skip_end 調整)
+        extract_frames(video_path, frames_folder, fps=fps, skip_start=skip_start, skip_end=skip_end, index=index)
+        times = None
+        if index is not None:
+            times = [index.frame_time(frame)
+                     for frame in index.sample(skip_start, max(0, video_duration - skip_end), fps)]
+        frames = (frame for frame in iter_frames_from_folder(frames_folder, fps, start_time=extraction_start_time,
+                                                             times=times)
+                  if frame[0] >= first_idx)
+        frames, frame_crop_area = prepare_frames(frames, crop_area, preprocess)
+        if prefetch > 0:
+            frames = prefetch_frames(frames, prefetch)
+    else:
+        if video_duration is None or width is None:
+            raise RuntimeError(f"無法取得影片長度或解析度，無法以記憶體模式解碼: {video_path}")
+        # 續跑時從下一張應擷取的影格時間開始，擷取間隔的格點與從頭執行時相同
+        resume_offset = first_idx / fps
+        if not chunked:
+            frames = iter_frames(video_path, fps=fps, skip_start=skip_start + resume_offset, skip_end=skip_end,
+                                 duration=video_duration, width=width, height=height,
+                                 start_time=extraction_start_time + resume_offset, first_idx=first_idx,
+                                 preprocess=preprocess if filter_graph else None, index=index)
+            frames, frame_crop_area = prepare_frames(frames, crop_area, preprocess, filtered=filter_graph)
+            if prefetch > 0:
+                frames = prefetch_frames(frames, prefetch)
+    if refine and (original_fps <= 0 or width is None):
+        logger.warning("無法取得原始幀率或解析度，停用邊界精修")
+        refine = False
+    frame_results = [] if refine else None
+    cache = OCRCache(cache_path) if cache_path else None
+    # 精修需要全部影格的結果、切段時各段結果整段取回，其餘情況邊辨識邊寫出字幕
+    writer = None
+    try:
+        if not refine and not chunked:
+            writer = SubtitleWriter(output_vtt, **(merge_options or {}))
+            if journal is not None and first_idx:
+                # 先前已寫入日誌的影格結果放在前面
+                for record in journal.records:
+                    text = lines_to_text(record["lines"])
+                    if text:
+                        writer.feed(*frame_subtitle(record["idx"], record["pts"], text, fps, time_adjustment)[1:])
+            process_frames(frames, fps, time_adjustment=time_adjustment, crop_area=frame_crop_area,
+                           max_workers=max_workers, detect_changes=detect_changes, executor_type=executor_type,
+                           batch_size=batch_size, batch_wait=batch_wait, cache=cache, journal=journal,
+                           text_detector=text_detector, max_pending=max_pending, sink=writer.feed,
+                           shared_memory=shared_memory)
+            writer.close()
+        elif chunked:
+            chunk_results = process_chunks(video_path, skip_start + resume_offset,
+                                           max(0, video_duration - skip_end), video_duration, width, height, fps,
+                                           extraction_start_time + resume_offset, first_idx, crop_area,
+                                           decode_workers, detect_changes=detect_changes, batch_size=batch_size,
+                                           cache_path=cache_path, journal=journal, preprocess=preprocess,
+                                           filter_graph=filter_graph, text_detector=text_detector, index=index)
+            subtitles = []
+            for idx, pts, lines in chunk_results:
+                text = lines_to_text(lines)
+                if text:
+                    subtitles.append(frame_subtitle(idx, pts, text, fps, time_adjustment)[1:])
+            if frame_results is not None:
+                frame_results.extend(chunk_results)
+        else:
+            subtitles = process_frames(frames, fps, time_adjustment=time_adjustment,
+                                       crop_area=frame_crop_area, max_workers=max_workers,
+                                       detect_changes=detect_changes, executor_type=executor_type,
+                                       batch_size=batch_size, batch_wait=batch_wait, cache=cache,
+                                       journal=journal, frame_results=frame_results,
+                                       text_detector=text_detector, max_pending=max_pending,
+                                       shared_memory=shared_memory)
+        if writer is None and journal is not None and first_idx:
+            # 先前已寫入日誌的影格結果放在前面
+            resumed_subtitles = []
+            for record in journal.records:
+                text = lines_to_text(record["lines"])
+                if text:
+                    _, start_str, end_str, _ = frame_subtitle(record["idx"], record["pts"], text, fps,
+                                                              time_adjustment)
+                    resumed_subtitles.append((start_str, end_str, text))
+                if refine:
+                    frame_results.append((record["idx"], record["pts"], record["lines"]))
+            subtitles = resumed_subtitles + subtitles
+        if refine:
+            refiner = BoundaryRefiner(video_path, original_fps, crop_area, width, height,
+                                      threshold=refine_threshold, max_workers=max_workers,
+                                      batch_size=batch_size, cache=cache, preprocess=preprocess,
+                                      text_detector=text_detector, index=index)
+            subtitles = refine_subtitles(frame_results, original_fps, video_start_time, fps,
+                                         time_adjustment, refiner, index=index)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        if cache is not None:
+            cache.close()
+        if journal is not None:
+            journal.close()
+    if writer is None:
+        generate_vtt(subtitles, output_vtt, **(merge_options or {}))
+    logger.info(f"字幕檔已儲存至 {output_vtt}")
+    record_run_metrics(run_started)
+    return [output_vtt]
@@ -0,0 +1,31 @@
+from PIL import Image
+import cv2
+
+
+def save_frame(video_path, frame_idx, output_path=None):
+    """
+    將影片的第 frame_idx 幀存成圖片 (預設為 frame_{frame_idx}.jpg)
+    """
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = int(cap.get(cv2.CAP_PROP_FPS))  # 每秒幀數 (選用)
+    print(f"影片總幀數: {total_frames}")
+    print(f"影片 FPS: {fps}")
+
+    # 只需要單一幀，直接 seek 過去即可
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    ret, frame = cap.read()
+    cap.release()
+
+    if not ret:
+        print(f"無法讀取第 {frame_idx} 幀")
+        return None
+
+    # 將 BGR 格式轉為 RGB 格式，並轉為 PIL 圖片
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    frame = Image.fromarray(frame)
+
+    output_path = output_path or f'frame_{frame_idx}.jpg'
+    frame.save(output_path)
+    print(f"已儲存第 {frame_idx} 幀到 {output_path}")
+    return output_path
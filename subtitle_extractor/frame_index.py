@@ -0,0 +1,222 @@
+"""
+每支影片一次建立的影格索引 (每格的精確 PTS 與關鍵影格位置)
+
+以 ffprobe 讀取影像串流的封包 (不需解碼)，記錄每格的 PTS (time_base 的整數倍) 與關鍵影格，
+結果存成影片旁的 sidecar 檔 (<影片>.frameindex.npz)，以檔案大小、修改時間與內容取樣雜湊判斷是否仍有效。
+之後的解析度、長度、幀率、關鍵影格與「第 n 格的時間 / 某時間是第幾格」都直接查表，
+時間以 time_base 的有理數計算，不再以 start_time + idx / fps 的浮點數推算 (可變幀率的影片也正確)
+"""
+import os
+import json
+import hashlib
+import logging
+from fractions import Fraction
+
+import ffmpeg
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+HASH_BLOCK = 1 << 20
+
+
+def parse_rational(value, default: Fraction = Fraction(0)) -> Fraction:
+    """
+    將 ffprobe 的 "30000/1001" 或 "29.97" 轉為 Fraction，無法解析或分母為 0 時回傳 default
+    """
+    try:
+        if isinstance(value, str) and "/" in value:
+            num, den = value.split("/", 1)
+            return Fraction(int(num), int(den)) if int(den) else default
+        return Fraction(str(value))
+    except (TypeError, ValueError, ZeroDivisionError):
+        return default
+
+
+def file_key(video_path: str) -> dict:
+    """
+    影片的識別資訊：大小、修改時間與開頭 / 結尾各 1 MiB 的 blake2b 雜湊 (不必讀完整支影片)
+    """
+    stat = os.stat(video_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(stat.st_size).encode())
+    with open(video_path, "rb") as f:
+        digest.update(f.read(HASH_BLOCK))
+        if stat.st_size > 2 * HASH_BLOCK:
+            f.seek(-HASH_BLOCK, os.SEEK_END)
+            digest.update(f.read(HASH_BLOCK))
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest.hexdigest()}
+
+
+class FrameIndex:
+    """
+    pts 為依顯示順序排列的每格 PTS (int64，單位 time_base)，keyframes 為關鍵影格的格號
+    """
+
+    def __init__(self, pts, keyframes, time_base: Fraction, frame_rate: Fraction, width: int, height: int,
+                 duration: Fraction, start_pts: int = None, key: dict = None):
+        self.pts = np.asarray(pts, dtype=np.int64)
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self.time_base = Fraction(time_base)
+        self.frame_rate = Fraction(frame_rate)
+        self.width = int(width)
+        self.height = int(height)
+        self.duration = Fraction(duration)
+        self.start_pts = int(start_pts if start_pts is not None else (self.pts[0] if len(self.pts) else 0))
+        self.key = key or {}
+
+    def __len__(self) -> int:
+        return len(self.pts)
+
+    @property
+    def fps(self) -> float:
+        """
+        標稱幀率 (r_frame_rate)；沒有時以平均幀率代替
+        """
+        if self.frame_rate:
+            return float(self.frame_rate)
+        return len(self) / float(self.duration) if self.duration else 0.0
+
+    @property
+    def start_time(self) -> float:
+        """
+        串流的起始時間 (秒)，即 ffprobe 的 start_time
+        """
+        return float(self.start_pts * self.time_base)
+
+    def pts_time(self, frame: int) -> Fraction:
+        """
+        第 frame 格的精確顯示時間 (秒，有理數)
+        """
+        return int(self.pts[frame]) * self.time_base
+
+    def frame_time(self, frame: int) -> float:
+        """
+        第 frame 格的顯示時間 (秒)；超出最後一格時依標稱幀率往後推算 (用於最後一格的結束時間)
+        """
+        if frame < len(self):
+            return float(self.pts_time(frame))
+        last = len(self) - 1
+        return float(self.pts_time(last) + (frame - last) / (self.frame_rate or Fraction(30)))
+
+    def times(self):
+        """
+        每格的顯示時間 (float64 陣列，秒)
+        """
+        return self.pts * (self.time_base.numerator / self.time_base.denominator)
+
+    def frame_at(self, seconds: float) -> int:
+        """
+        在 seconds 時畫面上顯示的是第幾格 (最後一個 PTS <= seconds 的格號，早於第一格時為 0)
+        """
+        target = int(Fraction(seconds).limit_denominator(1 << 32) / self.time_base)
+        return max(0, int(np.searchsorted(self.pts, target, side="right")) - 1)
+
+    def nearest_frame(self, seconds: float) -> int:
+        """
+        顯示時間最接近 seconds 的格號 (容許半格誤差，例如 showinfo 只印到微秒的 pts_time)
+        """
+        return self.frame_at(seconds + 0.5 / (self.fps or 30.0))
+
+    def snap(self, seconds: float) -> float:
+        """
+        將近似的顯示時間對齊到最接近那一格的精確時間；索引沒有任何影格時原樣回傳
+        """
+        return self.frame_time(self.nearest_frame(seconds)) if len(self) else seconds
+
+    def keyframe_times(self) -> list:
+        return [float(int(self.pts[frame]) * self.time_base) for frame in self.keyframes]
+
+    def keyframe_before(self, frame: int) -> int:
+        """
+        frame (含) 之前最近的關鍵影格格號
+        """
+        position = int(np.searchsorted(self.keyframes, frame, side="right")) - 1
+        return int(self.keyframes[position]) if position >= 0 else 0
+
+    def sample(self, skip_start: float, end: float, fps: float) -> np.ndarray:
+        """
+        與 extractor.iter_frames 的 select 濾鏡相同的取樣：[skip_start, end) 之間每個 1/fps 時間格的第一格，
+        時間以 skip_start (相對於串流起點) 為 0，回傳被選中的格號
+        """
+        relative = self.times() - self.start_time - skip_start
+        frames = np.nonzero((relative >= -1e-6) & (relative < end - skip_start - 1e-6))[0]
+        if not len(frames):
+            return frames
+        slots = np.floor((np.maximum(relative[frames], 0) + 0.0005) * fps)
+        first = np.ones(len(frames), dtype=bool)
+        first[1:] = slots[1:] > slots[:-1]
+        return frames[first]
+
+    def save(self, path: str):
+        meta = {"version": VERSION, "time_base": str(self.time_base), "frame_rate": str(self.frame_rate),
+                "width": self.width, "height": self.height, "duration": str(self.duration),
+                "start_pts": self.start_pts, "key": self.key}
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, pts=self.pts, keyframes=self.keyframes, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != VERSION:
+                raise ValueError(f"不支援的影格索引版本: {meta.get('version')}")
+            return cls(data["pts"], data["keyframes"], Fraction(meta["time_base"]), Fraction(meta["frame_rate"]),
+                       meta["width"], meta["height"], Fraction(meta["duration"]), meta["start_pts"], meta["key"])
+
+
+def build_frame_index(video_path: str) -> FrameIndex:
+    """
+    以一次 ffprobe 讀取影像串流資訊與所有封包的 PTS / 關鍵影格旗標 (不解碼)
+    """
+    probe = ffmpeg.probe(video_path, select_streams="v:0", show_entries="packet=pts,flags")
+    stream = next((s for s in probe.get("streams", []) if s.get("codec_type") == "video"), None)
+    if stream is None:
+        raise RuntimeError(f"找不到影像串流: {video_path}")
+    time_base = parse_rational(stream.get("time_base"), Fraction(1, 90000))
+    packets = [(int(packet["pts"]), "K" in packet.get("flags", ""))
+               for packet in probe.get("packets", []) if str(packet.get("pts", "N/A")) != "N/A"]
+    # 封包是解碼順序，有 B 幀時要依 PTS 排回顯示順序
+    packets.sort()
+    pts = np.array([p for p, _ in packets], dtype=np.int64)
+    keyframes = np.array([i for i, (_, key) in enumerate(packets) if key], dtype=np.int64)
+    start_time = parse_rational(stream.get("start_time"), None)
+    duration = parse_rational(probe.get("format", {}).get("duration") or stream.get("duration"), Fraction(0))
+    return FrameIndex(pts, keyframes, time_base, parse_rational(stream.get("r_frame_rate")),
+                      stream["width"], stream["height"], duration,
+                      start_pts=round(start_time / time_base) if start_time is not None else None)
+
+
+def index_path(video_path: str) -> str:
+    return f"{video_path}.frameindex.npz"
+
+
+def load_frame_index(video_path: str, cache: bool = True) -> FrameIndex:
+    """
+    取得影片的影格索引；sidecar 檔存在且影片未變更時直接讀取，否則重新建立並寫回
+    (影片所在資料夾無法寫入時只記錄警告，不影響結果)
+    """
+    path = index_path(video_path)
+    key = file_key(video_path)
+    if cache and os.path.exists(path):
+        try:
+            index = FrameIndex.load(path)
+            if index.key == key:
+                logger.debug(f"使用影格索引快取: {path}")
+                return index
+            logger.info(f"影片已變更，重新建立影格索引: {video_path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"無法讀取影格索引 {path}，重新建立: {e}")
+
+    index = build_frame_index(video_path)
+    index.key = key
+    logger.info(f"已建立影格索引: {len(index)} 格、{len(index.keyframes)} 個關鍵影格、"
+                f"time_base={index.time_base}、幀率={index.frame_rate}")
+    if cache:
+        try:
+            index.save(path)
+        except OSError as e:
+            logger.warning(f"無法寫入影格索引 {path}: {e}")
+    return index
@@ -0,0 +1,119 @@
+import os
+import cv2
+import logging
+from tqdm import tqdm
+from .frame_store import open_frame_writer
+
+logger = logging.getLogger(__name__)
+
+# ====== 定義字幕區域座標 (可依實際情況調整) ======
+# (y1, y2, x1, x2)，與 extractor 的 crop_area 格式相同
+DEFAULT_REGION = (890, 990, 0, 1920)
+
+
+def create_recognizer(engine='paddle', confidence_threshold=0.7, tesseract_cmd=None, options=None, samples=None):
+    """
+    以 ocr_backends 建立辨識函式，只有信心分數 >= confidence_threshold 的文字行會被納入
+    paddle 使用繁體中文模型 (不做角度分類)，tesseract 使用 chi_tra，tesseract_cmd 可指定執行檔路徑，
+    例如 Windows 上的 r'C:\\Program Files\\Tesseract-OCR\\tesseract.exe'
+    engine='auto' 時以 samples (處理後的字幕區塊) 量測可用的後端，選用最快者
+    預設沿用前一次偵測到的文字框 (版面快取)，options 中該後端的 layout_cache=False 時關閉
+    """
+    from .ocr_backends import AUTO_CANDIDATES, create_backend, select_backend
+
+    options = dict(options or {})
+    options.setdefault('paddle', {'lang': 'chinese_cht'})  # 默認使用繁體中文模型
+    if tesseract_cmd:
+        options['tesseract'] = dict(options.get('tesseract', {}), tesseract_cmd=tesseract_cmd)
+    options = {name: {'layout_cache': True, **options.get(name, {})}
+               for name in set(options) | set(AUTO_CANDIDATES) | {engine}}
+    if engine == 'auto':
+        engine, backend = select_backend(samples, AUTO_CANDIDATES, options, repeat=2)
+        logger.info(f"使用 OCR 後端: {engine}")
+    else:
+        backend = create_backend(engine, **options[engine])
+
+    def recognize(image):
+        lines = backend.recognize(image)
+        return ' '.join(text for text, score, _box in lines if score >= confidence_threshold).strip()
+
+    return recognize
+
+
+def extract_frame_texts(video_path='example.mp4', output_path='ocr_output.txt', region=DEFAULT_REGION,
+                        engine='paddle', confidence_threshold=0.7, tesseract_cmd=None,
+                        output_folder='output_frames', save_every=50, skip_empty=False, text_threshold=None,
+                        ocr_options=None):
+    """
+    逐格辨識影片字幕區域，每行寫入 "frame id<TAB>字幕"；output_path 以 .frames 結尾時改為寫入 frame store
+    save_every > 0 時，每 save_every 幀將處理後的圖像存到 output_folder
+    skip_empty=True 時以 TextPresenceDetector 判斷字幕區域有無文字，沒有文字的幀直接寫入空白字幕，不呼叫 OCR；
+    門檻為 text_threshold，未指定時由影片取樣校正
+    engine 為 ocr_backends 的後端名稱 (paddle / tesseract / onnx / stub / auto)，ocr_options 為 {後端: 參數}
+    """
+    # ====== 開啟影片 ======
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    logger.info(f"影片幀率 (FPS): {fps}")
+    logger.info(f"總幀數 (Total Frames): {total_frames}")
+
+    y_min, y_max, x_min, x_max = region
+
+    samples = None
+    if engine == 'auto' or (skip_empty and text_threshold is None):
+        from .calibration import sample_frames
+        samples = [cv2.cvtColor(frame[y_min:y_max, x_min:x_max], cv2.COLOR_BGR2GRAY)
+                   for frame in sample_frames(video_path)]
+    recognize = create_recognizer(engine, confidence_threshold, tesseract_cmd, ocr_options,
+                                  [cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)[1] for gray in samples[:8]]
+                                  if engine == 'auto' else None)
+
+    text_detector = None
+    if skip_empty:
+        from .text_presence import TextPresenceDetector
+        text_detector = TextPresenceDetector()
+        if text_threshold is not None:
+            text_detector.threshold = text_threshold
+        else:
+            text_detector.calibrate(samples)
+
+    # ====== 建立輸出資料夾 (若不存在則自動建立) ======
+    if save_every > 0:
+        os.makedirs(output_folder, exist_ok=True)
+
+    # 開啟一個文字檔 (或 frame store) 來寫入資料
+    with open_frame_writer(output_path) as writer:
+        # ====== 使用 tqdm 顯示進度 ======
+        for frame_num in tqdm(range(total_frames), desc='Processing frames'):
+            ret, frame = cap.read()
+            if not ret:
+                logger.warning("影片讀取失敗或已結束。")
+                break
+
+            # 裁切出字幕區域
+            subtitle_region = frame[y_min:y_max, x_min:x_max]
+
+            # 進行灰階與二值化（可視需要自行調整或移除）
+            gray = cv2.cvtColor(subtitle_region, cv2.COLOR_BGR2GRAY)
+            _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+
+            # 執行 OCR (判定沒有文字時略過)
+            if text_detector is not None and not text_detector.has_text(gray):
+                subtitle = ''
+            else:
+                subtitle = recognize(thresh)
+            logger.debug(f"Frame {frame_num} OCR Subtitle: '{subtitle}'")
+
+            # 將 frame id 以及字幕寫入文字檔，每行一筆
+            writer.append(frame_num, subtitle)
+
+            # 每 save_every 幀時保存處理後的圖像到指定資料夾
+            if save_every > 0 and frame_num % save_every == 0:
+                output_image = os.path.join(output_folder, f"subtitle_frame_{frame_num}.png")
+                cv2.imwrite(output_image, thresh)
+
+    cap.release()
+    if text_detector is not None:
+        logger.info(f"文字偵測：{text_detector.empty} / {text_detector.frames} 幀判定為沒有文字，略過 OCR")
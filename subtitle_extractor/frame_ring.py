@@ -0,0 +1,136 @@
+"""
+以 shared memory 傳遞字幕區塊給 OCR worker 行程的環狀緩衝區
+
+行程池預設會把每個 NumPy 陣列 pickle 後經由 pipe 傳給 worker (序列化、兩次核心複製、反序列化)；
+FrameRing 改為在一個 SharedMemory 區段中切出固定數量、固定大小的 slot (大小取自字幕區塊的尺寸)：
+主行程把字幕區塊寫入空的 slot (唯一的一次複製)，送給 worker 的只有區段名稱與 (slot, 形狀)，
+worker 直接以該記憶體建立 NumPy 陣列辨識 (見 ocr_slots)，辨識完成後主行程回收 slot。
+slot 用完時寫入端會等待 worker 釋放，同時也限制了送出但未完成的字幕區塊數 (背壓)
+"""
+import logging
+import threading
+from collections import OrderedDict, deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# worker 行程中已開啟的區段 (名稱 -> SharedMemory)，只保留最近使用的幾個
+MAX_ATTACHED = 4
+_attached = OrderedDict()
+_attached_lock = threading.Lock()
+
+
+class FrameRing:
+    """
+    slots 個大小為 slot_shape (dtype) 的 slot；只由建立的行程寫入與回收，acquire / release 可跨執行緒呼叫
+    """
+
+    def __init__(self, slots: int, slot_shape: tuple, dtype=np.uint8):
+        self.slots = max(1, slots)
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(slot_shape)) * self.dtype.itemsize
+        self.segment = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self.free = deque(range(self.slots))
+        self.cond = threading.Condition()
+        self.written_bytes = 0
+        logger.debug(f"建立 shared memory 環狀緩衝區 {self.segment.name}: {self.slots} 個 slot，"
+                     f"每個 {self.slot_bytes} bytes")
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    def fits(self, array) -> bool:
+        return array.dtype == self.dtype and array.nbytes <= self.slot_bytes
+
+    def acquire(self, block: bool = True, timeout: float = None):
+        """
+        取得一個空的 slot 編號；block=False 且沒有空的 slot 時回傳 None
+        """
+        with self.cond:
+            if not self.free:
+                if not block or not self.cond.wait_for(lambda: self.free, timeout):
+                    return None
+            return self.free.popleft()
+
+    def release(self, slots):
+        with self.cond:
+            self.free.extend(slots)
+            self.cond.notify_all()
+
+    def write(self, slot: int, array) -> tuple:
+        """
+        將 array 寫入 slot，回傳送給 worker 的描述 (slot, 形狀)
+        """
+        np.ndarray(array.shape, dtype=self.dtype, buffer=self.segment.buf, offset=slot * self.slot_bytes)[...] = array
+        self.written_bytes += array.nbytes
+        return slot, tuple(array.shape)
+
+    def put(self, array, block: bool = True):
+        """
+        acquire + write；沒有空的 slot 且 block=False 時回傳 None
+        """
+        slot = self.acquire(block)
+        return None if slot is None else self.write(slot, array)
+
+    def close(self):
+        """
+        關閉並刪除區段；worker 已開啟的映射在它們關閉前仍然有效
+        """
+        self.segment.close()
+        try:
+            self.segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _attach(name: str):
+    """
+    spawn 的 worker 與主行程共用同一個 resource_tracker：開啟既有區段的重複登記不影響，
+    但不能像 ocr_daemon.attach_segment 那樣取消登記，否則主行程刪除區段時 tracker 會找不到登記
+    """
+    with _attached_lock:
+        segment = _attached.get(name)
+        if segment is not None:
+            _attached.move_to_end(name)
+            return segment
+        segment = _attached[name] = shared_memory.SharedMemory(name=name)
+        while len(_attached) > MAX_ATTACHED:
+            _, old = _attached.popitem(last=False)
+            try:
+                old.close()
+            except BufferError:
+                # 仍有陣列參照這個區段，等行程結束時再釋放
+                pass
+        return segment
+
+
+def read_slots(name: str, slot_bytes: int, descriptors, dtype: str = "|u1") -> list:
+    """
+    在 worker 中以 slot 的記憶體建立陣列 (不複製)；描述為 FrameRing.write 的回傳值
+    """
+    segment = _attach(name)
+    return [np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf, offset=slot * slot_bytes)
+            for slot, shape in descriptors]
+
+
+def ocr_slots(name: str, slot_bytes: int, descriptors, batch_size: int = 1, config: dict = None,
+              stream: str = None, dtype: str = "|u1") -> tuple:
+    """
+    worker 端的 timed_ocr_batch：字幕區塊直接取自 FrameRing 的 slot
+    """
+    from .ocr_engine import timed_ocr_batch
+
+    crops = read_slots(name, slot_bytes, descriptors, dtype)
+    try:
+        return timed_ocr_batch(crops, batch_size, config, stream)
+    finally:
+        del crops
@@ -0,0 +1,313 @@
+"""
+影格層級 OCR 結果的欄式儲存 (可 mmap 的二進位格式)
+
+一個 store 是一個資料夾，每個欄位一個只會附加的檔案：
+  meta.json     版本與欄位設定
+  runs.bin      文字的 run-length 編碼：每筆 (起始影格 int64, 連續格數 uint32, 文字編號 uint32)，
+                影格連續且文字相同的列合併成一筆 (逐格 OCR 的結果大多是連續重複的字幕)
+  strings.bin   不重複文字 (UTF-8) 依編號串接；strings.idx 為每個文字的結束位置 (uint64)
+  pts.bin       (選用) 每列的顯示時間 float64
+  conf.bin      (選用) 每列的平均置信度 float32
+讀取時各檔案以 numpy.memmap 開啟，開啟時間與資料量無關；文字在用到時才解碼。
+寫入可隨時 flush，讀取端重新開啟即可看到已寫出的資料；當機留下的半筆資料在下次開啟時截掉
+"""
+import os
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+RUN_DTYPE = np.dtype([("frame", "<i8"), ("count", "<u4"), ("text", "<u4")])
+OFFSET_DTYPE = np.dtype("<u8")
+PTS_DTYPE = np.dtype("<f8")
+CONF_DTYPE = np.dtype("<f4")
+
+
+def is_frame_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def _memmap(path: str, dtype, count: int = None):
+    size = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+    if count is not None:
+        size = min(size, count)
+    if size == 0:
+        return np.empty(0, dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(size,))
+
+
+class FrameStore:
+    """
+    唯讀開啟一個 store；runs / pts / conf 為 memmap 陣列
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != VERSION:
+            raise ValueError(f"不支援的 frame store 版本: {self.meta.get('version')} ({path})")
+        self.runs = _memmap(os.path.join(path, "runs.bin"), RUN_DTYPE)
+        self._offsets = _memmap(os.path.join(path, "strings.idx"), OFFSET_DTYPE)
+        self._strings = _memmap(os.path.join(path, "strings.bin"), np.dtype(np.uint8))
+        self._texts = {}
+        self._rows = None
+        self.pts = _memmap(os.path.join(path, "pts.bin"), PTS_DTYPE, len(self)) if self.meta.get("pts") else None
+        self.conf = _memmap(os.path.join(path, "conf.bin"), CONF_DTYPE, len(self)) if self.meta.get("conf") else None
+
+    def __len__(self) -> int:
+        if self._rows is None:
+            self._rows = int(self.runs["count"].sum(dtype=np.int64))
+        return self._rows
+
+    def text(self, text_id: int) -> str:
+        text = self._texts.get(text_id)
+        if text is None:
+            start = int(self._offsets[text_id - 1]) if text_id else 0
+            text = bytes(self._strings[start:int(self._offsets[text_id])]).decode("utf-8")
+            self._texts[text_id] = text
+        return text
+
+    def iter_runs(self):
+        """
+        產生 (起始影格, 結束影格, 文字, 格數)
+        """
+        for frame, count, text_id in self.runs.tolist():
+            yield frame, frame + count - 1, self.text(text_id), count
+
+    def frames(self):
+        """
+        每列的影格編號 (int64 陣列)
+        """
+        counts = self.runs["count"].astype(np.int64)
+        if not len(counts):
+            return np.empty(0, np.int64)
+        run_starts = np.repeat(self.runs["frame"] - (np.cumsum(counts) - counts), counts)
+        return run_starts + np.arange(len(self), dtype=np.int64)
+
+    def texts(self) -> list:
+        """
+        每列的文字 (list)
+        """
+        texts = []
+        for _, _, text, count in self.iter_runs():
+            texts.extend([text] * count)
+        return texts
+
+
+class FrameStoreWriter:
+    """
+    以串流方式附加影格結果；同一 store 同時只應有一個 writer
+    pts / conf 欄位在建立 store 時決定，附加到既有的 store 時沿用原設定
+    """
+
+    def __init__(self, path: str, pts: bool = False, conf: bool = False, append: bool = True,
+                 flush_every: int = 1000):
+        self.path = path
+        self.flush_every = flush_every
+        meta_path = os.path.join(path, "meta.json")
+        if append and os.path.isfile(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            if self.meta.get("version") != VERSION:
+                raise ValueError(f"不支援的 frame store 版本: {self.meta.get('version')} ({path})")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.meta = {"version": VERSION, "pts": pts, "conf": conf}
+            for name in ("runs.bin", "strings.bin", "strings.idx", "pts.bin", "conf.bin"):
+                if os.path.exists(os.path.join(path, name)):
+                    os.remove(os.path.join(path, name))
+            tmp_path = f"{meta_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f)
+            os.replace(tmp_path, meta_path)
+
+        self._repair()
+        self.runs_file = open(os.path.join(path, "runs.bin"), "r+b" if self._exists("runs.bin") else "w+b")
+        self.strings_file = open(os.path.join(path, "strings.bin"), "ab")
+        self.offsets_file = open(os.path.join(path, "strings.idx"), "ab")
+        self.pts_file = open(os.path.join(path, "pts.bin"), "ab") if self.meta["pts"] else None
+        self.conf_file = open(os.path.join(path, "conf.bin"), "ab") if self.meta["conf"] else None
+
+        # 既有的文字表與最後一個 run 讀回記憶體，之後的列可以接續同一個 run
+        store = FrameStore(path)
+        self._ids = {store.text(i): i for i in range(len(store._offsets))}
+        self._string_end = int(store._offsets[-1]) if len(store._offsets) else 0
+        self._written_runs = len(store.runs)
+        self._runs = []
+        if self._written_runs:
+            last = store.runs[-1]
+            self._runs.append([int(last["frame"]), int(last["count"]), int(last["text"])])
+            self._written_runs -= 1
+        self.rows = len(store)
+        del store
+        self._pts = []
+        self._conf = []
+
+    def _exists(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.path, name))
+
+    def _repair(self):
+        """
+        截掉當機留下的不完整資料，讓各欄位長度一致
+        """
+        def truncate(name, size):
+            file_path = os.path.join(self.path, name)
+            if os.path.exists(file_path) and os.path.getsize(file_path) > size:
+                logger.warning(f"frame store 欄位 {name} 結尾有不完整的資料，截斷至 {size} bytes")
+                with open(file_path, "r+b") as f:
+                    f.truncate(size)
+
+        def whole(name, dtype):
+            file_path = os.path.join(self.path, name)
+            size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            truncate(name, size - size % dtype.itemsize)
+
+        for name, dtype in (("runs.bin", RUN_DTYPE), ("strings.idx", OFFSET_DTYPE), ("pts.bin", PTS_DTYPE),
+                            ("conf.bin", CONF_DTYPE)):
+            whole(name, dtype)
+        offsets = _memmap(os.path.join(self.path, "strings.idx"), OFFSET_DTYPE)
+        strings_size = os.path.getsize(os.path.join(self.path, "strings.bin")) if self._exists("strings.bin") else 0
+        valid = len(offsets)
+        while valid and int(offsets[valid - 1]) > strings_size:
+            valid -= 1
+        truncate("strings.idx", valid * OFFSET_DTYPE.itemsize)
+        truncate("strings.bin", int(offsets[valid - 1]) if valid else 0)
+        runs = _memmap(os.path.join(self.path, "runs.bin"), RUN_DTYPE)
+        valid_runs = len(runs)
+        while valid_runs and int(runs[valid_runs - 1]["text"]) >= valid:
+            valid_runs -= 1
+        truncate("runs.bin", valid_runs * RUN_DTYPE.itemsize)
+        rows = int(runs["count"][:valid_runs].sum(dtype=np.int64)) if valid_runs else 0
+        del offsets, runs
+        if self.meta["pts"]:
+            truncate("pts.bin", rows * PTS_DTYPE.itemsize)
+        if self.meta["conf"]:
+            truncate("conf.bin", rows * CONF_DTYPE.itemsize)
+
+    def _intern(self, text: str) -> int:
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = len(self._ids)
+            data = text.encode("utf-8")
+            self._string_end += len(data)
+            self.strings_file.write(data)
+            self.offsets_file.write(np.array([self._string_end], OFFSET_DTYPE).tobytes())
+            self._ids[text] = text_id
+        return text_id
+
+    def append(self, frame: int, text: str, pts: float = None, conf: float = None):
+        text_id = self._intern(text)
+        last = self._runs[-1] if self._runs else None
+        if last is not None and last[2] == text_id and last[0] + last[1] == frame:
+            last[1] += 1
+        else:
+            self._runs.append([frame, 1, text_id])
+        if self.pts_file is not None:
+            self._pts.append(np.nan if pts is None else pts)
+        if self.conf_file is not None:
+            self._conf.append(np.nan if conf is None else conf)
+        self.rows += 1
+        if len(self._runs) > self.flush_every or len(self._pts) >= self.flush_every \
+                or len(self._conf) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        寫出緩衝的資料；最後一個 run 也會寫出 (之後若再延長，下次 flush 時原地更新)
+        文字表與逐列欄位先寫，runs 最後寫，讀取端看到的 run 一定有對應的文字與欄位資料
+        """
+        self.strings_file.flush()
+        self.offsets_file.flush()
+        for file, values, dtype in ((self.pts_file, self._pts, PTS_DTYPE), (self.conf_file, self._conf, CONF_DTYPE)):
+            if file is not None and values:
+                file.write(np.asarray(values, dtype).tobytes())
+                file.flush()
+                values.clear()
+        if self._runs:
+            self.runs_file.seek(self._written_runs * RUN_DTYPE.itemsize)
+            self.runs_file.write(np.array([tuple(run) for run in self._runs], RUN_DTYPE).tobytes())
+            self.runs_file.flush()
+            self._written_runs += len(self._runs) - 1
+            del self._runs[:-1]
+
+    def close(self):
+        self.flush()
+        for file in (self.runs_file, self.strings_file, self.offsets_file, self.pts_file, self.conf_file):
+            if file is not None:
+                os.fsync(file.fileno())
+                file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class TsvFrameWriter:
+    """
+    與 FrameStoreWriter 相同介面的 "frame<TAB>字幕" 文字檔 writer (pts / conf 不寫出)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+        self.rows = 0
+
+    def append(self, frame: int, text: str, pts: float = None, conf: float = None):
+        self.file.write(f"{frame}\t{text}\n")
+        self.rows += 1
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_frame_writer(path: str, pts: bool = False, conf: bool = False):
+    """
+    路徑以 .frames 結尾時建立 frame store，否則寫成文字檔
+    """
+    if path.rstrip("/\\").endswith(".frames"):
+        return FrameStoreWriter(path, pts=pts, conf=conf, append=False)
+    return TsvFrameWriter(path)
+
+
+def tsv_to_store(tsv_path: str, store_path: str) -> int:
+    """
+    將 "frame<TAB>字幕" 文字檔轉為 store (覆寫)，格式錯誤的行與 read_ocr_output 一樣略過，回傳列數
+    """
+    with open(tsv_path, "r", encoding="utf-8") as f, FrameStoreWriter(store_path, append=False) as writer:
+        for line in f:
+            parts = line.strip().split("\t")
+            if len(parts) != 2:
+                continue
+            writer.append(int(parts[0]), parts[1])
+        rows = writer.rows
+    logger.info(f"已轉換 {rows} 列: {tsv_path} -> {store_path}")
+    return rows
+
+
+def store_to_tsv(store_path: str, tsv_path: str) -> int:
+    """
+    將 store 輸出為 "frame<TAB>字幕" 文字檔，回傳列數
+    """
+    store = FrameStore(store_path)
+    rows = 0
+    with open(tsv_path, "w", encoding="utf-8") as f:
+        for start, end, text, _count in store.iter_runs():
+            f.writelines(f"{frame}\t{text}\n" for frame in range(start, end + 1))
+            rows += end - start + 1
+    logger.info(f"已轉換 {rows} 列: {store_path} -> {tsv_path}")
+    return rows
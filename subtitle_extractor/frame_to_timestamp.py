@@ -0,0 +1,120 @@
+from .segmenter import Segmenter
+from .frame_store import FrameStore, is_frame_store
+
+# 設定影片參數
+TOTAL_FRAMES = 19731  # 總幀數
+FPS = 29              # 每秒影格數 (沒有影片可建立影格索引、也沒有指定 fps 時的預設值)
+
+# 讀取 ocr_output.txt (或 frame store 資料夾) 並解析成幀數與字幕的列表
+def read_ocr_output(file_path):
+    if is_frame_store(file_path):
+        store = FrameStore(file_path)
+        return store.frames().tolist(), store.texts()
+    frames = []
+    subtitles = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split('\t')
+            if len(parts) != 2:
+                continue  # 忽略格式錯誤的行
+            frame_num, subtitle = parts
+            frames.append(int(frame_num))
+            subtitles.append(subtitle)
+    return frames, subtitles
+
+# 直接以 frame store 的 run 合併，連續相同的字幕只比對一次 (結果與逐幀合併相同)
+def merge_store_subtitles(store, similarity_threshold=0.8):
+    segmenter = Segmenter(threshold=similarity_threshold)
+    for start, end, subtitle, count in store.iter_runs():
+        segmenter.feed(start, end, subtitle, count)
+    return [
+        {'start_frame': start, 'end_frame': end, 'subtitle': subtitle}
+        for start, end, subtitle in segmenter.finish()
+    ]
+
+# 將幀數轉換為時間（格式：時:分:秒,毫秒）
+def frame_to_timestamp(frame, fps):
+    return seconds_to_timestamp(frame / fps)
+
+# 將秒數轉換為時間（格式：時:分:秒,毫秒）
+def seconds_to_timestamp(total_seconds):
+    hours = int(total_seconds // 3600)
+    minutes = int((total_seconds % 3600) // 60)
+    seconds = int(total_seconds % 60)
+    milliseconds = int((total_seconds - int(total_seconds)) * 1000)
+    return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
+
+# 合併相似字幕並生成時間戳
+def merge_subtitles(frames, subtitles, similarity_threshold=0.8):
+    segmenter = Segmenter(threshold=similarity_threshold)
+    for frame, subtitle in zip(frames, subtitles):
+        segmenter.feed(frame, frame, subtitle)
+
+    # 每個分組保留組內出現最多次的字幕
+    return [
+        {'start_frame': start, 'end_frame': end, 'subtitle': subtitle}
+        for start, end, subtitle in segmenter.finish()
+    ]
+
+# 將合併後的分組轉換為帶有時間戳的字幕格式
+# 指定 index (frame_index.FrameIndex) 時以每幀的精確 PTS (相對於影片起點) 計算，不以 frame / fps 推算
+def generate_timestamped_subtitles(groups, fps, index=None):
+    if index is not None and len(index):
+        def to_timestamp(frame):
+            return seconds_to_timestamp(index.frame_time(frame) - index.start_time)
+    else:
+        def to_timestamp(frame):
+            return frame_to_timestamp(frame, fps)
+
+    timestamped_subtitles = []
+    for group in groups:
+        start_time = to_timestamp(group['start_frame'])
+        end_time = to_timestamp(group['end_frame'])
+        subtitle = group['subtitle']
+        timestamped_subtitles.append((start_time, end_time, subtitle))
+    return timestamped_subtitles
+
+# 將字幕輸出為 SRT 格式（可選）
+def export_to_srt(timestamped_subtitles, output_path):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for idx, (start, end, subtitle) in enumerate(timestamped_subtitles, 1):
+            f.write(f"{idx}\n")
+            f.write(f"{start} --> {end}\n")
+            f.write(f"{subtitle}\n\n")
+
+# 主程式
+# video_path 指定時幀率與時間取自該影片的影格索引；fps 未指定且沒有影片時使用 FPS
+def main(ocr_file='cleaned_ocr_output.txt', srt_output='output_subtitles.srt',
+         fps=None, similarity_threshold=0.4, video_path=None):
+    index = None
+    if video_path:
+        from .frame_index import load_frame_index
+        index = load_frame_index(video_path)
+        fps = fps or index.fps
+        print(f"使用 {video_path} 的影格索引：幀率 {index.frame_rate}，共 {len(index)} 幀。")
+    elif fps is None:
+        fps = FPS
+        print(f"未指定影片或幀率，以預設 {FPS} fps 計算時間。")
+
+    # 讀取 OCR 輸出並合併相似字幕 (相似度閾值為 segmenter.similarity 的尺度)
+    if is_frame_store(ocr_file):
+        store = FrameStore(ocr_file)
+        print(f"共讀取到 {len(store)} 幀的字幕 ({len(store.runs)} 段連續相同的字幕)。")
+        groups = merge_store_subtitles(store, similarity_threshold)
+    else:
+        frames, subtitles = read_ocr_output(ocr_file)
+        print(f"共讀取到 {len(subtitles)} 幀的字幕。")
+        groups = merge_subtitles(frames, subtitles, similarity_threshold)
+    print(f"字幕已合併為 {len(groups)} 組。")
+
+    # 生成帶有時間戳的字幕
+    timestamped_subtitles = generate_timestamped_subtitles(groups, fps, index)
+
+    # 輸出為 SRT 格式
+    export_to_srt(timestamped_subtitles, srt_output)
+    print(f"SRT 字幕已輸出至 {srt_output}。")
+
+    # 若需要在終端顯示部分結果，可以選擇顯示前幾個
+    print("\n範例輸出（前 10 組）：")
+    for ts in timestamped_subtitles[:10]:
+        print(f"{ts[0]} --> {ts[1]}: {ts[2]}")
@@ -0,0 +1,400 @@
+"""
+影片擷取工作佇列 (SQLite 檔案)
+
+每筆工作為一支影片或影片中的一段時間 (shard)，worker 以租約 (lease) 領取工作並定期心跳續約；
+worker 當掉或失聯時租約到期，工作會被其他 worker 重新領取；失敗的工作依 max_attempts 退避後重試。
+資料庫使用 WAL 模式並設定 busy timeout，同一台或共用此檔案的多台主機上可同時執行任意數量的 worker
+"""
+import os
+import json
+import time
+import socket
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    工作佇列；每個行程 / 執行緒各自建立一個 JobQueue (sqlite3 連線不跨執行緒共用)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " video TEXT NOT NULL, output TEXT NOT NULL, options TEXT NOT NULL,"
+            " shard_start REAL, shard_end REAL, parent_output TEXT,"
+            " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL,"
+            " worker TEXT, lease_expires REAL, available_at REAL NOT NULL,"
+            " created REAL NOT NULL, started REAL, finished REAL, error TEXT, result TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)")
+        # 已合併 (或正在合併) 的 shard 字幕；合併也以租約領取，只有一個 worker 會寫出合併後的字幕檔
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS combined ("
+            " parent_output TEXT PRIMARY KEY, worker TEXT NOT NULL, lease_expires REAL, finished REAL)"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE 先取得寫入鎖，兩個 worker 不會領到同一筆工作
+        return _Transaction(self.conn)
+
+    def enqueue(self, video: str, output: str, options: dict = None, max_attempts: int = 3,
+                shard_start: float = None, shard_end: float = None, parent_output: str = None) -> int:
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO jobs (video, output, options, shard_start, shard_end, parent_output, status,"
+            " max_attempts, available_at, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(video), os.path.abspath(output), json.dumps(options or {}), shard_start, shard_end,
+             os.path.abspath(parent_output) if parent_output else None, QUEUED, max_attempts, now, now),
+        )
+        return cursor.lastrowid
+
+    def enqueue_video(self, video: str, output: str = None, options: dict = None, max_attempts: int = 3,
+                      shard_seconds: float = None, duration: float = None) -> list:
+        """
+        加入一支影片；指定 shard_seconds 與影片長度 duration 時切成多段工作，
+        各段輸出 <輸出檔名>.partNNN.vtt，全部完成後由最後完成的 worker 合併為 output
+        """
+        output = output or f"{video.rsplit('.', 1)[0]}.vtt"
+        if not shard_seconds or not duration or duration <= shard_seconds:
+            return [self.enqueue(video, output, options, max_attempts)]
+        base = output.rsplit(".", 1)[0]
+        options = dict(options or {}, duration=duration)
+        # 各段的時間範圍落在 skip_start 與 skip_end 之間，執行時會覆寫這兩個參數
+        start = float(options.get("skip_start") or 0)
+        stop = duration - float(options.get("skip_end") or 0)
+        job_ids = []
+        part = 0
+        while start < stop:
+            end = min(stop, start + shard_seconds)
+            job_ids.append(self.enqueue(video, f"{base}.part{part:03d}.vtt", options, max_attempts,
+                                        shard_start=start, shard_end=end, parent_output=output))
+            start = end
+            part += 1
+        return job_ids
+
+    def claim(self, worker: str, lease_seconds: float = 60.0):
+        """
+        領取一筆可執行的工作 (排隊中，或執行中但租約已過期)，回傳 dict；沒有工作時回傳 None
+        租約過期且已用完重試次數的工作直接標記為失敗
+        """
+        now = time.time()
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, finished = ?, error = COALESCE(error, '') || ?"
+                " WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (FAILED, now, "租約過期 (worker 失聯)", RUNNING, now),
+            )
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)"
+                " ORDER BY id LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            if row["status"] == RUNNING:
+                logger.warning(f"工作 {row['id']} 的租約已過期 (原 worker: {row['worker']})，重新領取")
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1,"
+                " started = ? WHERE id = ?",
+                (RUNNING, worker, now + lease_seconds, now, row["id"]),
+            )
+        job = dict(row)
+        job["attempts"] += 1
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def heartbeat(self, job_id: int, worker: str, lease_seconds: float = 60.0) -> bool:
+        """
+        延長租約；工作已被其他 worker 接手時回傳 False
+        """
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time() + lease_seconds, job_id, worker, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, result: dict = None) -> bool:
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = ?, finished = ?, lease_expires = NULL, error = NULL, result = ?"
+            " WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, time.time(), json.dumps(result or {}, ensure_ascii=False), job_id, worker, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str, backoff: float = 30.0) -> bool:
+        """
+        記錄失敗；尚有重試次數時以 backoff * 2^(attempts-1) 秒後重新排隊，否則標記為失敗
+        """
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ?"
+                                    " AND status = ?", (job_id, worker, RUNNING)).fetchone()
+            if row is None:
+                return False
+            if row["attempts"] < row["max_attempts"]:
+                self.conn.execute(
+                    "UPDATE jobs SET status = ?, lease_expires = NULL, error = ?, available_at = ? WHERE id = ?",
+                    (QUEUED, error, now + backoff * 2 ** (row["attempts"] - 1), job_id),
+                )
+            else:
+                self.conn.execute("UPDATE jobs SET status = ?, lease_expires = NULL, error = ?, finished = ?"
+                                  " WHERE id = ?", (FAILED, error, now, job_id))
+        return True
+
+    def retry(self, job_ids: list = None) -> int:
+        """
+        將失敗的工作 (預設為全部) 重設為排隊中並清除重試次數，回傳筆數
+        """
+        query = "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, finished = NULL WHERE status = ?"
+        params = [QUEUED, time.time(), FAILED]
+        if job_ids:
+            query += f" AND id IN ({','.join('?' * len(job_ids))})"
+            params.extend(job_ids)
+        return self.conn.execute(query, params).rowcount
+
+    def shards(self, parent_output: str) -> list:
+        return [dict(row) for row in self.conn.execute(
+            "SELECT * FROM jobs WHERE parent_output = ? ORDER BY shard_start", (parent_output,))]
+
+    def claim_combine(self, parent_output: str, worker: str, lease_seconds: float = 60.0):
+        """
+        所有 shard 都完成且尚未有 worker 合併 (或前一個合併的租約已過期) 時領取合併工作，回傳各 shard；
+        否則回傳 None
+        """
+        now = time.time()
+        with self._transaction():
+            shards = self.shards(parent_output)
+            if not shards or any(shard["status"] != DONE for shard in shards):
+                return None
+            cursor = self.conn.execute(
+                "INSERT INTO combined (parent_output, worker, lease_expires) VALUES (?, ?, ?)"
+                " ON CONFLICT (parent_output) DO UPDATE SET worker = excluded.worker,"
+                " lease_expires = excluded.lease_expires WHERE finished IS NULL AND lease_expires < ?",
+                (parent_output, worker, now + lease_seconds, now),
+            )
+            if cursor.rowcount != 1:
+                return None
+        for shard in shards:
+            shard["options"] = json.loads(shard["options"])
+        return shards
+
+    def pending_combines(self) -> list:
+        """
+        尚未合併完成的 shard 字幕 (parent_output)；是否所有 shard 都已完成由 claim_combine 判斷
+        """
+        return [row["parent_output"] for row in self.conn.execute(
+            "SELECT DISTINCT parent_output FROM jobs WHERE parent_output IS NOT NULL AND parent_output NOT IN"
+            " (SELECT parent_output FROM combined WHERE finished IS NOT NULL)")]
+
+    def finish_combine(self, parent_output: str, worker: str) -> bool:
+        cursor = self.conn.execute(
+            "UPDATE combined SET finished = ?, lease_expires = NULL WHERE parent_output = ? AND worker = ?",
+            (time.time(), parent_output, worker),
+        )
+        return cursor.rowcount == 1
+
+    def release_combine(self, parent_output: str, worker: str):
+        """
+        合併失敗時放棄領取，下一個完成 shard 或重試的 worker 可以再合併
+        """
+        self.conn.execute("DELETE FROM combined WHERE parent_output = ? AND worker = ? AND finished IS NULL",
+                          (parent_output, worker))
+
+    def jobs(self, status: str = None) -> list:
+        if status:
+            rows = self.conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,))
+        else:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY id")
+        return [dict(row) for row in rows]
+
+    def counts(self) -> dict:
+        return {row["status"]: row["n"] for row in
+                self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def read_vtt(path: str) -> list:
+    """
+    讀取 VTT，回傳 [(start_time_str, end_time_str, text), ...]
+    """
+    cues = []
+    with open(path, "r", encoding="utf-8") as f:
+        blocks = f.read().split("\n\n")
+    for block in blocks:
+        lines = block.strip().split("\n")
+        for i, line in enumerate(lines):
+            if " --> " in line:
+                start, end = line.split(" --> ", 1)
+                cues.append((start.strip(), end.strip(), "\n".join(lines[i + 1:]).strip()))
+                break
+    return cues
+
+
+def combine_shards(queue: JobQueue, parent_output: str, worker: str = None, lease_seconds: float = 60.0) -> bool:
+    """
+    所有 shard 都完成時，依時間順序接起各段字幕並以工作的合併參數 (merge_options) 重新合併
+    (跨段的同一句字幕會接成一句)；合併以 claim_combine 領取，同時完成最後幾段的 worker 只有一個會寫出字幕檔，
+    字幕檔先寫入暫存檔再改名 (SubtitleWriter)
+    """
+    from .subtitles import SubtitleWriter
+
+    worker = worker or default_worker_id()
+    shards = queue.claim_combine(parent_output, worker, lease_seconds)
+    if shards is None:
+        return False
+    try:
+        with SubtitleWriter(parent_output, **(shards[0]["options"].get("merge_options") or {})) as writer:
+            for shard in shards:
+                for start_time, end_time, text in read_vtt(shard["output"]):
+                    writer.feed(start_time, end_time, text)
+    except Exception:
+        queue.release_combine(parent_output, worker)
+        raise
+    queue.finish_combine(parent_output, worker)
+    logger.info(f"已合併 {len(shards)} 段字幕至 {parent_output}")
+    return True
+
+
+def try_combine(queue: JobQueue, parent_output: str, worker: str, lease_seconds: float = 60.0) -> bool:
+    try:
+        return combine_shards(queue, parent_output, worker, lease_seconds)
+    except Exception as e:
+        logger.error(f"[{worker}] 合併 {parent_output} 失敗: {e}")
+        return False
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_job(job: dict):
+    """
+    執行一筆工作，回傳寫出的字幕檔 (多個字幕區域時每個區域各一個，見 extractor.region_output)；
+    shard 以 skip_start / skip_end 限定時間範圍，重試時從日誌續跑
+    """
+    from .extractor import process_video
+
+    options = dict(job["options"])
+    if job["shard_start"] is not None:
+        duration = options.pop("duration")
+        options["skip_start"] = job["shard_start"]
+        options["skip_end"] = max(0.0, duration - job["shard_end"])
+    if options.get("crop_area"):
+        options["crop_area"] = tuple(options["crop_area"])
+    options.setdefault("journal_path", f"{job['output']}.journal")
+    options["resume"] = job["attempts"] > 1
+    return process_video(job["video"], job["output"], **options)
+
+
+def run_worker(queue_path: str, worker: str = None, lease_seconds: float = 60.0, poll_interval: float = 5.0,
+               exit_when_empty: bool = True, max_jobs: int = None, backoff: float = 30.0) -> int:
+    """
+    反覆領取並執行工作，回傳完成的工作數
+    執行期間背景執行緒每 lease_seconds / 3 秒心跳一次；exit_when_empty 時佇列中沒有排隊或執行中的工作就結束
+    """
+    worker = worker or default_worker_id()
+    queue = JobQueue(queue_path)
+    completed = 0
+    try:
+        while max_jobs is None or completed < max_jobs:
+            job = queue.claim(worker, lease_seconds)
+            if job is None:
+                # 先前合併失敗或合併中的 worker 失聯時，由閒置的 worker 補做
+                for parent_output in queue.pending_combines():
+                    try_combine(queue, parent_output, worker, lease_seconds)
+                counts = queue.counts()
+                if exit_when_empty and not counts.get(QUEUED) and not counts.get(RUNNING):
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f"[{worker}] 開始工作 {job['id']}: {job['video']} (第 {job['attempts']} 次)")
+            stop = threading.Event()
+            lease_lost = threading.Event()
+
+            def beat(job_id=job["id"]):
+                beat_queue = JobQueue(queue_path)
+                try:
+                    while not stop.wait(lease_seconds / 3):
+                        if not beat_queue.heartbeat(job_id, worker, lease_seconds):
+                            logger.warning(f"[{worker}] 工作 {job_id} 的租約已被接手")
+                            lease_lost.set()
+                            return
+                finally:
+                    beat_queue.close()
+
+            heartbeat_thread = threading.Thread(target=beat, name=f"heartbeat-{job['id']}", daemon=True)
+            heartbeat_thread.start()
+            started = time.time()
+            try:
+                outputs = run_job(job)
+            except Exception as e:
+                logger.error(f"[{worker}] 工作 {job['id']} 失敗: {e}")
+                stop.set()
+                heartbeat_thread.join()
+                queue.fail(job["id"], worker, f"{type(e).__name__}: {e}", backoff=backoff)
+                continue
+            stop.set()
+            heartbeat_thread.join()
+            result = {"output": job["output"], "outputs": outputs, "seconds": time.time() - started}
+            if lease_lost.is_set() or not queue.complete(job["id"], worker, result):
+                logger.warning(f"[{worker}] 工作 {job['id']} 已由其他 worker 處理，結果不回報")
+                continue
+            completed += 1
+            logger.info(f"[{worker}] 完成工作 {job['id']}，耗時 {time.time() - started:.1f} 秒")
+            if job["parent_output"]:
+                try_combine(queue, job["parent_output"], worker, lease_seconds)
+    finally:
+        queue.close()
+    return completed
+
+
+def run_local_workers(queue_path: str, num_workers: int, **worker_options) -> int:
+    """
+    在本機啟動 num_workers 個 worker 行程 (spawn) 消化佇列，回傳完成的工作總數
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from .cli import setup_logging
+
+    verbose = logging.getLogger().getEffectiveLevel() <= logging.DEBUG
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=setup_logging, initargs=(verbose,)) as pool:
+        futures = [pool.submit(run_worker, queue_path, **worker_options) for _ in range(num_workers)]
+        return sum(future.result() for future in futures)
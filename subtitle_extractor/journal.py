@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FrameJournal:
+    """
+    影格層級 OCR 結果的 append-only 日誌 (JSON Lines)
+    第一行為執行參數 {"params": {...}}，之後每行一筆 {"idx", "pts", "lines"}
+    每 flush_every 筆寫出一次，距上次 fsync 超過 fsync_interval 秒時再 fsync，
+    中途當機最多只會遺失最後一批尚未寫出的結果
+    """
+
+    def __init__(self, path: str, params: dict, resume: bool = False,
+                 flush_every: int = 50, fsync_interval: float = 5.0):
+        self.path = path
+        self.params = params
+        self.flush_every = flush_every
+        self.fsync_interval = fsync_interval
+        self.records = []
+        self._buffer = []
+        self._last_fsync = time.monotonic()
+
+        if resume and os.path.exists(path):
+            saved_params, self.records = self.load(path)
+            if saved_params != params:
+                logger.warning(f"日誌參數與本次執行不同，忽略既有日誌重新開始: {path}")
+                self.records = []
+            else:
+                logger.info(f"從日誌恢復 {len(self.records)} 筆影格結果: {path}")
+
+        if self.records:
+            self.file = open(path, "a", encoding="utf-8")
+        else:
+            self.file = open(path, "w", encoding="utf-8")
+            self.file.write(json.dumps({"params": params}, ensure_ascii=False) + "\n")
+            self._sync()
+
+    @staticmethod
+    def load(path: str):
+        """
+        讀取日誌，回傳 (params, records)
+        最後一行若寫到一半 (當機造成)，會從檔案中截掉以便後續繼續附加
+        """
+        params = None
+        records = []
+        valid_bytes = 0
+        with open(path, "rb") as f:
+            for raw_line in f:
+                if not raw_line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(raw_line.decode("utf-8"))
+                except ValueError:
+                    break
+                if params is None:
+                    params = entry.get("params")
+                else:
+                    records.append(entry)
+                valid_bytes += len(raw_line)
+        if valid_bytes < os.path.getsize(path):
+            logger.warning(f"日誌結尾有不完整的資料，截斷至 {valid_bytes} bytes")
+            with open(path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return params, records
+
+    @property
+    def last_idx(self) -> int:
+        """
+        最後一筆已寫入的影格編號，沒有任何紀錄時為 -1
+        """
+        return self.records[-1]["idx"] if self.records else -1
+
+    def append(self, idx: int, pts: float, lines):
+        self._buffer.append(json.dumps({"idx": idx, "pts": pts, "lines": lines}, ensure_ascii=False))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self, force_sync: bool = False):
+        if self._buffer:
+            self.file.write("\n".join(self._buffer) + "\n")
+            self.file.flush()
+            self._buffer.clear()
+        if force_sync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._sync()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def close(self):
+        self.flush(force_sync=True)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
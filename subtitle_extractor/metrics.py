@@ -0,0 +1,291 @@
+"""
+執行期指標：計數器、量值 (gauge) 與延遲直方圖，可輸出 JSON 摘要與 Prometheus textfile
+
+預設停用，停用時每次記錄只做一次布林判斷就返回；
+由 CLI 的 --metrics-json / --metrics-prom 啟用 (見 enable_metrics)
+"""
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "subtitle_extractor"
+# 延遲直方圖的上界 (秒)，涵蓋單格解碼 (~ms) 到整批 OCR (~s)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "started")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def _format_key(key: tuple) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in labels) + "}"
+
+
+class Metrics:
+    """
+    執行緒安全的指標集合 (OCR worker 的完成回呼會在其他執行緒記錄)
+      - inc(name, value, **labels):     累加計數器
+      - set(name, value, **labels):     設定量值，同時保留最大值
+      - observe(name, seconds, **labels): 記錄一次延遲
+      - timer(name, **labels):          以 with 區塊記錄延遲
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.gauge_max = {}
+            self.histograms = {}
+            self.started = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self.gauges[key] = value
+            if value > self.gauge_max.get(key, float("-inf")):
+                self.gauge_max[key] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def timer(self, name: str, **labels):
+        return _Timer(self, name, labels) if self.enabled else _NULL_TIMER
+
+    def value(self, name: str, **labels) -> float:
+        """
+        取得計數器或量值目前的數值 (不存在時為 0)
+        """
+        key = _key(name, labels)
+        with self._lock:
+            return self.counters.get(key, self.gauges.get(key, 0))
+
+    def snapshot(self) -> dict:
+        """
+        目前的原始數值 (可 pickle)，供 worker 行程回傳給主行程以 merge 併入
+        """
+        with self._lock:
+            return {"counters": dict(self.counters), "gauges": dict(self.gauges),
+                    "gauge_max": dict(self.gauge_max), "histograms": dict(self.histograms)}
+
+    def merge(self, snapshot: dict):
+        """
+        併入其他行程的 snapshot：計數器與直方圖相加，量值取對方最後的數值並保留兩者的最大值
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            for key, value in snapshot["counters"].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, value in snapshot["gauges"].items():
+                self.gauges[key] = value
+                self.gauge_max[key] = max(self.gauge_max.get(key, float("-inf")), snapshot["gauge_max"][key])
+            for key, other in snapshot["histograms"].items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.merge(other)
+
+    def summary(self) -> dict:
+        with self._lock:
+            histograms = {}
+            for key, histogram in self.histograms.items():
+                histograms[_format_key(key)] = {
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "mean": round(histogram.sum / histogram.count, 6) if histogram.count else 0.0,
+                    "max": round(histogram.max, 6),
+                    "buckets": {str(bound): count for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts)},
+                }
+            return {
+                "uptime_seconds": round(time.monotonic() - self.started, 3),
+                "counters": {_format_key(key): value for key, value in self.counters.items()},
+                "gauges": {_format_key(key): {"value": value, "max": self.gauge_max[key]}
+                           for key, value in self.gauges.items()},
+                "histograms": histograms,
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus text exposition 格式 (供 node_exporter textfile collector 讀取)
+        """
+        lines = []
+
+        def emit(kind, items, render):
+            seen = set()
+            for key, value in sorted(items, key=lambda item: item[0]):
+                name = f"{PREFIX}_{key[0]}"
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# TYPE {name} {kind}")
+                render(name, key[1], value)
+
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{label}="{value}"' for label, value in pairs) + "}" if pairs else ""
+
+        def render_histogram(name, labels, histogram):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{labels_text(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{labels_text(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{labels_text(labels)} {histogram.count}")
+
+        with self._lock:
+            emit("counter", self.counters.items(),
+                 lambda name, labels, value: lines.append(f"{name}{labels_text(labels)} {value}"))
+            emit("gauge", self.gauges.items(),
+                 lambda name, labels, value: lines.append(f"{name}{labels_text(labels)} {value}"))
+            emit("histogram", self.histograms.items(), render_histogram)
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        _write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str):
+        _write_atomic(path, self.to_prometheus())
+
+
+def _write_atomic(path: str, content: str):
+    # textfile collector 可能隨時讀取，先寫暫存檔再換名，避免讀到寫到一半的內容
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+METRICS = Metrics()
+
+
+def enable_metrics() -> Metrics:
+    METRICS.reset()
+    METRICS.enabled = True
+    return METRICS
+
+
+class MetricsLogHandler(logging.Handler):
+    """
+    依等級累計 log 筆數 (log_messages_total{level=...})，掛在 cli.setup_logging 設定的 logger 上
+    """
+
+    def emit(self, record):
+        METRICS.inc("log_messages_total", level=record.levelname.lower())
+
+
+class MetricsReporter:
+    """
+    在背景執行緒每 interval 秒輸出一次指標，stop() 時再輸出最終結果
+    interval 為 0 或 None 時只在 stop() 輸出
+    """
+
+    def __init__(self, json_path: str = None, prom_path: str = None, interval: float = None):
+        self.json_path = json_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        try:
+            if self.json_path:
+                METRICS.write_json(self.json_path)
+            if self.prom_path:
+                METRICS.write_prometheus(self.prom_path)
+        except OSError as e:
+            logger.error(f"寫入指標檔時發生錯誤: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self):
+        if self.interval:
+            self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
@@ -0,0 +1,708 @@
+"""
+可替換的 OCR 後端
+
+每個後端都實作同一個介面：recognize_batch(images) 接受一批 (已裁切的) 字幕區塊，
+回傳與輸入順序相同的 [[(文字, 置信度, 文字框), ...], ...]，文字框為四個角點 [[x, y], ...] (整數，相對於該區塊)。
+  - paddle:    PaddleOCR (同尺寸的區塊垂直拼接後只做一次偵測 + 辨識)
+  - tesseract: pytesseract，依 Tesseract 的行分組，置信度換算為 0~1
+  - onnx:      以 ONNX Runtime (CPU) 執行本機的 PP-OCR 偵測 / 辨識模型，可選用 int8 動態量化
+  - stub:      不需模型的決定性替身，相同畫面回傳相同文字 (測試與效能基準用)
+各後端另有 recognize_crops (只辨識、不偵測)，LayoutCachedBackend 以此沿用前一次偵測到的文字框，
+字幕位置不變時每張區塊只需辨識；文字框依字幕串流 (for_stream) 分開記錄，不同區域或 daemon 的不同 client 互不影響。
+模型與套件都在建立後端時才載入；benchmark_backends / select_backend 以實際的字幕區塊量測各後端速度，
+挑出這台機器上最快的後端 (auto)
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# auto 會比較的後端 (stub 不會辨識文字，不列入)
+AUTO_CANDIDATES = ("onnx", "paddle", "tesseract")
+
+
+def full_box(image) -> list:
+    """
+    整張圖片的外框 (後端無法提供文字位置時使用)
+    """
+    height, width = image.shape[:2]
+    return [[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]]
+
+
+def int_box(box) -> list:
+    return [[int(round(float(x))), int(round(float(y)))] for x, y in box]
+
+
+def to_bgr(image):
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+
+
+class OCRBackend:
+    """
+    OCR 後端的共同介面；子類別至少實作 recognize_batch 或 (mosaic=True 時) _recognize_one
+    mosaic=True 表示後端會自行偵測文字位置：同尺寸的區塊垂直拼接成一張圖只辨識一次，
+    再依文字框中心高度分配回原本的區塊；拼接圖的高度不超過區塊寬度 (超過時分成多張)，
+    最長邊與單張區塊相同，偵測模型縮放的比例 (PaddleOCR 的 det_limit_side_len) 不變
+    """
+
+    name = "base"
+    mosaic = False
+    gap = 16
+
+    def recognize(self, image) -> list:
+        return self.recognize_batch([image])[0]
+
+    def recognize_batch(self, images) -> list:
+        if not self.mosaic or len(images) == 1 or any(image.shape != images[0].shape for image in images):
+            return [self._recognize_one(image) for image in images]
+
+        height, width = images[0].shape[:2]
+        stride = height + self.gap
+        per_mosaic = max(1, (width + self.gap) // stride)
+        if len(images) > per_mosaic:
+            lines = []
+            for start in range(0, len(images), per_mosaic):
+                lines.extend(self.recognize_batch(images[start:start + per_mosaic]))
+            return lines
+
+        mosaic = np.zeros((stride * len(images) - self.gap,) + images[0].shape[1:], dtype=images[0].dtype)
+        for position, image in enumerate(images):
+            mosaic[position * stride:position * stride + height] = image
+
+        lines = [[] for _ in images]
+        for text, score, box in self._recognize_one(mosaic):
+            center_y = sum(point[1] for point in box) / len(box)
+            position = min(len(images) - 1, max(0, int(center_y // stride)))
+            offset = position * stride
+            lines[position].append((text, score, [[x, y - offset] for x, y in box]))
+        return lines
+
+    def _recognize_one(self, image) -> list:
+        raise NotImplementedError
+
+    def recognize_crops(self, crops) -> list:
+        """
+        只辨識 (不偵測)：每張 crop 為單一文字行的影像，回傳與輸入順序相同的 [(文字, 置信度), ...]
+        """
+        raise NotImplementedError
+
+    def for_stream(self, stream):
+        """
+        回傳辨識某個字幕串流 (例如一個字幕區域、daemon 的一個 client) 時使用的後端；
+        沒有跨區塊狀態的後端直接回傳自己
+        """
+        return self
+
+    def fingerprint(self) -> str:
+        """
+        影響辨識結果的設定摘要，作為 OCR 快取鍵的一部分
+        """
+        return f"backend={self.name}"
+
+
+def paddle_fingerprint(config: dict) -> str:
+    """
+    PaddleOCR 建構參數的摘要 (OCR_CONFIG 的全部鍵與額外指定的參數，依鍵排序)；
+    只影響速度的執行緒數、GPU 與否，以及另外列入摘要的版面快取設定不列入
+    """
+    ignored = ("use_gpu", "cpu_threads", "backend", "layout_cache", "layout_confidence")
+    return "|".join(f"{key}={config[key]}" for key in sorted(config) if key not in ignored)
+
+
+class PaddleBackend(OCRBackend):
+    """
+    PaddleOCR；config 為 PaddleOCR 的建構參數 (見 ocr_engine.OCR_CONFIG)
+    """
+
+    name = "paddle"
+    mosaic = True
+
+    def __init__(self, num_threads: int = None, **config):
+        from paddleocr import PaddleOCR
+
+        if num_threads:
+            config = dict(config, use_gpu=False, cpu_threads=num_threads)
+        self.config = config
+        self.use_cls = bool(config.get("use_angle_cls", False))
+        self.ocr = PaddleOCR(**config)
+
+    def _recognize_one(self, image) -> list:
+        result = self.ocr.ocr(image, cls=self.use_cls)
+        lines = []
+        for page in result or []:
+            # 每個 page 內的元素形如 [位置, (文字, 置信度)]
+            for box, (text, score) in page or []:
+                lines.append((text, float(score), int_box(box)))
+        return lines
+
+    def recognize_crops(self, crops) -> list:
+        crops = [to_bgr(crop) for crop in crops]
+        recognizer = getattr(self.ocr, "text_recognizer", None)
+        if recognizer is not None:
+            # PaddleOCR 內部的辨識器，一次辨識整批文字行
+            results, _elapsed = recognizer(crops)
+            return [(text, float(score)) for text, score in results]
+        results = []
+        for crop in crops:
+            page = (self.ocr.ocr(crop, det=False, cls=False) or [[]])[0] or []
+            results.append((page[0][0], float(page[0][1])) if page else ("", 0.0))
+        return results
+
+    def fingerprint(self) -> str:
+        return paddle_fingerprint(self.config)
+
+
+class TesseractBackend(OCRBackend):
+    """
+    Tesseract (預設 chi_tra、--psm 6)，tesseract_cmd 可指定執行檔路徑，
+    例如 Windows 上的 r'C:\\Program Files\\Tesseract-OCR\\tesseract.exe'
+    """
+
+    name = "tesseract"
+
+    def __init__(self, lang: str = "chi_tra", psm: int = 6, tesseract_cmd: str = None, num_threads: int = None):
+        import pytesseract
+
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        if num_threads:
+            os.environ["OMP_THREAD_LIMIT"] = str(num_threads)
+        self.pytesseract = pytesseract
+        self.lang = lang
+        self.psm = psm
+        # 中日韓文字的單字之間不加空白
+        self.separator = "" if lang.split("_")[0] in ("chi", "jpn", "kor") else " "
+        self.version = str(pytesseract.get_tesseract_version())
+
+    def _recognize_one(self, image) -> list:
+        data = self.pytesseract.image_to_data(image, lang=self.lang, config=f"--psm {self.psm}",
+                                              output_type=self.pytesseract.Output.DICT)
+        groups = {}
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if confidence < 0 or not word.strip():
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            groups.setdefault(key, []).append(i)
+        lines = []
+        for key in sorted(groups):
+            words = groups[key]
+            left = min(data["left"][i] for i in words)
+            top = min(data["top"][i] for i in words)
+            right = max(data["left"][i] + data["width"][i] for i in words)
+            bottom = max(data["top"][i] + data["height"][i] for i in words)
+            text = self.separator.join(data["text"][i].strip() for i in words)
+            score = sum(float(data["conf"][i]) for i in words) / len(words) / 100
+            lines.append((text, score, [[left, top], [right, top], [right, bottom], [left, bottom]]))
+        return lines
+
+    def recognize_crops(self, crops) -> list:
+        results = []
+        psm = self.psm
+        # 每張 crop 只有一行文字，以 --psm 7 略過版面分析
+        self.psm = 7
+        try:
+            for crop in crops:
+                lines = self._recognize_one(crop)
+                results.append((self.separator.join(text for text, _, _ in lines),
+                                sum(score for _, score, _ in lines) / len(lines)) if lines else ("", 0.0))
+        finally:
+            self.psm = psm
+        return results
+
+    def fingerprint(self) -> str:
+        return f"backend=tesseract|lang={self.lang}|psm={self.psm}|version={self.version}"
+
+
+class StubBackend(OCRBackend):
+    """
+    不需模型的決定性 OCR 替身
+    以接近白色的字幕筆畫像素產生固定文字 (不受壓縮雜訊影響)：畫面相同時文字相同，幾乎沒有亮像素時回傳空結果；
+    delay 可模擬每次呼叫的模型延遲 (秒)
+    """
+
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0, num_threads: int = None):
+        self.delay = delay
+
+    def recognize_batch(self, images) -> list:
+        if self.delay:
+            time.sleep(self.delay)
+        return [self._recognize_one(image) for image in images]
+
+    def _recognize_one(self, image) -> list:
+        gray = image if image.ndim == 2 else image.mean(axis=2)
+        mask = gray[::4, ::4] > 200
+        if mask.mean() < 0.002:
+            return []
+        # 由 CJK 統一表意文字區段取字，不同畫面的文字幾乎不會彼此相似
+        digest = hashlib.blake2b(np.packbits(mask).tobytes(), digest_size=24).digest()
+        length = 4 + digest[0] % 8
+        text = "".join(chr(0x4E00 + int.from_bytes(digest[1 + 2 * i:3 + 2 * i], "big") % 0x5000)
+                       for i in range(length))
+        return [(text, 0.99, full_box(image))]
+
+    def recognize_crops(self, crops) -> list:
+        return [(lines[0][0], lines[0][1]) if lines else ("", 0.0) for lines in map(self._recognize_one, crops)]
+
+
+class OnnxBackend(OCRBackend):
+    """
+    以 ONNX Runtime (CPUExecutionProvider) 執行 PP-OCR 匯出的偵測 / 辨識模型，不需安裝 paddle
+    model_dir 需包含 det.onnx、rec.onnx 與字典檔 dict.txt (每行一個字，與辨識模型訓練時相同)；
+    int8=True 時改用 det.int8.onnx / rec.int8.onnx，不存在時以 onnxruntime.quantization 動態量化產生
+    前後處理與 PaddleOCR 相同：偵測影像長邊縮到 det_limit_side_len 以內 (32 的倍數)，DB 後處理取文字框，
+    辨識輸入高 48、依寬高比縮放後補齊，CTC 貪婪解碼；字幕是水平文字，不做角度分類
+    """
+
+    name = "onnx"
+    mosaic = True
+
+    def __init__(self, model_dir: str = None, int8: bool = False, num_threads: int = None,
+                 det_limit_side_len: int = 960, det_db_thresh: float = 0.3, det_db_box_thresh: float = 0.5,
+                 det_db_unclip_ratio: float = 1.5, rec_batch_num: int = 8, rec_height: int = 48,
+                 rec_width: int = 320):
+        import onnxruntime as ort
+
+        model_dir = model_dir or os.environ.get("SUBTITLE_OCR_ONNX_DIR") or os.path.join(
+            os.path.expanduser("~"), ".cache", "subtitle_extractor", "onnx")
+        det_path, rec_path = self.model_paths(model_dir, int8)
+        dict_path = os.path.join(model_dir, "dict.txt")
+        with open(dict_path, "r", encoding="utf-8") as f:
+            # 0 為 CTC 的 blank，字典之後再加上空白字元 (use_space_char)
+            self.characters = ["blank"] + [line.rstrip("\r\n") for line in f] + [" "]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        providers = ["CPUExecutionProvider"]
+        self.det = ort.InferenceSession(det_path, sess_options=options, providers=providers)
+        self.rec = ort.InferenceSession(rec_path, sess_options=options, providers=providers)
+        self.det_input = self.det.get_inputs()[0].name
+        self.rec_input = self.rec.get_inputs()[0].name
+        self.model_dir = model_dir
+        self.int8 = int8
+        self.det_limit_side_len = det_limit_side_len
+        self.det_db_thresh = det_db_thresh
+        self.det_db_box_thresh = det_db_box_thresh
+        self.det_db_unclip_ratio = det_db_unclip_ratio
+        self.rec_batch_num = rec_batch_num
+        self.rec_height = rec_height
+        self.rec_width = rec_width
+        self.model_digest = self._digest(det_path, rec_path, dict_path)
+
+    @staticmethod
+    def model_paths(model_dir: str, int8: bool) -> tuple:
+        det_path = os.path.join(model_dir, "det.onnx")
+        rec_path = os.path.join(model_dir, "rec.onnx")
+        for path in (det_path, rec_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"找不到 ONNX 模型: {path}")
+        if not int8:
+            return det_path, rec_path
+        return quantize_model(det_path), quantize_model(rec_path)
+
+    @staticmethod
+    def _digest(*paths) -> str:
+        digest = hashlib.blake2b(digest_size=8)
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def _recognize_one(self, image) -> list:
+        return self.recognize_boxes([image])[0]
+
+    def recognize_batch(self, images) -> list:
+        if self.mosaic and len(images) > 1 and all(image.shape == images[0].shape for image in images):
+            return super().recognize_batch(images)
+        return self.recognize_boxes(images)
+
+    def recognize_boxes(self, images) -> list:
+        """
+        逐張偵測文字框，所有文字框再合併成依寬高比排序的批次一起辨識
+        """
+        images = [to_bgr(image) for image in images]
+        crops = []
+        owners = []
+        boxes = []
+        for position, image in enumerate(images):
+            for box in self.detect(image):
+                crops.append(rotate_crop(image, box))
+                owners.append(position)
+                boxes.append(box)
+        lines = [[] for _ in images]
+        for (text, score), position, box in zip(self.recognize_crops(crops), owners, boxes):
+            if text:
+                lines[position].append((text, score, int_box(box)))
+        return lines
+
+    def detect(self, image) -> list:
+        """
+        DB 文字偵測，回傳依由上而下、由左而右排序的文字框 (四個角點，原圖座標)
+        """
+        height, width = image.shape[:2]
+        ratio = min(1.0, self.det_limit_side_len / max(height, width))
+        resized_h = max(32, int(round(height * ratio / 32)) * 32)
+        resized_w = max(32, int(round(width * ratio / 32)) * 32)
+        resized = cv2.resize(image, (resized_w, resized_h))
+        blob = (resized.astype(np.float32) / 255 - (0.485, 0.456, 0.406)) / (0.229, 0.224, 0.225)
+        blob = blob.transpose(2, 0, 1)[None].astype(np.float32)
+        prob = self.det.run(None, {self.det_input: blob})[0][0, 0]
+
+        scale_x = width / resized_w
+        scale_y = height / resized_h
+        bitmap = (prob > self.det_db_thresh).astype(np.uint8)
+        contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = []
+        for contour in contours[:1000]:
+            (cx, cy), (w, h), angle = cv2.minAreaRect(contour)
+            if min(w, h) < 3 or box_score(prob, contour) < self.det_db_box_thresh:
+                continue
+            # 矩形往外擴 distance (= 面積 * unclip_ratio / 周長) 後的最小外接矩形，
+            # 與 PaddleOCR 以 pyclipper 擴張多邊形的結果相同
+            distance = w * h * self.det_db_unclip_ratio / (2 * (w + h))
+            w, h = w + 2 * distance, h + 2 * distance
+            if min(w, h) < 5:
+                continue
+            box = order_points(cv2.boxPoints(((cx, cy), (w, h), angle)))
+            box[:, 0] = np.clip(box[:, 0] * scale_x, 0, width - 1)
+            box[:, 1] = np.clip(box[:, 1] * scale_y, 0, height - 1)
+            boxes.append(box)
+        return sorted(boxes, key=lambda box: (round(box[0][1] / 10), box[0][0]))
+
+    def recognize_crops(self, crops) -> list:
+        """
+        CTC 文字辨識，回傳與輸入順序相同的 [(文字, 置信度), ...]
+        """
+        crops = [to_bgr(crop) for crop in crops]
+        results = [("", 0.0)] * len(crops)
+        order = sorted(range(len(crops)), key=lambda i: crops[i].shape[1] / max(1, crops[i].shape[0]))
+        for start in range(0, len(order), self.rec_batch_num):
+            batch = order[start:start + self.rec_batch_num]
+            max_ratio = max(self.rec_width / self.rec_height,
+                            max(crops[i].shape[1] / max(1, crops[i].shape[0]) for i in batch))
+            batch_width = int(self.rec_height * max_ratio)
+            blob = np.zeros((len(batch), 3, self.rec_height, batch_width), dtype=np.float32)
+            for row, i in enumerate(batch):
+                crop = crops[i]
+                resized_w = min(batch_width, int(np.ceil(self.rec_height * crop.shape[1] / max(1, crop.shape[0]))))
+                resized = cv2.resize(crop, (max(1, resized_w), self.rec_height)).astype(np.float32)
+                blob[row, :, :, :resized.shape[1]] = ((resized / 255 - 0.5) / 0.5).transpose(2, 0, 1)
+            probs = self.rec.run(None, {self.rec_input: blob})[0]
+            for row, i in enumerate(batch):
+                results[i] = self.ctc_decode(probs[row])
+        return results
+
+    def ctc_decode(self, probs) -> tuple:
+        indices = probs.argmax(axis=1)
+        scores = probs.max(axis=1)
+        keep = indices != 0
+        keep[1:] &= indices[1:] != indices[:-1]
+        characters = [self.characters[index] for index in indices[keep] if index < len(self.characters)]
+        if not characters:
+            return "", 0.0
+        return "".join(characters), float(scores[keep].mean())
+
+    def fingerprint(self) -> str:
+        return (f"backend=onnx|models={self.model_digest}|int8={self.int8}|box_thresh={self.det_db_box_thresh}"
+                f"|unclip={self.det_db_unclip_ratio}")
+
+
+def quantize_model(path: str) -> str:
+    """
+    回傳 path 的 int8 動態量化版本 (<名稱>.int8.onnx)，不存在時產生；量化失敗時回傳原本的 float 模型
+    """
+    quantized = f"{path[:-len('.onnx')]}.int8.onnx"
+    if os.path.exists(quantized) and os.path.getmtime(quantized) >= os.path.getmtime(path):
+        return quantized
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_path = f"{quantized}.{os.getpid()}.tmp"
+        quantize_dynamic(path, tmp_path, weight_type=QuantType.QUInt8)
+        os.replace(tmp_path, quantized)
+        logger.info(f"已產生 int8 量化模型: {quantized}")
+        return quantized
+    except Exception as e:
+        logger.warning(f"int8 量化失敗，改用 float 模型 {path}: {e}")
+        return path
+
+
+def order_points(points) -> np.ndarray:
+    """
+    將四個角點排成 左上、右上、右下、左下
+    """
+    points = np.asarray(points, dtype=np.float32)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([points[sums.argmin()], points[diffs.argmin()], points[sums.argmax()], points[diffs.argmax()]],
+                    dtype=np.float32)
+
+
+def box_score(prob, contour) -> float:
+    """
+    輪廓內的平均文字機率 (只在外接矩形內計算)
+    """
+    x, y, w, h = cv2.boundingRect(contour)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.fillPoly(mask, [contour.reshape(-1, 2) - (x, y)], 1)
+    return float(cv2.mean(prob[y:y + h, x:x + w], mask)[0])
+
+
+def rotate_crop(image, box) -> np.ndarray:
+    """
+    以透視變換取出文字框內的影像 (拉正)；直立的窄框轉 90 度
+    """
+    box = np.asarray(box, dtype=np.float32)
+    width = int(max(np.linalg.norm(box[0] - box[1]), np.linalg.norm(box[2] - box[3])))
+    height = int(max(np.linalg.norm(box[0] - box[3]), np.linalg.norm(box[1] - box[2])))
+    width, height = max(1, width), max(1, height)
+    target = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float32)
+    crop = cv2.warpPerspective(image, cv2.getPerspectiveTransform(box, target), (width, height),
+                               borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if height / width >= 1.5:
+        crop = np.ascontiguousarray(np.rot90(crop))
+    return crop
+
+
+class LayoutStore:
+    """
+    LayoutCachedBackend 的文字框記錄 {字幕串流: (區塊尺寸, 文字框, 遮罩)}，最多保留 max_streams 個最近使用的串流
+    可由多個後端實例共用 (OCR daemon 的各個實例)：同一串流的請求不論交給哪個實例，都沿用同一份文字框
+    """
+
+    def __init__(self, max_streams: int = 32):
+        self.max_streams = max_streams
+        self.lock = threading.Lock()
+        self.layouts = OrderedDict()
+
+    def get(self, stream):
+        with self.lock:
+            layout = self.layouts.get(stream)
+            if layout is not None:
+                self.layouts.move_to_end(stream)
+            return layout
+
+    def put(self, stream, layout):
+        with self.lock:
+            self.layouts[stream] = layout
+            self.layouts.move_to_end(stream)
+            while len(self.layouts) > self.max_streams:
+                self.layouts.popitem(last=False)
+
+
+class LayoutCachedBackend(OCRBackend):
+    """
+    版面快取：字幕長時間停在同一個位置，記住最近一次完整偵測得到的文字框，
+    之後的區塊只把這些框裁下來交給 recognize_crops 辨識，跳過 OCR 中最耗時的文字偵測
+    下列情況才重新做完整的偵測 + 辨識，並以新的文字框更新快取：
+      - 區塊尺寸改變，或筆畫邊緣 (形態梯度) 有超過 1 - coverage 的比例落在文字框 (外擴 margin) 之外，
+        即字幕換了位置、行數變多或變長而超出原本的框
+      - 任一行的辨識結果為空白或置信度低於 min_confidence (字幕消失、框內內容已不是文字)
+    偵測不到任何文字時保留原本的文字框，下一句字幕出現在同一位置時仍可沿用
+    文字框依字幕串流分開記錄 (for_stream)，最多保留 max_streams 個最近使用的串流；
+    同一個後端實例由多個區域或 client 共用時，不會拿別的串流的文字框來裁切
+    layouts 為共用的 LayoutStore (多個實例輪流處理同一串流時傳入同一個)，未指定時各自建立
+    """
+
+    def __init__(self, backend: OCRBackend, min_confidence: float = 0.8, coverage: float = 0.97,
+                 margin: int = 6, edge_delta: int = 60, scale: int = 2, max_streams: int = 32,
+                 layouts: LayoutStore = None):
+        self.backend = backend
+        self.name = backend.name
+        self.min_confidence = min_confidence
+        self.coverage = coverage
+        self.margin = margin
+        self.edge_delta = edge_delta
+        self.scale = scale
+        self.kernel = np.ones((3, 3), np.uint8)
+        self.layouts = layouts if layouts is not None else LayoutStore(max_streams)
+
+    def edges(self, image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        height, width = gray.shape
+        small = cv2.resize(gray, (max(1, width // self.scale), max(1, height // self.scale)),
+                           interpolation=cv2.INTER_NEAREST)
+        gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, self.kernel)
+        return cv2.threshold(gradient, self.edge_delta, 255, cv2.THRESH_BINARY)[1]
+
+    def for_stream(self, stream):
+        return _LayoutStream(self, stream)
+
+    def _remember(self, image, lines, stream=None):
+        boxes = [line[2] for line in lines]
+        mask = np.zeros(self.edges(image).shape, dtype=np.uint8)
+        for box in boxes:
+            points = np.asarray(box, dtype=np.float32)
+            x1, y1 = ((points.min(axis=0) - self.margin) / self.scale).astype(int)
+            x2, y2 = ((points.max(axis=0) + self.margin) / self.scale).astype(int)
+            mask[max(0, y1):y2 + 1, max(0, x1):x2 + 1] = 255
+        self.layouts.put(stream, (image.shape, boxes, mask))
+
+    def _fits(self, image, layout) -> bool:
+        shape, _boxes, mask = layout
+        if image.shape != shape:
+            return False
+        edges = self.edges(image)
+        total = cv2.countNonZero(edges)
+        # 空白的區塊交給偵測判定 (結果為沒有文字)，不必先辨識一次
+        return bool(total) and cv2.countNonZero(cv2.bitwise_and(edges, mask)) >= self.coverage * total
+
+    def recognize_batch(self, images, stream=None) -> list:
+        layout = self.layouts.get(stream)
+        results = [None] * len(images)
+        detect = []
+        reuse = []
+        for position, image in enumerate(images):
+            (reuse if layout is not None and self._fits(image, layout) else detect).append(position)
+
+        if reuse:
+            boxes = layout[1]
+            crops = [rotate_crop(images[position], box) for position in reuse for box in boxes]
+            texts = self.backend.recognize_crops(crops)
+            for k, position in enumerate(reuse):
+                lines = [(text, score, box) for (text, score), box
+                         in zip(texts[k * len(boxes):(k + 1) * len(boxes)], boxes)]
+                if all(text.strip() and score >= self.min_confidence for text, score, _ in lines):
+                    results[position] = lines
+                else:
+                    detect.append(position)
+
+        if detect:
+            detect.sort()
+            detected = self.backend.recognize_batch([images[position] for position in detect])
+            for position, lines in zip(detect, detected):
+                results[position] = lines
+            # 以這批中最後一張有文字的結果更新版面
+            for position, lines in reversed(list(zip(detect, detected))):
+                if lines:
+                    self._remember(images[position], lines, stream)
+                    break
+        METRICS.inc("ocr_detections_total", len(detect))
+        METRICS.inc("ocr_layout_reuse_total", len(images) - len(detect))
+        return results
+
+    def recognize_crops(self, crops) -> list:
+        return self.backend.recognize_crops(crops)
+
+    def fingerprint(self) -> str:
+        fingerprint = f"{self.backend.fingerprint()}|layout_cache=True"
+        if self.min_confidence != 0.8:
+            fingerprint += f"|layout_confidence={self.min_confidence}"
+        return fingerprint
+
+
+class _LayoutStream(OCRBackend):
+    """
+    LayoutCachedBackend 的單一字幕串流：共用模型，文字框另外記錄
+    """
+
+    def __init__(self, parent: LayoutCachedBackend, stream):
+        self.parent = parent
+        self.stream = stream
+        self.name = parent.name
+
+    def recognize_batch(self, images) -> list:
+        return self.parent.recognize_batch(images, self.stream)
+
+    def recognize_crops(self, crops) -> list:
+        return self.parent.recognize_crops(crops)
+
+    def fingerprint(self) -> str:
+        return self.parent.fingerprint()
+
+
+BACKENDS = {
+    "paddle": PaddleBackend,
+    "tesseract": TesseractBackend,
+    "onnx": OnnxBackend,
+    "stub": StubBackend,
+}
+
+
+def create_backend(name: str, num_threads: int = None, layout_cache: bool = False,
+                   layout_confidence: float = 0.8, layouts: LayoutStore = None, **options) -> OCRBackend:
+    """
+    依名稱建立後端；options 為該後端的建構參數，num_threads 限制後端使用的 CPU 執行緒數
+    layout_cache=True 時以 LayoutCachedBackend 包裝 (沿用文字框，只做辨識)，layout_confidence 為其置信度門檻，
+    layouts 為多個實例共用的文字框記錄 (見 LayoutStore)
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"未知的 OCR 後端: {name} (可用: {', '.join(BACKENDS)})")
+    backend = BACKENDS[name](num_threads=num_threads, **options)
+    if layout_cache:
+        backend = LayoutCachedBackend(backend, min_confidence=layout_confidence, layouts=layouts)
+    return backend
+
+
+def synthetic_strips(count: int = 16, width: int = 1280, height: int = 96) -> list:
+    """
+    產生 count 張白字黑邊的合成字幕區塊 (沒有影片可取樣時供 benchmark 使用)
+    cv2.putText 只能畫 ASCII，量測的是速度而非辨識正確率
+    """
+    rng = np.random.default_rng(0)
+    strips = []
+    for i in range(count):
+        strip = np.full((height, width, 3), 40, dtype=np.uint8)
+        strip += rng.integers(0, 30, strip.shape, dtype=np.uint8)
+        text = " ".join("".join(chr(rng.integers(65, 91)) for _ in range(rng.integers(3, 8)))
+                        for _ in range(2 + i % 4))
+        origin = (int(width * 0.1), int(height * 0.7))
+        cv2.putText(strip, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1.6, (0, 0, 0), 8, cv2.LINE_AA)
+        cv2.putText(strip, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1.6, (255, 255, 255), 3, cv2.LINE_AA)
+        strips.append(strip)
+    return strips
+
+
+def benchmark_backends(images, names=AUTO_CANDIDATES, options: dict = None, repeat: int = 3,
+                       batch_size: int = 1) -> dict:
+    """
+    以 images (字幕區塊) 量測各後端的辨識速度，回傳 {名稱: (後端, 每張秒數)}
+    options 為 {名稱: 建構參數}；無法建立的後端 (未安裝套件、缺少模型) 記錄後略過
+    每個後端先辨識一次暖機 (模型載入與記憶體配置不計入)，再取 repeat 次中最快的一次
+    """
+    options = options or {}
+    results = {}
+    for name in names:
+        try:
+            backend = create_backend(name, **options.get(name, {}))
+            backend.recognize_batch(images[:batch_size])
+        except Exception as e:
+            logger.info(f"OCR 後端 {name} 無法使用，略過: {e}")
+            continue
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for start in range(0, len(images), batch_size):
+                backend.recognize_batch(images[start:start + batch_size])
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = (backend, best / len(images))
+        logger.info(f"OCR 後端 {name}: 每張 {best / len(images) * 1000:.1f} ms")
+    return results
+
+
+def select_backend(images, names=AUTO_CANDIDATES, options: dict = None, repeat: int = 3,
+                   batch_size: int = 1) -> tuple:
+    """
+    回傳 images 上最快的 (名稱, 後端)；沒有任何後端可用時拋出 RuntimeError
+    """
+    results = benchmark_backends(images, names, options, repeat, batch_size)
+    if not results:
+        raise RuntimeError(f"沒有可用的 OCR 後端 (嘗試: {', '.join(names)})")
+    name = min(results, key=lambda key: results[key][1])
+    logger.info(f"自動選擇 OCR 後端: {name}")
+    return name, results[name][0]
@@ -0,0 +1,116 @@
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+from .ocr_engine import config_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """
+    以字幕區塊內容為鍵的 OCR 結果快取 (SQLite 檔案)
+      - 鍵：裁切後影像位元組 + 尺寸 + OCR 設定摘要 (ocr_engine.config_fingerprint) 的雜湊
+      - 值：[(文字, 置信度, 文字框), ...]，文字框為四個角的 [[x, y], ...]
+    資料庫使用 WAL 模式並設定 busy timeout，可同時由多個行程讀寫；
+    總大小超過 max_bytes 時依最後使用時間 (LRU) 淘汰舊資料
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, config: dict = None,
+                 touch_batch: int = 256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.fingerprint = config_fingerprint(config).encode("utf-8")
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self._touched = []
+        self._puts_since_check = 0
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache (last_used)")
+
+    def key(self, crop) -> str:
+        """
+        計算字幕區塊的快取鍵
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(self.fingerprint)
+        digest.update(f"{crop.shape}|{crop.dtype}".encode("utf-8"))
+        digest.update(crop if crop.flags.c_contiguous else crop.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """
+        取得快取的 [(文字, 置信度, 文字框), ...]，不存在時回傳 None
+        """
+        row = self.conn.execute("SELECT value FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # 最後使用時間累積一批再寫回，避免每次命中都開一次寫入交易
+        self._touched.append((time.time(), key))
+        if len(self._touched) >= self.touch_batch:
+            self._flush_touched()
+        return [tuple(line) for line in json.loads(row[0])]
+
+    def put(self, key: str, lines):
+        """
+        寫入一筆 OCR 結果，必要時觸發 LRU 淘汰
+        """
+        value = json.dumps(lines, ensure_ascii=False)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, len(key) + len(value.encode("utf-8")), time.time()),
+            )
+        self._puts_since_check += 1
+        if self._puts_since_check >= 100:
+            self._puts_since_check = 0
+            self.evict()
+
+    def evict(self):
+        """
+        總大小超過上限時，刪除最久未使用的資料直到降到上限的 90%
+        """
+        self._flush_touched()
+        with self.conn:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = total - int(self.max_bytes * 0.9)
+            removed = 0
+            stale_keys = []
+            for key, size in self.conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_used"):
+                if removed >= target:
+                    break
+                stale_keys.append((key,))
+                removed += size
+            self.conn.executemany("DELETE FROM ocr_cache WHERE key = ?", stale_keys)
+        logger.info(f"OCR 快取淘汰 {len(stale_keys)} 筆 ({removed} bytes)")
+
+    def _flush_touched(self):
+        if not self._touched:
+            return
+        with self.conn:
+            self.conn.executemany("UPDATE ocr_cache SET last_used = ? WHERE key = ?", self._touched)
+        self._touched.clear()
+
+    def close(self):
+        self._flush_touched()
+        self.conn.close()
+        logger.info(f"OCR 快取命中 {self.hits} 次，未命中 {self.misses} 次")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
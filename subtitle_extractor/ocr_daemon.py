@@ -0,0 +1,313 @@
+"""
+常駐的本機 OCR daemon
+
+模型載入 (PaddleOCR 需數秒) 只在 daemon 啟動時做一次，之後每支影片的擷取只需連線即可開始辨識。
+  - 傳輸：Unix domain socket，訊息為 4 bytes 長度 + JSON；
+    字幕區塊不經過 socket，由 client 寫入自己的 shared memory 區段，請求中只帶區段名稱、位移與形狀，
+    daemon 直接以該記憶體建立 NumPy 陣列辨識 (不複製)，只有辨識結果經由 socket 回傳
+  - 併發：每個連線一個執行緒，辨識時從 instances 個已載入的後端中取一個使用，
+    多個同時執行的擷取工作共用同一組模型，忙碌時在佇列中等待
+  - 操作：ping (回傳後端設定與快取指紋)、ocr、stats、shutdown
+client 端見 OCRClient 與 ocr_engine.connect_daemon：連不上 daemon 或設定不同時，擷取改回在本行程辨識
+"""
+import os
+import json
+import time
+import queue
+import signal
+import socket
+import struct
+import logging
+import tempfile
+import threading
+import socketserver
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("!I")
+MIN_SEGMENT = 1 << 20
+
+
+def default_socket_path() -> str:
+    """
+    預設的 socket 路徑：$XDG_RUNTIME_DIR 下，沒有時放在暫存資料夾並以 uid 區分使用者
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "subtitle-extractor-ocr.sock")
+    return os.path.join(tempfile.gettempdir(), f"subtitle-extractor-ocr-{os.getuid()}.sock")
+
+
+def send_message(sock, message: dict):
+    data = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock) -> dict:
+    """
+    讀取一則訊息，對方關閉連線時回傳 None
+    """
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    data = _recv_exact(sock, HEADER.unpack(header)[0])
+    if data is None:
+        return None
+    return json.loads(data.decode("utf-8"))
+
+
+def attach_segment(name: str):
+    """
+    開啟 client 建立的 shared memory 區段
+    區段由 client 負責刪除；Python 3.13 之前開啟既有區段也會被 resource_tracker 登記，需取消登記以免結束時被誤刪
+    """
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+    return segment
+
+
+class OCRDaemon:
+    """
+    持有 instances 個已載入的 OCR 後端，處理 client 的請求
+    config 為 ocr_engine.backend_config 的設定，num_threads 為每個後端使用的 CPU 執行緒數
+    """
+
+    def __init__(self, config: dict, instances: int = 1, num_threads: int = None):
+        from .ocr_backends import create_backend, LayoutStore
+
+        self.config = json.loads(json.dumps(config))
+        self.instances = instances
+        self.backends = queue.Queue()
+        options = dict(self.config)
+        name = options.pop("backend", "paddle")
+        # 同一字幕串流的請求每次可能由不同實例處理，文字框記錄由所有實例共用
+        layouts = LayoutStore()
+        for _ in range(instances):
+            self.backends.put(create_backend(name, num_threads=num_threads, layouts=layouts, **options))
+        self.fingerprint = self.backends.queue[0].fingerprint()
+        self.started = time.time()
+        self.stats = {"connections": 0, "requests": 0, "crops": 0, "busy_seconds": 0.0, "wait_seconds": 0.0}
+        self.stats_lock = threading.Lock()
+        self.server = None
+
+    def handle(self, message: dict, connection: int = None) -> dict:
+        op = message.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "config": self.config, "fingerprint": self.fingerprint,
+                    "instances": self.instances}
+        if op == "ocr":
+            return {"ok": True, "lines": self.recognize(message, connection)}
+        if op == "stats":
+            with self.stats_lock:
+                stats = dict(self.stats)
+            return {"ok": True, "uptime": time.time() - self.started, "idle_instances": self.backends.qsize(),
+                    "instances": self.instances, **stats}
+        if op == "shutdown":
+            if self.server is not None:
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"未知的操作: {op}"}
+
+    def recognize(self, message: dict, connection: int = None) -> list:
+        """
+        字幕串流以 (連線, client 指定的 stream) 區分：不同 client 或不同字幕區域的區塊
+        不會共用後端的跨區塊狀態 (LayoutCachedBackend 的文字框)
+        """
+        from .ocr_engine import run_ocr_batch
+
+        segment = attach_segment(message["shm"])
+        try:
+            crops = [np.ndarray(tuple(shape), dtype=np.uint8, buffer=segment.buf, offset=offset)
+                     for offset, shape in message["crops"]]
+            waited = time.perf_counter()
+            backend = self.backends.get()
+            started = time.perf_counter()
+            try:
+                results = run_ocr_batch(backend, crops, message.get("batch_size", 1),
+                                        (connection, message.get("stream")))
+            finally:
+                self.backends.put(backend)
+            finished = time.perf_counter()
+            del crops
+        finally:
+            segment.close()
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["crops"] += len(message["crops"])
+            self.stats["busy_seconds"] += finished - started
+            self.stats["wait_seconds"] += started - waited
+        return results
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        daemon = self.server.daemon
+        with daemon.stats_lock:
+            daemon.stats["connections"] += 1
+            connection = daemon.stats["connections"]
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (OSError, ValueError) as e:
+                logger.debug(f"讀取請求失敗: {e}")
+                return
+            if message is None:
+                return
+            try:
+                reply = daemon.handle(message, connection)
+            except Exception as e:
+                logger.error(f"處理請求失敗: {e}")
+                reply = {"ok": False, "error": str(e)}
+            try:
+                send_message(self.request, reply)
+            except OSError:
+                return
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str, config: dict, instances: int = 1, num_threads: int = None):
+    """
+    在前景執行 daemon 直到收到 shutdown 請求或 SIGTERM / SIGINT；結束時刪除 socket 檔
+    同一路徑已有 daemon 在執行時拋出 RuntimeError，殘留的 socket 檔會先刪除
+    """
+    if os.path.exists(socket_path):
+        try:
+            OCRClient(socket_path).close()
+            raise RuntimeError(f"已有 OCR daemon 在 {socket_path} 執行")
+        except OSError:
+            os.unlink(socket_path)
+
+    started = time.perf_counter()
+    daemon = OCRDaemon(config, instances=instances, num_threads=num_threads)
+    logger.info(f"已載入 {instances} 個 OCR 後端 ({daemon.config.get('backend')})，"
+                f"耗時 {time.perf_counter() - started:.1f} 秒")
+    server = _Server(socket_path, _Handler)
+    server.daemon = daemon
+    daemon.server = server
+    os.chmod(socket_path, 0o600)
+
+    def stop(_signum, _frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info(f"OCR daemon 已啟動: {socket_path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info(f"OCR daemon 已停止，共處理 {daemon.stats['requests']} 個請求、{daemon.stats['crops']} 張字幕區塊")
+
+
+class OCRClient:
+    """
+    OCR daemon 的 client；建立時即 ping 一次，daemon 不存在時拋出 OSError
+    每個執行緒各有自己的連線與 shared memory 區段，可在多執行緒的 process_frames 中共用同一個 client
+    """
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sockets = []
+        self._segments = []
+        info = self.request({"op": "ping"})
+        self.config = info["config"]
+        self.fingerprint = info["fingerprint"]
+        self.pid = info["pid"]
+
+    def _socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+            with self._lock:
+                self._sockets.append(sock)
+        return sock
+
+    def request(self, message: dict) -> dict:
+        sock = self._socket()
+        send_message(sock, message)
+        reply = recv_message(sock)
+        if reply is None:
+            raise ConnectionError("OCR daemon 已關閉連線")
+        if not reply.get("ok"):
+            raise RuntimeError(f"OCR daemon 回報錯誤: {reply.get('error')}")
+        return reply
+
+    def _segment(self, size: int):
+        segment = getattr(self._local, "segment", None)
+        if segment is not None and segment.size >= size:
+            return segment
+        new_size = max(size, MIN_SEGMENT, 2 * segment.size if segment is not None else 0)
+        new_segment = shared_memory.SharedMemory(create=True, size=new_size)
+        with self._lock:
+            if segment is not None:
+                self._segments.remove(segment)
+                segment.close()
+                segment.unlink()
+            self._segments.append(new_segment)
+        self._local.segment = new_segment
+        return new_segment
+
+    def ocr_batch(self, crops, batch_size: int = 1, stream: str = None) -> list:
+        """
+        與 ocr_engine.ocr_batch 相同，回傳每個區塊的 [(文字, 置信度, 文字框), ...]
+        """
+        crops = [np.ascontiguousarray(crop, dtype=np.uint8) for crop in crops]
+        segment = self._segment(sum(crop.nbytes for crop in crops))
+        layout = []
+        offset = 0
+        for crop in crops:
+            np.ndarray(crop.shape, dtype=np.uint8, buffer=segment.buf, offset=offset)[...] = crop
+            layout.append([offset, list(crop.shape)])
+            offset += crop.nbytes
+        reply = self.request({"op": "ocr", "shm": segment.name, "crops": layout, "batch_size": batch_size,
+                              "stream": stream})
+        return [[tuple(line) for line in lines] for lines in reply["lines"]]
+
+    def stats(self) -> dict:
+        return self.request({"op": "stats"})
+
+    def shutdown(self):
+        self.request({"op": "shutdown"})
+
+    def close(self):
+        with self._lock:
+            for sock in self._sockets:
+                sock.close()
+            for segment in self._segments:
+                segment.close()
+                segment.unlink()
+            self._sockets.clear()
+            self._segments.clear()
+        self._local = threading.local()
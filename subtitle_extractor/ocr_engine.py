@@ -0,0 +1,289 @@
+import os
+import json
+import atexit
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# PaddleOCR 預設參數，worker 行程會以同一份設定各自載入模型
+# (開啟版面快取時 backend_config 另外關閉角度分類)
+OCR_CONFIG = dict(
+    use_angle_cls=True,
+    lang="chinese_cht",
+    det_db_box_thresh=0.5,
+    rec_algorithm="SVTR_LCNet",
+    use_gpu=True
+)
+
+# 目前行程使用的 OCR 後端設定 {"backend": 名稱, ...該後端的參數}，未設定時為 PaddleOCR + OCR_CONFIG
+_config = None
+
+# 每個行程只保留一個 OCR 後端實例，第一次使用時才載入
+_ocr = None
+
+# 已連線的 OCR daemon (ocr_daemon.OCRClient)；有連線時辨識交給 daemon，本行程不載入模型
+_client = None
+
+# 與目前設定不同的後端實例 (例如各字幕區域各自的語言)，以設定的 JSON 為鍵
+_backends = {}
+_backends_lock = threading.Lock()
+
+def backend_config(name: str = "paddle", **options) -> dict:
+    """
+    組成 OCR 後端設定；paddle 以 OCR_CONFIG 為基礎再套用 options
+    預設開啟版面快取 (layout_cache，見 ocr_backends.LayoutCachedBackend)，可由 options 關閉；
+    開啟時 paddle 未指定 use_angle_cls 就不做角度分類：版面快取只用於位置固定的水平字幕行，
+    省下每行一次的分類模型推論。關閉版面快取時與原本的 PaddleOCR 設定相同
+    """
+    config = dict(OCR_CONFIG) if name == "paddle" else {}
+    config["layout_cache"] = True
+    config.update(options)
+    if name == "paddle" and config["layout_cache"] and "use_angle_cls" not in options:
+        config["use_angle_cls"] = False
+    config["backend"] = name
+    return config
+
+def configure_ocr(config: dict):
+    """
+    設定目前行程使用的 OCR 後端 (之後建立的行程池也會沿用)，已載入的實例會在下次使用時重建
+    已連線的 OCR daemon 會一併中斷 (設定可能與 daemon 不同)
+    """
+    global _config, _ocr
+    disconnect_daemon()
+    _config = config
+    _ocr = None
+    _backends.clear()
+
+def connect_daemon(socket_path: str = None, config: dict = None) -> bool:
+    """
+    嘗試連線到常駐的 OCR daemon (見 ocr_daemon)，成功時之後的 ocr_batch 都交給 daemon 辨識並回傳 True
+    config 為需要的後端設定，與 daemon 的設定不同時不使用 daemon；None 表示接受 daemon 的設定
+    daemon 不存在或連線失敗時回傳 False，呼叫端照常在本行程載入模型
+    """
+    global _client
+    from .ocr_daemon import OCRClient, default_socket_path
+
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        client = OCRClient(socket_path)
+    except (OSError, RuntimeError, ValueError) as e:
+        logger.info(f"無法連線到 OCR daemon {socket_path}，改在本行程辨識: {e}")
+        return False
+    if config is not None and json.loads(json.dumps(config)) != client.config:
+        logger.warning(f"OCR daemon 的後端設定與本次不同，改在本行程辨識 (daemon: {client.config.get('backend')})")
+        client.close()
+        return False
+    configure_ocr(client.config)
+    _client = client
+    logger.info(f"使用 OCR daemon {socket_path} (pid {client.pid}, {client.config.get('backend')})")
+    return True
+
+def disconnect_daemon():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+# 結束時釋放與 daemon 共用的 shared memory 區段
+atexit.register(disconnect_daemon)
+
+def daemon_path() -> str:
+    """
+    目前連線的 OCR daemon socket 路徑，沒有連線時為 None
+    """
+    return _client.socket_path if _client is not None else None
+
+def current_config() -> dict:
+    return _config or backend_config()
+
+def get_ocr(config: dict = None, num_threads: int = None):
+    """
+    取得目前行程的 OCR 後端 (ocr_backends.OCRBackend)，尚未載入時依 config (預設 current_config()) 建立
+    """
+    global _ocr
+    if _ocr is None:
+        from .ocr_backends import create_backend
+        options = dict(config or current_config())
+        _ocr = create_backend(options.pop("backend", "paddle"), num_threads=num_threads, **options)
+    return _ocr
+
+def config_key(config: dict) -> str:
+    return json.dumps(config, sort_keys=True, ensure_ascii=False)
+
+def get_ocr_for(config: dict, num_threads: int = None):
+    """
+    取得指定設定的後端實例；與目前行程的設定相同時即 get_ocr()，否則另外建立並保留 (每種設定一個)
+    """
+    if config is None or config_key(config) == config_key(current_config()):
+        return get_ocr(num_threads=num_threads)
+    key = config_key(config)
+    with _backends_lock:
+        if key not in _backends:
+            from .ocr_backends import create_backend
+            options = dict(config)
+            _backends[key] = create_backend(options.pop("backend", "paddle"), num_threads=num_threads, **options)
+        return _backends[key]
+
+def set_ocr(ocr):
+    """
+    替換目前行程的 OCR 後端實例 (例如 benchmark 使用 StubBackend、auto 選出的後端)
+    """
+    global _ocr
+    _ocr = ocr
+
+def use_backend(name: str, options: dict = None, samples=None) -> str:
+    """
+    設定目前行程 (與之後建立的行程池) 使用的 OCR 後端並回傳其名稱
+    options 為 {後端名稱: 建構參數}；name="auto" 時以 samples (字幕區塊) 量測各個可用的後端，選用最快者
+    """
+    options = options or {}
+    if name != "auto":
+        configure_ocr(backend_config(name, **options.get(name, {})))
+        return name
+    from .ocr_backends import AUTO_CANDIDATES, select_backend
+    if not samples:
+        raise ValueError("自動選擇 OCR 後端需要字幕區塊樣本")
+    candidate_options = {}
+    for candidate in AUTO_CANDIDATES:
+        candidate_options[candidate] = backend_config(candidate, **options.get(candidate, {}))
+        candidate_options[candidate].pop("backend")
+    name, backend = select_backend(samples, options=candidate_options, repeat=2)
+    configure_ocr(backend_config(name, **options.get(name, {})))
+    set_ocr(backend)
+    return name
+
+def recognize_lines(ocr, img) -> list:
+    """
+    對單張 (已裁切) 圖片執行 OCR，回傳 [(文字, 置信度, 文字框), ...]
+    """
+    return ocr.recognize(img)
+
+def lines_to_text(lines) -> str:
+    """
+    將 [(文字, 置信度, 文字框), ...] 以空白串接成一行字幕 (也接受舊快取 / 日誌中的 (文字, 置信度))
+    """
+    return " ".join(line[0] for line in lines).strip()
+
+def recognize(ocr, img) -> str:
+    """
+    對單張 (已裁切) 圖片執行 OCR，回傳以空白串接的文字
+    """
+    return lines_to_text(recognize_lines(ocr, img))
+
+def recognize_batch(ocr, crops) -> list:
+    """
+    一次辨識多個字幕區塊，回傳與輸入順序相同的 [(文字, 置信度, 文字框), ...] 列表
+    會自行偵測文字位置的後端把同尺寸的區塊垂直拼接成一張圖，只呼叫一次偵測 + 辨識 (見 OCRBackend.recognize_batch)
+    """
+    return ocr.recognize_batch(crops)
+
+def ocr_batch(crops, batch_size: int = 1, config: dict = None, stream: str = None) -> list:
+    """
+    依序辨識一批字幕區塊，回傳與輸入順序相同的 [(文字, 置信度, 文字框), ...] 列表
+    batch_size > 1 時每 batch_size 張合併為一次 OCR 呼叫；單次失敗時該組回傳空結果
+    已連線 OCR daemon 時交給 daemon 辨識，daemon 中途停止時改回在本行程載入模型
+    config 為與目前設定不同的後端設定時 (見 get_ocr_for)，一律在本行程以該設定辨識
+    stream 為這些區塊所屬的字幕串流 (例如字幕區域名稱)，有狀態的後端依此分開記錄 (見 OCRBackend.for_stream)
+    """
+    if config is not None and config_key(config) != config_key(current_config()):
+        return run_ocr_batch(get_ocr_for(config), crops, batch_size, stream)
+    if _client is not None:
+        try:
+            return _client.ocr_batch(crops, batch_size, stream)
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"OCR daemon 無法使用，改在本行程辨識: {e}")
+            config = current_config()
+            configure_ocr(config)
+    return run_ocr_batch(get_ocr(), crops, batch_size, stream)
+
+def run_ocr_batch(ocr, crops, batch_size: int = 1, stream=None) -> list:
+    """
+    以指定的後端實例執行 ocr_batch (daemon 也使用同一套分組與錯誤處理)
+    """
+    ocr = ocr.for_stream(stream)
+    results = []
+    for start in range(0, len(crops), batch_size):
+        group = crops[start:start + batch_size]
+        try:
+            if batch_size > 1:
+                results.extend(recognize_batch(ocr, group))
+            else:
+                results.append(recognize_lines(ocr, group[0]))
+        except Exception as e:
+            logger.error(f"OCR 辨識失敗: {e}")
+            results.extend([[] for _ in group])
+    return results
+
+def timed_ocr_batch(crops, batch_size: int = 1, config: dict = None, stream: str = None) -> tuple:
+    """
+    ocr_batch 並回傳 (結果, 在 worker 中實際花費的秒數)，用於計算 OCR 延遲與 worker 使用率
+    """
+    started = time.perf_counter()
+    results = ocr_batch(crops, batch_size, config, stream)
+    return results, time.perf_counter() - started
+
+def config_fingerprint(config: dict = None) -> str:
+    """
+    影響辨識結果的 OCR 設定摘要，作為快取鍵的一部分 (執行緒數、GPU 與否不影響結果故不列入)
+    PaddleOCR 的摘要包含 OCR_CONFIG 的全部設定 (見 ocr_backends.paddle_fingerprint)，
+    預設值改變 (例如角度分類) 時舊的快取不會被沿用；
+    其他後端的摘要包含模型檔、版本等資訊，需由後端實例的 fingerprint() 取得
+    """
+    if config is None and _client is not None:
+        return _client.fingerprint
+    config = config or current_config()
+    name = config.get("backend", "paddle")
+    if name == "paddle":
+        from .ocr_backends import paddle_fingerprint
+
+        fingerprint = paddle_fingerprint(config)
+        if config.get("layout_cache"):
+            fingerprint += "|layout_cache=True"
+            if config.get("layout_confidence", 0.8) != 0.8:
+                fingerprint += f"|layout_confidence={config['layout_confidence']}"
+        return fingerprint
+    if config == current_config():
+        return get_ocr().fingerprint()
+    from .ocr_backends import create_backend
+    options = dict(config)
+    return create_backend(options.pop("backend"), **options).fingerprint()
+
+def init_worker(config: dict, num_threads: int, socket_path: str = None):
+    """
+    ProcessPoolExecutor 的 initializer：先固定本行程的執行緒數，再依 config 載入專屬的 OCR 後端
+    主行程使用 OCR daemon 時 (socket_path)，worker 也連線到同一個 daemon，不另外載入模型
+    """
+    # 必須在匯入 paddle 之前設定，否則數學函式庫會以全部核心初始化
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(num_threads)
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+    configure_ocr(config)
+    if socket_path and connect_daemon(socket_path, config):
+        return
+    get_ocr(num_threads=num_threads)
+    logger.debug(f"OCR worker {os.getpid()} 已載入模型 (threads={num_threads})")
+
+def create_process_pool(max_workers: int, config: dict = None, threads_per_worker: int = None):
+    """
+    建立 OCR 行程池，每個 worker 以 spawn 啟動並各自載入一份模型
+    threads_per_worker 未指定時，依 CPU 核心數平均分配給各 worker
+    """
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // max_workers)
+    logger.info(f"建立 OCR 行程池: workers={max_workers}, threads_per_worker={threads_per_worker}")
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(config or current_config(), threads_per_worker, daemon_path()),
+    )
@@ -0,0 +1,106 @@
+"""
+字幕區塊前處理：裁切、灰階、縮放、二值化
+
+同一組設定可以兩種方式執行：
+  - apply_filters：加在 FFmpeg 濾鏡圖中，管線只傳出處理後的小區塊 (每格位元組數少一個數量級以上)
+  - apply：對 Python 端已解碼的整張 BGR 影格以 OpenCV 處理 (影格資料夾模式或未啟用濾鏡時)
+兩者結果不保證逐像素相同 (灰階係數與捨入不同)，但對 OCR 與變化偵測沒有影響
+"""
+import cv2
+
+
+class FramePreprocess:
+    """
+    crop_area 為 (y1, y2, x1, x2)，None 表示整張影格；gray 轉成單通道灰階；
+    scale 為縮放倍率 (1.0 表示不縮放)；threshold 指定時灰階值大於它的像素設為 255、其餘為 0 (隱含 gray)
+    """
+
+    def __init__(self, crop_area: tuple = None, gray: bool = False, threshold: int = None, scale: float = 1.0):
+        self.crop_area = tuple(crop_area) if crop_area else None
+        self.threshold = threshold
+        self.gray = gray or threshold is not None
+        self.scale = scale or 1.0
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.gray else 3
+
+    @property
+    def pix_fmt(self) -> str:
+        return "gray" if self.gray else "bgr24"
+
+    @property
+    def identity(self) -> bool:
+        """只需要裁切 (或完全不處理)，與原本 crop_frame 的結果相同"""
+        return not self.gray and self.scale == 1.0
+
+    def crop_size(self, width: int, height: int) -> tuple:
+        if self.crop_area is None:
+            return width, height
+        y1, y2, x1, x2 = self.crop_area
+        return min(x2, width) - x1, min(y2, height) - y1
+
+    def output_size(self, width: int, height: int) -> tuple:
+        """
+        原始解析度為 width x height 時，處理後區塊的 (寬, 高)
+        """
+        crop_width, crop_height = self.crop_size(width, height)
+        if self.scale == 1.0:
+            return crop_width, crop_height
+        return max(1, int(round(crop_width * self.scale))), max(1, int(round(crop_height * self.scale)))
+
+    def frame_bytes(self, width: int, height: int) -> int:
+        out_width, out_height = self.output_size(width, height)
+        return out_width * out_height * self.channels
+
+    def params(self) -> dict:
+        """寫入日誌參數用，設定不同時不會沿用舊的日誌"""
+        return {"gray": self.gray, "threshold": self.threshold, "scale": self.scale}
+
+    def apply_filters(self, stream, width: int, height: int):
+        """
+        在 FFmpeg 串流後加上對應的濾鏡，輸出格式為 self.pix_fmt
+        彩色：先轉成 BGR 再裁切，YUV 4:2:0 下 FFmpeg 會把奇數的寬高與座標捨入成偶數
+        灰階：亮度平面不受色度取樣影響，以 exact 在原格式精準裁切後才轉換，只轉換字幕區塊；
+              明確加上 scale 濾鏡並指定 flags，自動插入的轉換 (bicubic) 慢了三倍以上，輸出的像素相同
+        """
+        out_width, out_height = self.output_size(width, height)
+        if self.crop_area is not None:
+            crop_width, crop_height = self.crop_size(width, height)
+            crop = (crop_width, crop_height, self.crop_area[2], self.crop_area[0])
+        if not self.gray:
+            stream = stream.filter("format", "bgr24")
+            if self.crop_area is not None:
+                stream = stream.filter("crop", *crop)
+            if self.scale != 1.0:
+                stream = stream.filter("scale", out_width, out_height, flags="area")
+            return stream
+
+        if self.crop_area is not None:
+            stream = stream.filter("crop", *crop, exact=1)
+        stream = stream.filter("scale", out_width, out_height, flags="area" if self.scale != 1.0 else "neighbor")
+        stream = stream.filter("format", "gray")
+        if self.threshold is not None:
+            stream = stream.filter("lut", c0=f"if(gt(val,{int(self.threshold)}),255,0)")
+        return stream
+
+    def apply(self, frame):
+        """
+        對 (height, width, 3) 的 BGR 影格做相同處理，回傳處理後的區塊
+        """
+        if self.crop_area is not None:
+            y1, y2, x1, x2 = self.crop_area
+            frame = frame[y1:y2, x1:x2]
+        if self.gray and frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1.0:
+            height, width = frame.shape[:2]
+            frame = cv2.resize(frame, (max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale)))),
+                               interpolation=cv2.INTER_AREA)
+        if self.threshold is not None:
+            _, frame = cv2.threshold(frame, int(self.threshold), 255, cv2.THRESH_BINARY)
+        return frame
+
+    def __repr__(self):
+        return (f"FramePreprocess(crop_area={self.crop_area}, gray={self.gray}, threshold={self.threshold}, "
+                f"scale={self.scale})")
@@ -0,0 +1,179 @@
+"""
+稀疏取樣 + 二分搜尋精修字幕邊界
+
+先以低 fps 取樣 OCR，相鄰兩個取樣的文字不同時，在兩者之間以原始幀率的格點二分搜尋：
+每次只解碼中間那一格的字幕區域並 OCR，直到找到文字改變的那一格為止。
+每個邊界只需 log2(原始幀率 / 取樣 fps) 次額外 OCR，就能得到逐格精確的時間
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import ffmpeg
+import numpy as np
+
+from .ocr_engine import ocr_batch, lines_to_text
+from .segmenter import normalize_text, similarity
+from .subtitles import format_time
+from .metrics import METRICS
+from .preprocess import FramePreprocess
+from .frame_index import FrameIndex
+
+logger = logging.getLogger(__name__)
+
+
+def same_text(a: str, b: str, threshold: float) -> bool:
+    """
+    兩段 OCR 文字是否視為同一句字幕 (皆為空白也算相同)
+    """
+    if not normalize_text(a) and not normalize_text(b):
+        return True
+    return similarity(a, b, threshold) >= threshold
+
+
+def decode_frame(video_path: str, frame: int, native_fps: float, crop_area: tuple, width: int, height: int,
+                 preprocess: FramePreprocess = None, index: FrameIndex = None):
+    """
+    只解碼原始幀率下第 frame 格的字幕區域，回傳 BGR 陣列 (讀不到時回傳 None)
+    FFmpeg 在 -i 前的 -ss 會從前一個關鍵影格解碼並丟棄到指定時間，
+    時間取在該格前 1/4 格，輸出的第一格就是第 frame 格；
+    指定 index 時以該格的精確 PTS 計算 (可變幀率的影片也正確)，否則以 frame / native_fps 推算
+    指定 preprocess 時改用它的裁切與前處理 (與稀疏取樣時相同)，回傳處理後的區塊
+    """
+    preprocess = preprocess or FramePreprocess(crop_area)
+    out_width, out_height = preprocess.output_size(width, height)
+    shape = (out_height, out_width) if preprocess.channels == 1 else (out_height, out_width, 3)
+    frame_size = out_width * out_height * preprocess.channels
+    if index is not None and frame < len(index):
+        seek = index.frame_time(frame) - index.start_time - 0.25 / native_fps
+    else:
+        seek = (frame - 0.25) / native_fps
+    try:
+        out, _ = (
+            preprocess.apply_filters(ffmpeg.input(video_path, ss=max(0.0, seek)), width, height)
+            .output("pipe:", format="rawvideo", pix_fmt=preprocess.pix_fmt, vframes=1)
+            .global_args("-nostdin", "-loglevel", "error")
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        logger.error(f"精修時解碼第 {frame} 格失敗: {e.stderr.decode(errors='replace') if e.stderr else e}")
+        return None
+    if len(out) < frame_size:
+        return None
+    return np.frombuffer(out, np.uint8)[:frame_size].reshape(shape)
+
+
+class BoundaryRefiner:
+    """
+    以二分搜尋找出相鄰取樣之間文字改變的確切影格
+    所有待精修的區間同步前進：每一輪平行解碼各區間的中間格，再合併成一次 ocr_batch 呼叫
+    cache 為 OCRCache 時，探測的字幕區塊同樣會查詢與寫入快取
+    preprocess 為稀疏取樣時使用的前處理，探測的區塊以相同方式處理；
+    text_detector 為 TextPresenceDetector 時，判定沒有文字的區塊直接視為空白；
+    index 為 FrameIndex 時以每格的精確 PTS 定位
+    """
+
+    def __init__(self, video_path: str, native_fps: float, crop_area: tuple, width: int, height: int,
+                 threshold: float = 0.5, max_workers: int = 4, batch_size: int = 1, cache=None,
+                 preprocess: FramePreprocess = None, text_detector=None, index: FrameIndex = None):
+        self.video_path = video_path
+        self.native_fps = native_fps
+        self.crop_area = crop_area
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.cache = cache
+        self.preprocess = preprocess
+        self.text_detector = text_detector
+        self.index = index
+        self.probes = 0
+
+    def probe_texts(self, frames: list) -> list:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            crops = list(executor.map(
+                lambda frame: decode_frame(self.video_path, frame, self.native_fps, self.crop_area,
+                                           self.width, self.height, self.preprocess, self.index), frames))
+        texts = [""] * len(frames)
+        misses = []
+        for i, crop in enumerate(crops):
+            if crop is None or (self.text_detector is not None and not self.text_detector.has_text(crop)):
+                continue
+            key = self.cache.key(crop) if self.cache is not None else None
+            lines = self.cache.get(key) if key is not None else None
+            if lines is None:
+                misses.append((i, key))
+            else:
+                texts[i] = lines_to_text(lines)
+        if misses:
+            results = ocr_batch([crops[i] for i, _ in misses], self.batch_size)
+            for (i, key), lines in zip(misses, results):
+                if key is not None:
+                    self.cache.put(key, lines)
+                texts[i] = lines_to_text(lines)
+        self.probes += len(misses)
+        METRICS.inc("refine_probes_total", len(frames))
+        return texts
+
+    def refine(self, points: list) -> list:
+        """
+        points 為依影格排序的 [(原始幀率下的影格編號, 文字), ...] (稀疏取樣結果)
+        回傳加入所有探測結果後的 [(影格編號, 文字), ...]，每筆文字持續到下一筆的影格為止
+        """
+        timeline = dict(points)
+        intervals = [(lo, a, hi, b) for (lo, a), (hi, b) in zip(points, points[1:])
+                     if hi - lo > 1 and not same_text(a, b, self.threshold)]
+        boundaries = len(intervals)
+        while intervals:
+            mids = [(lo + hi) // 2 for lo, _, hi, _ in intervals]
+            texts = self.probe_texts(mids)
+            next_intervals = []
+            for (lo, a, hi, b), mid, text in zip(intervals, mids, texts):
+                timeline[mid] = text
+                if same_text(text, a, self.threshold):
+                    next_intervals.append((mid, a, hi, b))
+                elif same_text(text, b, self.threshold):
+                    next_intervals.append((lo, a, mid, text))
+                else:
+                    # 兩個取樣之間還有第三句字幕，兩側各自繼續搜尋
+                    next_intervals.append((lo, a, mid, text))
+                    next_intervals.append((mid, text, hi, b))
+            intervals = [interval for interval in next_intervals if interval[2] - interval[0] > 1]
+        logger.info(f"精修 {boundaries} 個字幕邊界，額外 OCR {self.probes} 次")
+        return sorted(timeline.items())
+
+
+def refine_subtitles(samples: list, native_fps: float, video_start_time: float, sample_fps: float,
+                     time_adjustment: float, refiner: BoundaryRefiner, index: FrameIndex = None) -> list:
+    """
+    samples 為稀疏取樣的 [(idx, pts, lines), ...]，回傳邊界精修後的 [(start_time_str, end_time_str, text), ...]
+    指定 index 時影格編號與時間互查都以影格索引的精確 PTS 計算
+    """
+    samples = sorted(samples, key=lambda sample: sample[0])
+    points = []
+    for _, pts, lines in samples:
+        if index is not None and len(index):
+            frame = index.nearest_frame(pts)
+        else:
+            frame = max(0, int(round((pts - video_start_time) * native_fps)))
+        if points and points[-1][0] == frame:
+            continue
+        points.append((frame, lines_to_text(lines)))
+    if not points:
+        return []
+
+    with METRICS.timer("stage_seconds", stage="refine"):
+        timeline = refiner.refine(points)
+
+    def frame_time(frame):
+        if index is not None and len(index):
+            return index.frame_time(frame) + time_adjustment
+        return video_start_time + frame / native_fps + time_adjustment
+
+    subtitles = []
+    for i, (frame, text) in enumerate(timeline):
+        if not text:
+            continue
+        end = frame_time(timeline[i + 1][0]) if i + 1 < len(timeline) else frame_time(frame) + 1 / sample_fps
+        subtitles.append((format_time(frame_time(frame)), format_time(end), text))
+    return subtitles
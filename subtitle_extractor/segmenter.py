@@ -0,0 +1,171 @@
+import re
+from collections import Counter, deque
+from functools import lru_cache
+
+
+@lru_cache(maxsize=65536)
+def normalize_text(text: str) -> str:
+    """
+    移除標點符號和空格以進行更準確的比對 (結果會快取，重複出現的字幕只處理一次)
+    """
+    return re.sub(r'[\s\W]', '', text)
+
+
+@lru_cache(maxsize=65536)
+def char_counts(text: str) -> tuple:
+    """
+    正規化後文字的字元計數 ({字元: 次數}, 總字數)
+    """
+    counts = Counter(normalize_text(text))
+    return counts, sum(counts.values())
+
+
+def _upper_bound(a: str, b: str) -> float:
+    """
+    similarity 的上界：兩種距離都至少要補齊字元計數不相同的部分 (不看順序，只需字元計數)
+    """
+    counts_a, total_a = char_counts(a)
+    counts_b, total_b = char_counts(b)
+    if len(counts_a) > len(counts_b):
+        counts_a, counts_b = counts_b, counts_a
+    common = sum(min(count, counts_b.get(char, 0)) for char, count in counts_a.items())
+    return (common / max(total_a, total_b) + 2 * common / (total_a + total_b)) / 2
+
+
+@lru_cache(maxsize=65536)
+def _distances(a: str, b: str, limit: float) -> tuple:
+    """
+    正規化後文字的 (Levenshtein 距離, 只允許插入 / 刪除的距離)；
+    兩者換算的分數上界低於 limit 時提早結束並回傳 None
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    longest, total = len(a), len(a) + len(b)
+    previous_edit = list(range(len(b) + 1))
+    previous_indel = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        edit = [i]
+        indel = [i]
+        for j, char_b in enumerate(b, 1):
+            if char_a == char_b:
+                edit.append(previous_edit[j - 1])
+                indel.append(previous_indel[j - 1])
+            else:
+                edit.append(min(previous_edit[j], edit[j - 1], previous_edit[j - 1]) + 1)
+                indel.append(min(previous_indel[j], indel[j - 1]) + 1)
+        # 每一列的最小值是最終距離的下界
+        if (2 - min(edit) / longest - min(indel) / total) / 2 < limit:
+            return None
+        previous_edit, previous_indel = edit, indel
+    return previous_edit[-1], previous_indel[-1]
+
+
+def similarity(a: str, b: str, threshold: float = 0.0) -> float:
+    """
+    兩段文字的相似度 (0~1)：正規化後的 Levenshtein 比例 (1 - 距離 / 較長的字數) 與
+    插入刪除比例 (2 * 最長共同子序列 / 總字數，與 difflib.SequenceMatcher.ratio() 同一尺度) 的平均，
+    兩者都看字元順序，換了語序的不同字幕不會被當成相同；Levenshtein 比例依較長的一方計算，
+    字幕換句時常見的長短不一 (前一句加字、半句) 比只看共同字元時扣得更多
+    指定 threshold 時只需判斷是否達到門檻：先以字元計數的上界排除明顯不同的文字，
+    計算距離時上界已低於門檻就提早結束；低於 threshold 的回傳值只保證低於 threshold
+    """
+    if a == b:
+        return 1.0
+    a, b = normalize_text(a), normalize_text(b)
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    if threshold > 0:
+        bound = _upper_bound(a, b)
+        if bound < threshold:
+            return bound
+    distances = _distances(a, b, threshold)
+    if distances is None:
+        return 0.0
+    edit, indel = distances
+    return (2 - edit / max(len(a), len(b)) - indel / (len(a) + len(b))) / 2
+
+
+class Segmenter:
+    """
+    將逐格 OCR 結果依序合併成字幕段落
+    每筆新文字只與「目前段落出現最多次的文字」以及最近 window 種不同文字比較，
+    因此每筆的比較次數有上限，不會隨段落長度增加
+    """
+
+    def __init__(self, threshold: float = 0.5, window: int = 3, min_length: int = 0):
+        self.threshold = threshold
+        self.window = window
+        self.min_length = min_length
+        self.segments = []
+        self._current = None
+
+    def _start(self, start, end, text):
+        self._current = {
+            "start": start,
+            "end": end,
+            "counts": {text: 1},
+            "best": text,
+            "recent": deque([text], maxlen=self.window),
+        }
+
+    def _close(self):
+        if self._current is not None:
+            current = self._current
+            self.segments.append((current["start"], current["end"], current["best"]))
+            self._current = None
+
+    def _matches(self, text: str) -> bool:
+        current = self._current
+        if similarity(current["best"], text, self.threshold) >= self.threshold:
+            return True
+        return any(similarity(recent, text, self.threshold) >= self.threshold
+                   for recent in current["recent"] if recent != current["best"])
+
+    def feed(self, start, end, text: str, count: int = 1):
+        """
+        加入一筆 (開始, 結束, 文字)；正規化後少於 min_length 個字的文字會被略過
+        count 為這段時間內連續出現同一文字的筆數，結果與逐筆加入 count 次相同
+        (同一文字加入後一定留在 recent 中，後面幾筆必定併入同一段落)
+        """
+        if len(normalize_text(text)) < self.min_length:
+            return
+        current = self._current
+        if current is not None and self._matches(text):
+            current["end"] = end
+            count = current["counts"].get(text, 0) + count
+            current["counts"][text] = count
+            if count > current["counts"][current["best"]]:
+                current["best"] = text
+            if text not in current["recent"]:
+                current["recent"].append(text)
+            return
+        self._close()
+        self._start(start, end, text)
+        self._current["counts"][text] = count
+
+    def drain(self) -> list:
+        """
+        取出已結束的段落 (之後不會再變動) 並從 segments 中移除，供邊辨識邊輸出字幕；
+        之後 finish() 只會回傳尚未取出的段落
+        """
+        segments, self.segments = self.segments, []
+        return segments
+
+    def finish(self) -> list:
+        """
+        結束最後一個段落並回傳所有段落 [(開始, 結束, 代表文字), ...]
+        """
+        self._close()
+        return self.segments
+
+
+def segment(items, threshold: float = 0.5, window: int = 3, min_length: int = 0) -> list:
+    """
+    將 [(開始, 結束, 文字), ...] 合併為段落，代表文字取段落內出現最多次的文字
+    """
+    segmenter = Segmenter(threshold=threshold, window=window, min_length=min_length)
+    for start, end, text in items:
+        segmenter.feed(start, end, text)
+    return segmenter.finish()
@@ -0,0 +1,103 @@
+import os
+import logging
+from datetime import timedelta
+from .segmenter import Segmenter, segment
+from .metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+VTT_HEADER = "WEBVTT\nKind: captions\nLanguage: zh-TW\n\n"
+
+def format_time(seconds: float) -> str:
+    """
+    將秒數轉換為 VTT 時間格式 (hh:mm:ss.sss)
+    """
+    if seconds < 0:
+        seconds = 0
+    td = timedelta(seconds=seconds)
+    # td.seconds 只是一天內的秒數，超過 24 小時的部分在 td.days
+    total_seconds = td.days * 86400 + td.seconds
+    formatted = f"{total_seconds // 3600:02}:{(total_seconds % 3600) // 60:02}:{total_seconds % 60:02}.{int(td.microseconds / 1000):03}"
+    return formatted
+
+def merge_subtitles(subtitles, similarity_threshold=0.5, window=3, min_length=4):
+    """
+    合併相似的字幕區塊，並跳過少於 min_length (預設 4) 個字的內容
+    每段保留段落中出現最多次的辨識結果 (見 segmenter.Segmenter)；參數可用 sweep 模組以參考字幕調校
+    """
+    logger.debug("開始合併字幕區塊 (merge_subtitles)")
+    with METRICS.timer("stage_seconds", stage="merge"):
+        merged_subs = segment(subtitles, threshold=similarity_threshold, window=window, min_length=min_length)
+    logger.debug(f"完成合併，共有 {len(merged_subs)} 筆字幕")
+    return merged_subs
+
+def generate_vtt(subtitles, output_path: str, similarity_threshold=0.5, window=3, min_length=4):
+    """
+    產生 VTT 字幕檔，並將相似或過短的字幕進行合併 (合併參數見 merge_subtitles)
+    """
+    logger.info(f"開始產生 VTT 檔: {output_path}")
+    subtitles = merge_subtitles(subtitles, similarity_threshold, window, min_length)
+    try:
+        with METRICS.timer("stage_seconds", stage="write"), open(output_path, "w", encoding="utf-8") as vtt:
+            vtt.write(VTT_HEADER)
+            for start_time, end_time, text in subtitles:
+                vtt.write(f"{start_time} --> {end_time}\n{text}\n\n")
+        logger.info(f"VTT 字幕產生完成: {output_path}")
+    except Exception as e:
+        logger.error(f"產生 VTT 檔時發生錯誤: {e}")
+
+class SubtitleWriter:
+    """
+    邊辨識邊輸出的字幕檔：feed() 依時間順序加入逐格字幕，段落一結束就寫出，
+    只保留目前的段落，記憶體用量與影片長度無關；輸出與 generate_vtt 相同
+    output_path 以 .srt 結尾時輸出 SRT (序號 + hh:mm:ss,mmm)，否則為 VTT
+    內容先寫入 <output_path>.tmp，正常結束 (close 或離開 with) 時才改名為 output_path，
+    發生例外時刪除暫存檔，不會留下不完整的字幕檔
+    """
+
+    def __init__(self, output_path: str, similarity_threshold: float = 0.5, window: int = 3, min_length: int = 4):
+        self.output_path = output_path
+        self.tmp_path = f"{output_path}.tmp"
+        self.segmenter = Segmenter(threshold=similarity_threshold, window=window, min_length=min_length)
+        self.srt = output_path.lower().endswith(".srt")
+        self.count = 0
+        logger.info(f"開始產生 {'SRT' if self.srt else 'VTT'} 檔: {output_path}")
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        if not self.srt:
+            self.file.write(VTT_HEADER)
+
+    def _write(self, segments):
+        for start_time, end_time, text in segments:
+            self.count += 1
+            if self.srt:
+                start_time, end_time = start_time.replace(".", ","), end_time.replace(".", ",")
+                self.file.write(f"{self.count}\n")
+            self.file.write(f"{start_time} --> {end_time}\n{text}\n\n")
+
+    def feed(self, start_time: str, end_time: str, text: str, count: int = 1):
+        with METRICS.timer("stage_seconds", stage="merge"):
+            self.segmenter.feed(start_time, end_time, text, count)
+        if self.segmenter.segments:
+            with METRICS.timer("stage_seconds", stage="write"):
+                self._write(self.segmenter.drain())
+
+    def close(self):
+        self._write(self.segmenter.finish())
+        self.file.close()
+        os.replace(self.tmp_path, self.output_path)
+        logger.info(f"字幕產生完成: {self.output_path}，共 {self.count} 筆字幕")
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
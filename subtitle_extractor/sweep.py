@@ -0,0 +1,261 @@
+"""
+以已儲存的逐格 OCR 結果重新合併字幕，掃描合併參數並以參考字幕評分
+
+逐格結果可以是 extract 的日誌 (.journal)、frame-ocr 的 frame store (.frames) 或 frame<TAB>字幕 文字檔；
+讀入後先把連續相同的文字壓成 run，每組參數 (相似度閾值、比對窗口、最短字數) 只重跑 segmenter.Segmenter，
+不需重新解碼或 OCR，多組參數以行程池平行計算，整個掃描只需數秒。
+評分以參考字幕 (例如 repo 內的 apple.srt) 為準：
+  - CER (時間對齊)：每句輸出字幕歸給時間重疊最多的參考字幕，該參考字幕的文字與歸給它的輸出串接後
+    計算編輯距離；沒有重疊任何參考字幕的輸出全部算插入錯誤，文字對了但時間錯了也會被計為錯誤
+  - 邊界誤差：每句參考字幕與時間重疊最多的輸出字幕，開始與結束時間差的平均 (秒)；沒有對應輸出的參考字幕計為漏字幕
+參考字幕只取與逐格結果時間範圍重疊的部分 (只辨識了一段影片時不會把其餘部分算成漏字幕)
+"""
+import os
+import re
+import json
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .segmenter import Segmenter, normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID = {
+    "similarity_threshold": (0.1, 0.25, 0.4, 0.5, 0.6, 0.7, 0.8),
+    "window": (1, 3, 5),
+    "min_length": (0, 2, 4),
+}
+
+CUE_TIME = re.compile(r"(\d+):(\d+):(\d+)[,.](\d+)\s*-->\s*(\d+):(\d+):(\d+)[,.](\d+)")
+
+
+def read_cues(path: str) -> list:
+    """
+    讀取 SRT 或 VTT，回傳依開始時間排序的 [(開始秒數, 結束秒數, 文字), ...]
+    """
+    cues = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        blocks = re.split(r"\n\s*\n", f.read().replace("\r\n", "\n").strip())
+    for block in blocks:
+        lines = block.strip().split("\n")
+        for i, line in enumerate(lines):
+            match = CUE_TIME.match(line.strip())
+            if match:
+                h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.groups())
+                text = " ".join(lines[i + 1:]).strip()
+                cues.append((h1 * 3600 + m1 * 60 + s1 + ms1 / 1000, h2 * 3600 + m2 * 60 + s2 + ms2 / 1000, text))
+                break
+    cues.sort()
+    return cues
+
+
+def compress_runs(frames) -> list:
+    """
+    將依時間排序的 (開始, 結束, 文字) 逐格結果壓成 [(開始, 結束, 文字, 筆數), ...]：
+    略過空白文字 (與 extract 一樣不送進合併)，相鄰且文字相同的筆合併 (Segmenter.feed 的 count 結果相同)
+    """
+    runs = []
+    for start, end, text in frames:
+        if not text.strip():
+            continue
+        if runs and runs[-1][2] == text:
+            runs[-1][1] = end
+            runs[-1][3] += 1
+        else:
+            runs.append([start, end, text, 1])
+    return [tuple(run) for run in runs]
+
+
+def load_frame_results(path: str, fps: float = None, index=None) -> list:
+    """
+    讀取逐格 OCR 結果並壓成 run (見 compress_runs)，時間為秒
+      - extract 的日誌 (JSONL)：以記錄的 pts 為開始時間，每格持續一個擷取間隔 (1 / 日誌參數的 fps)
+      - frame store (資料夾) 或 frame<TAB>字幕 文字檔：有 pts 欄時使用 pts，否則第 n 格為 n / fps；
+        指定 index (frame_index.FrameIndex) 時以該格的精確 PTS (相對於影片起點) 計算
+    """
+    from .frame_store import FrameStore, is_frame_store
+
+    if is_frame_store(path):
+        store = FrameStore(path)
+        frame_ids = store.frames().tolist()
+        texts = store.texts()
+        times = store.pts.tolist() if store.pts is not None else None
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            first = f.readline()
+        try:
+            params = json.loads(first).get("params")
+        except ValueError:
+            params = None
+        if params is not None:
+            from .journal import FrameJournal
+            from .ocr_engine import lines_to_text
+
+            _, records = FrameJournal.load(path)
+            interval = 1 / params["fps"]
+            return compress_runs((record["pts"], record["pts"] + interval, lines_to_text(record["lines"]))
+                                 for record in records)
+        from .frame_to_timestamp import read_ocr_output
+
+        frame_ids, texts = read_ocr_output(path)
+        times = None
+
+    if index is not None:
+        fps = index.fps
+        if times is None:
+            times = [index.frame_time(frame) - index.start_time for frame in frame_ids]
+    if not fps:
+        raise ValueError("逐格結果沒有時間資訊，需要指定 fps 或影片")
+    if times is None:
+        times = [frame / fps for frame in frame_ids]
+    return compress_runs((time, time + 1 / fps, text) for time, text in zip(times, texts))
+
+
+def clip_reference(reference: list, runs: list) -> list:
+    """
+    只保留與逐格結果時間範圍重疊的參考字幕
+    """
+    if not runs:
+        return []
+    first, last = runs[0][0], max(run[1] for run in runs)
+    return [cue for cue in reference if cue[1] > first and cue[0] < last]
+
+
+def segment_runs(runs: list, similarity_threshold: float = 0.5, window: int = 3, min_length: int = 4) -> list:
+    """
+    以指定參數合併 run，回傳 [(開始, 結束, 文字), ...] (與 subtitles.merge_subtitles 相同的合併)
+    """
+    segmenter = Segmenter(threshold=similarity_threshold, window=window, min_length=min_length)
+    for start, end, text, count in runs:
+        segmenter.feed(start, end, text, count)
+    return segmenter.finish()
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def score(hypothesis: list, reference: list) -> dict:
+    """
+    以參考字幕評分輸出字幕 (兩者皆為 [(開始, 結束, 文字), ...])，回傳
+    cer (時間對齊的字元錯誤率)、boundary_error (平均邊界誤差秒數)、matched / missed (有 / 沒有對應輸出的參考字幕數)、
+    false_alarms (沒有重疊任何參考字幕的輸出數)
+    """
+    ref_texts = [normalize_text(text) for _, _, text in reference]
+    hyp_texts = [normalize_text(text) for _, _, text in hypothesis]
+    ref_chars = sum(len(text) for text in ref_texts)
+    if not reference or not hypothesis:
+        errors = ref_chars + sum(len(text) for text in hyp_texts)
+        return {"cer": errors / ref_chars if ref_chars else float(errors > 0), "boundary_error": None,
+                "matched": 0, "missed": len(reference), "false_alarms": len(hypothesis), "cues": len(hypothesis)}
+
+    ref_times = np.array([cue[:2] for cue in reference], dtype=np.float64)
+    hyp_times = np.array([cue[:2] for cue in hypothesis], dtype=np.float64)
+    overlap = np.maximum(0.0, np.minimum(hyp_times[:, None, 1], ref_times[None, :, 1])
+                         - np.maximum(hyp_times[:, None, 0], ref_times[None, :, 0]))
+
+    # CER：每句輸出歸給重疊最多的參考字幕
+    assigned = [[] for _ in reference]
+    errors = 0
+    false_alarms = 0
+    for position, row in enumerate(overlap):
+        best = int(row.argmax())
+        if row[best] > 0:
+            assigned[best].append(hyp_texts[position])
+        else:
+            errors += len(hyp_texts[position])
+            false_alarms += 1
+    for ref_text, hyp_parts in zip(ref_texts, assigned):
+        errors += edit_distance(ref_text, "".join(hyp_parts))
+
+    # 邊界誤差：每句參考字幕對應重疊最多的輸出
+    best_hyp = overlap.argmax(axis=0)
+    matched = overlap[best_hyp, np.arange(len(reference))] > 0
+    boundary = np.abs(hyp_times[best_hyp] - ref_times).mean(axis=1)[matched]
+    return {
+        "cer": errors / ref_chars if ref_chars else float(errors > 0),
+        "boundary_error": float(boundary.mean()) if len(boundary) else None,
+        "matched": int(matched.sum()),
+        "missed": int(len(reference) - matched.sum()),
+        "false_alarms": false_alarms,
+        "cues": len(hypothesis),
+    }
+
+
+def parameter_grid(grid: dict = None) -> list:
+    """
+    將 {參數: 候選值} 展開為所有組合的 [dict, ...]，未列出的參數使用 DEFAULT_GRID
+    """
+    grid = dict(DEFAULT_GRID, **(grid or {}))
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# worker 行程共用的逐格結果與參考字幕 (由 initializer 設定一次，不必每組參數重新傳送)
+_runs = None
+_reference = None
+
+
+def _init_worker(runs, reference):
+    global _runs, _reference
+    _runs = runs
+    _reference = reference
+
+
+def evaluate(params: dict) -> dict:
+    """
+    以一組合併參數重跑合併並評分 (在 worker 行程中執行)
+    """
+    return dict(params=params, **score(segment_runs(_runs, **params), _reference))
+
+
+def rank_key(result: dict) -> tuple:
+    boundary = result["boundary_error"]
+    return result["cer"], boundary if boundary is not None else float("inf")
+
+
+def sweep(runs: list, reference: list, grid: dict = None, workers: int = None) -> list:
+    """
+    對每組參數重跑合併並以參考字幕評分，回傳依 (CER, 邊界誤差) 排序的結果
+    workers 為行程數 (預設為 CPU 核心數，1 表示在本行程計算)
+    """
+    combinations = parameter_grid(grid)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"掃描 {len(combinations)} 組合併參數 ({len(runs)} 段逐格結果、{len(reference)} 句參考字幕)")
+    if workers <= 1 or len(combinations) == 1:
+        _init_worker(runs, reference)
+        results = [evaluate(params) for params in combinations]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(combinations)), initializer=_init_worker,
+                                 initargs=(runs, reference)) as pool:
+            chunksize = max(1, len(combinations) // (4 * workers))
+            results = list(pool.map(evaluate, combinations, chunksize=chunksize))
+    results.sort(key=rank_key)
+    return results
+
+
+def format_report(results: list, top: int = None) -> str:
+    """
+    排名報告 (文字表格)
+    """
+    lines = [f"{'#':>3} {'threshold':>9} {'window':>6} {'min_len':>7} {'cues':>5} {'CER':>7} "
+             f"{'邊界誤差':>8} {'對應':>5} {'漏':>4} {'多':>4}"]
+    for rank, result in enumerate(results[:top] if top else results, 1):
+        params = result["params"]
+        boundary = result["boundary_error"]
+        lines.append(f"{rank:>3} {params['similarity_threshold']:>9.2f} {params['window']:>6} "
+                     f"{params['min_length']:>7} {result['cues']:>5} {result['cer']:>7.3f} "
+                     f"{'-' if boundary is None else f'{boundary:.3f}s':>10} {result['matched']:>5} "
+                     f"{result['missed']:>4} {result['false_alarms']:>4}")
+    return "\n".join(lines)
@@ -0,0 +1,126 @@
+from .segmenter import segment
+
+def read_frame_texts(input_file, min_length=3):
+    """分行解析 "frame 文字" 格式的 OCR 結果，略過少於 min_length 個字的文字"""
+    parsed_data = []
+    with open(input_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split(" ", 1)
+            if len(parts) != 2 or len(parts[1]) < min_length:
+                continue
+            parsed_data.append((int(parts[0]), parts[1]))
+    return parsed_data
+
+def group_similar_frames(input_file, output_file, similarity_threshold=0.25):
+    """
+    合併相似的連續文字，輸出 "開始 到 結束: 文字" (frame 編號)
+    每筆文字只與段落代表文字及最近幾種文字比較，代表文字取段落中出現最多次者
+    """
+    parsed_data = read_frame_texts(input_file)
+    segments = segment(((frame, frame, text) for frame, text in parsed_data),
+                       threshold=similarity_threshold, window=5)
+
+    # 輸出結果
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for start, end, text in segments:
+            f.write(f"{start} 到 {end}: {text}" + "\n")
+    print(f"共 {len(segments)} 段，結果已保存至 {output_file}")
+
+def frames_to_timestamp(frame, fps=30):
+    """將 frame 數轉換為 SRT 格式的時間戳 (hh:mm:ss;ff)"""
+    total_seconds = frame / fps
+    hours = int(total_seconds // 3600)
+    minutes = int((total_seconds % 3600) // 60)
+    seconds = int(total_seconds % 60)
+    frames = int((total_seconds - int(total_seconds)) * fps)
+    return f"{hours:02}:{minutes:02}:{seconds:02};{frames:02}"
+
+def process_ocr_to_subtitle(input_file, output_file, fps=30):
+    """處理 OCR 框架並生成預期格式的字幕"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    subtitles = []
+    current_text = None
+    start_frame = None
+
+    for line in lines:
+        parts = line.strip().split()
+        if len(parts) < 2:
+            continue
+        frame, text = int(parts[0]), ' '.join(parts[1:])
+
+        if text != current_text:
+            if current_text is not None:
+                # 保存前一段
+                end_frame = frame - 1
+                start_time = frames_to_timestamp(start_frame, fps)
+                end_time = frames_to_timestamp(end_frame, fps)
+                subtitles.append(f"{start_time} {end_time} {current_text}")
+            # 開始新段落
+            current_text = text
+            start_frame = frame
+
+    # 處理最後一段
+    if current_text is not None:
+        end_frame = frame
+        start_time = frames_to_timestamp(start_frame, fps)
+        end_time = frames_to_timestamp(end_frame, fps)
+        subtitles.append(f"{start_time} {end_time} {current_text}")
+
+    # 寫入輸出文件
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(subtitles))
+    print(f"字幕已保存至 {output_file}")
+
+def parse_data(lines):
+    # 提取 frame 和 OCR 文本
+    parsed_data = []
+    for line in lines:
+        parts = line.strip().split(' ', 1)
+        if len(parts) == 2:
+            frame = int(parts[0])
+            text = parts[1]
+            parsed_data.append((frame, text))
+    return parsed_data
+
+def frame_to_timecode(frame, fps=30):
+    # 轉換 frame 為時間碼 (hh:mm:ss;ff)
+    seconds = frame / fps
+    hh = int(seconds // 3600)
+    mm = int((seconds % 3600) // 60)
+    ss = int(seconds % 60)
+    ff = int((seconds - int(seconds)) * fps)
+    return f"{hh:02}:{mm:02}:{ss:02};{ff:02}"
+
+def merge_similar_texts(data, similarity_threshold=0.1, fps=30):
+    merged_results = []
+    # 相似的連續文字合併為同一段
+    segments = segment(((frame, frame, text) for frame, text in data), threshold=similarity_threshold,
+                       window=5)
+    for start_frame, end_frame, text in segments:
+        start_time = frame_to_timecode(start_frame, fps)
+        end_time = frame_to_timecode(end_frame, fps)
+        merged_results.append((start_time, end_time, text))
+
+    return merged_results
+
+def format_results(results):
+    # 格式化結果為字符串
+    return "\n".join([f"{start} {end} {text}" for start, end, text in results])
+
+def merge_similar_file(input_file, output_file, similarity_threshold=0.7, fps=30):
+    """讀取 "frame 文字" 檔案，合併相似文字後輸出 "開始 結束 文字" (hh:mm:ss;ff)"""
+    with open(input_file, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+
+    # 處理流程
+    data = parse_data(lines)
+    merged_results = merge_similar_texts(data, similarity_threshold=similarity_threshold, fps=fps)
+    output = format_results(merged_results)
+
+    # 輸出結果
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(output)
+
+    print(f"合併完成，結果已保存至 {output_file}")
@@ -0,0 +1,34 @@
+import threading
+
+import numpy as np
+
+from subtitle_extractor.frame_ring import FrameRing, read_slots
+
+
+def test_slots_round_trip():
+    strips = [np.full((4, 6, 3), value, dtype=np.uint8) for value in (10, 200)]
+    with FrameRing(2, strips[0].shape) as ring:
+        descriptors = [ring.write(ring.acquire(), strip) for strip in strips]
+        for strip, view in zip(strips, read_slots(ring.name, ring.slot_bytes, descriptors)):
+            np.testing.assert_array_equal(view, strip)
+        assert ring.written_bytes == sum(strip.nbytes for strip in strips)
+
+
+def test_smaller_strips_fit_but_other_dtypes_do_not():
+    with FrameRing(1, (4, 6, 3)) as ring:
+        assert ring.fits(np.zeros((4, 6), dtype=np.uint8))
+        assert not ring.fits(np.zeros((4, 7, 3), dtype=np.uint8))
+        assert not ring.fits(np.zeros((2, 2), dtype=np.float32))
+        slot, shape = ring.put(np.ones((4, 6), dtype=np.uint8))
+        view = read_slots(ring.name, ring.slot_bytes, [(slot, shape)])[0]
+        assert view.shape == (4, 6) and view.sum() == 24
+
+
+def test_acquire_waits_for_released_slots():
+    with FrameRing(2, (2, 2)) as ring:
+        taken = [ring.acquire(), ring.acquire()]
+        assert ring.acquire(block=False) is None
+        assert ring.acquire(timeout=0.01) is None
+
+        threading.Timer(0.05, ring.release, args=(taken[:1],)).start()
+        assert ring.acquire(timeout=5) == taken[0]
@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import pytest
+
+from subtitle_extractor.jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, combine_shards, read_vtt
+from subtitle_extractor.subtitles import generate_vtt
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with JobQueue(str(tmp_path / "jobs.db")) as queue:
+        yield queue
+
+
+def status(queue, job_id):
+    return next(job for job in queue.jobs() if job["id"] == job_id)
+
+
+def test_claim_leases_one_job_at_a_time(queue, tmp_path):
+    job_id = queue.enqueue("a.mp4", str(tmp_path / "a.vtt"))
+    job = queue.claim("w1", lease_seconds=60)
+    assert job["id"] == job_id and job["attempts"] == 1
+    assert queue.claim("w2", lease_seconds=60) is None
+    assert queue.complete(job_id, "w1", {"outputs": [job["output"]]})
+    assert status(queue, job_id)["status"] == DONE
+
+
+def test_expired_lease_is_claimed_by_another_worker(queue, tmp_path):
+    job_id = queue.enqueue("a.mp4", str(tmp_path / "a.vtt"))
+    # 租約立即過期，相當於 w1 失聯
+    queue.claim("w1", lease_seconds=-1)
+    job = queue.claim("w2", lease_seconds=60)
+    assert job["id"] == job_id and job["attempts"] == 2
+    # 原 worker 不能再續約或回報結果
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.complete(job_id, "w1")
+    assert queue.heartbeat(job_id, "w2")
+    assert queue.complete(job_id, "w2")
+
+
+def test_expired_lease_without_attempts_left_fails(queue, tmp_path):
+    job_id = queue.enqueue("a.mp4", str(tmp_path / "a.vtt"), max_attempts=1)
+    queue.claim("w1", lease_seconds=-1)
+    assert queue.claim("w2") is None
+    job = status(queue, job_id)
+    assert job["status"] == FAILED and "租約過期" in job["error"]
+
+
+def test_failed_job_is_retried_with_backoff(queue, tmp_path):
+    job_id = queue.enqueue("a.mp4", str(tmp_path / "a.vtt"), max_attempts=2)
+    queue.claim("w1")
+    assert queue.fail(job_id, "w1", "RuntimeError: boom", backoff=3600)
+    assert status(queue, job_id)["status"] == QUEUED
+    # 退避期間不會被領取
+    assert queue.claim("w1") is None
+
+    job_id = queue.enqueue("b.mp4", str(tmp_path / "b.vtt"), max_attempts=2)
+    queue.claim("w1")
+    queue.fail(job_id, "w1", "RuntimeError: boom", backoff=0)
+    job = queue.claim("w2")
+    assert job["id"] == job_id and job["attempts"] == 2
+    queue.fail(job_id, "w2", "RuntimeError: boom again", backoff=0)
+    assert status(queue, job_id)["status"] == FAILED
+
+    assert queue.retry([job_id]) == 1
+    job = queue.claim("w3")
+    assert job["id"] == job_id and job["attempts"] == 1
+    assert status(queue, job_id)["status"] == RUNNING
+
+
+def enqueue_shards(queue, tmp_path, options=None):
+    output = str(tmp_path / "movie.vtt")
+    job_ids = queue.enqueue_video("movie.mp4", output, options, shard_seconds=10, duration=20)
+    assert len(job_ids) == 2
+    return output
+
+
+def finish_shards(queue, cues):
+    for shard_cues in cues:
+        job = queue.claim("w1")
+        generate_vtt(shard_cues, job["output"], min_length=0)
+        queue.complete(job["id"], "w1")
+
+
+SHARD_CUES = [
+    [("00:00:08.000", "00:00:10.000", "今天天氣很好")],
+    [("00:00:10.000", "00:00:11.000", "今天天氣很好"), ("00:00:12.000", "00:00:14.000", "我們去公園吧")],
+]
+
+
+def test_combine_shards_joins_cues_across_shards(queue, tmp_path):
+    output = enqueue_shards(queue, tmp_path, {"merge_options": {"min_length": 0}})
+    finish_shards(queue, SHARD_CUES[:1])
+    # 還有 shard 未完成
+    assert not combine_shards(queue, output, "w1")
+
+    finish_shards(queue, SHARD_CUES[1:])
+    assert combine_shards(queue, output, "w1")
+    assert read_vtt(output) == [("00:00:08.000", "00:00:11.000", "今天天氣很好"),
+                                ("00:00:12.000", "00:00:14.000", "我們去公園吧")]
+    # 只合併一次
+    assert not combine_shards(queue, output, "w2")
+    assert queue.pending_combines() == []
+
+
+def test_combine_shards_uses_the_job_merge_options(queue, tmp_path):
+    # 門檻高於 1 時任何兩筆都不合併，跨段的同一句保持分開
+    output = enqueue_shards(queue, tmp_path, {"merge_options": {"similarity_threshold": 1.1, "min_length": 0}})
+    finish_shards(queue, SHARD_CUES)
+    assert combine_shards(queue, output, "w1")
+    assert len(read_vtt(output)) == 3
+
+
+def test_failed_combine_is_released(queue, tmp_path):
+    output = enqueue_shards(queue, tmp_path)
+    finish_shards(queue, SHARD_CUES)
+    missing = Path(queue.shards(output)[1]["output"])
+    backup = missing.rename(missing.with_suffix(".bak"))
+
+    with pytest.raises(FileNotFoundError):
+        combine_shards(queue, output, "w1")
+    assert queue.pending_combines() == [output]
+    assert not Path(output).exists()
+
+    backup.rename(missing)
+    assert combine_shards(queue, output, "w2")
+    assert queue.pending_combines() == []
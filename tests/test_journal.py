@@ -0,0 +1,62 @@
+from subtitle_extractor.journal import FrameJournal
+
+PARAMS = {"video_path": "/videos/a.mp4", "fps": 2, "crop_area": [0, 10, 0, 20], "batch_size": 1}
+LINES = [["字幕", 0.99, [[0, 0], [10, 0], [10, 5], [0, 5]]]]
+
+
+def write_journal(path, count, params=PARAMS):
+    with FrameJournal(str(path), params) as journal:
+        for idx in range(count):
+            journal.append(idx, idx * 0.5, LINES)
+
+
+def test_resume_restores_records(tmp_path):
+    path = tmp_path / "out.vtt.journal"
+    write_journal(path, 3)
+
+    with FrameJournal(str(path), dict(PARAMS), resume=True) as journal:
+        assert journal.last_idx == 2
+        assert [record["idx"] for record in journal.records] == [0, 1, 2]
+        assert journal.records[1]["lines"] == LINES
+        journal.append(3, 1.5, LINES)
+
+    params, records = FrameJournal.load(str(path))
+    assert params == PARAMS
+    assert [record["idx"] for record in records] == [0, 1, 2, 3]
+
+
+def test_resume_with_different_params_starts_over(tmp_path):
+    path = tmp_path / "out.vtt.journal"
+    write_journal(path, 3)
+
+    with FrameJournal(str(path), dict(PARAMS, batch_size=4), resume=True) as journal:
+        assert journal.last_idx == -1
+        assert journal.records == []
+
+    params, records = FrameJournal.load(str(path))
+    assert params["batch_size"] == 4
+    assert records == []
+
+
+def test_without_resume_overwrites(tmp_path):
+    path = tmp_path / "out.vtt.journal"
+    write_journal(path, 3)
+
+    with FrameJournal(str(path), PARAMS) as journal:
+        assert journal.last_idx == -1
+
+    assert FrameJournal.load(str(path))[1] == []
+
+
+def test_truncated_last_line_is_dropped(tmp_path):
+    path = tmp_path / "out.vtt.journal"
+    write_journal(path, 2)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"idx": 2, "pts": 1.0, "li')
+
+    with FrameJournal(str(path), PARAMS, resume=True) as journal:
+        assert journal.last_idx == 1
+        journal.append(2, 1.0, LINES)
+
+    params, records = FrameJournal.load(str(path))
+    assert [record["idx"] for record in records] == [0, 1, 2]
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from subtitle_extractor.segmenter import Segmenter, segment, similarity
+
+
+def frames(*texts):
+    return [(i, i, text) for i, text in enumerate(texts)]
+
+
+def test_similarity_ignores_punctuation_and_spaces():
+    assert similarity("今天天氣很好。", "今天 天氣很好") == 1.0
+    assert similarity("", "今天") == 0.0
+    assert similarity("今天天氣很好", "我們去公園吧") == 0.0
+
+
+def test_similarity_depends_on_character_order():
+    # 字元相同但語序不同的兩句不是同一句字幕
+    assert similarity("今天天氣很好", "很好天氣今天") < 0.4
+    assert similarity("今天天氣很好", "今天天氣很妤") > 0.8
+
+
+@pytest.mark.parametrize("threshold", [0.25, 0.4, 0.5, 0.7, 0.8])
+def test_similarity_early_exit_keeps_the_decision(threshold):
+    rng = random.Random(0)
+    alphabet = "今天天氣很好我們去公園吧的了是"
+    for _ in range(500):
+        a = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+        b = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+        assert (similarity(a, b, threshold) >= threshold) == (similarity(a, b) >= threshold)
+
+
+def test_segment_merges_ocr_noise_and_keeps_the_most_common_text():
+    segments = segment(frames("今天天氣很好", "今天天氣很妤", "今天天氣很好", "我們去公園吧", "我們去公園吧"),
+                       threshold=0.5)
+    assert segments == [(0, 2, "今天天氣很好"), (3, 4, "我們去公園吧")]
+
+
+def test_segment_splits_reordered_lines():
+    assert len(segment(frames("今天天氣很好", "很好天氣今天"), threshold=0.5)) == 2
+
+
+def test_segment_compares_with_recent_texts():
+    # 最後一筆與代表文字 (第一句) 不夠像，只與視窗中較早的第三筆相近
+    items = frames("甲乙丙丁戊己", "甲乙丙丁戊己", "甲乙丙丁戊己庚辛", "甲乙丙丁戊已", "甲乙丙丁戊己庚辛壬癸")
+    assert len(segment(items, threshold=0.7, window=3)) == 1
+    assert len(segment(items, threshold=0.7, window=1)) == 2
+
+
+def test_segment_skips_short_texts():
+    segments = segment(frames("今天天氣很好", "。", "今天天氣很好"), threshold=0.5, min_length=2)
+    assert segments == [(0, 2, "今天天氣很好")]
+
+
+def test_feed_count_matches_repeated_feeds():
+    repeated = Segmenter(threshold=0.5)
+    for start, end, text in frames("今天天氣很妤", "今天天氣很好", "今天天氣很好", "今天天氣很好"):
+        repeated.feed(start, end, text)
+    counted = Segmenter(threshold=0.5)
+    counted.feed(0, 0, "今天天氣很妤")
+    counted.feed(1, 3, "今天天氣很好", count=3)
+    assert counted.finish() == repeated.finish() == [(0, 3, "今天天氣很好")]
+
+
+def test_drain_returns_only_closed_segments():
+    segmenter = Segmenter(threshold=0.5)
+    for start, end, text in frames("今天天氣很好", "我們去公園吧", "我們去公園吧"):
+        segmenter.feed(start, end, text)
+    assert segmenter.drain() == [(0, 0, "今天天氣很好")]
+    assert segmenter.finish() == [(1, 2, "我們去公園吧")]